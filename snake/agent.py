@@ -1,3 +1,5 @@
+from collections import deque
+
 from snake import snake_game
 from snake.const import DIRECTIONS
 from snake.types import Direction, Point
@@ -8,11 +10,15 @@ def agent_move(game: snake_game.SnakeGame) -> Direction | None:
     Determines the next move for the AI agent.
     Simple greedy strategy: move towards food, avoid immediate collisions.
 
+    Distances come from the compiled map, so wrapping around the map and portals
+    are taken into account.
+
     WARNING: This is a simple greedy strategy and does not consider the
-    snake's future state, wrapping around the map or portals.
+    snake's future state.
     """
     head = game.snake_head
-    food_x, food_y = game.food.x, game.food.y
+    spec = snake_game.MAP
+    food_cell = spec.cell(game.food)
 
     # Prioritize moves that reduce distance to food
     possible_moves_with_distances = []
@@ -25,7 +31,7 @@ def agent_move(game: snake_game.SnakeGame) -> Direction | None:
             continue
 
         if game.is_safe(next_head):
-            distance = abs(next_head.x - food_x) + abs(next_head.y - food_y)
+            distance = spec.distance(spec.cell(next_head), food_cell)
             possible_moves_with_distances.append((distance, dir))
 
     # Sort moves by distance (ascending)
@@ -55,25 +61,103 @@ def agent_move(game: snake_game.SnakeGame) -> Direction | None:
     # Here, we just let the game_over logic handle it.
 
 
-def agent_move_bfs(game: snake_game.SnakeGame) -> Direction | None:
+class BfsPlanner:
+    """
+    Breadth-first path planner towards the food.
 
-    head = game.snake_head
-    if head == game.food:
-        return None
-    queue: list[tuple[Point, Direction, int]] = [(head, Direction(0, 0), 0)]
-    visited = set()
-    while queue:
-        head, start_dir, steps = queue.pop(0)
-        if head in visited:
-            continue
-        visited.add(head)
+    Searches over integer cell ids with a deque frontier and parent arrays, and
+    caches the planned path across ticks. The search is only rerun when the food
+    moved, the snake did not end up where the plan said it would, or the rest of
+    the cached path is no longer safe.
+    """
+
+    def __init__(self):
+        self._game: snake_game.SnakeGame | None = None
+        self._food: Point | None = None
+        self._expected_head: Point | None = None
+        self._path: deque[tuple[Point, int]] = deque()
+
+    def __call__(self, game: snake_game.SnakeGame) -> Direction | None:
+        head = game.snake_head
         if head == game.food:
-            return start_dir
-        for dir in DIRECTIONS:
-            next_head = snake_game.get_next_head(head, dir)
-            if game.is_safe(next_head, steps) and next_head not in visited:
-                queue.append(
-                    (next_head, dir if start_dir == Direction(0, 0) else start_dir, steps + 1)
-                )
-    # If no path is found, snake will go in a safe direction until it finds food
-    return agent_move(game)
+            return None
+        if not self._is_path_valid(game, head):
+            self._plan(game, head)
+        if not self._path:
+            # If no path is found, snake will go in a safe direction until it finds food
+            self._expected_head = None
+            return agent_move(game)
+        self._expected_head, direction = self._path.popleft()
+        return DIRECTIONS[direction]
+
+    def _is_path_valid(self, game: snake_game.SnakeGame, head: Point) -> bool:
+        if (
+            game is not self._game
+            or game.food != self._food
+            or head != self._expected_head
+            or not self._path
+        ):
+            return False
+        for steps, (point, _) in enumerate(self._path):
+            if not game.is_safe(point, steps):
+                return False
+        return True
+
+    def _plan(self, game: snake_game.SnakeGame, head: Point):
+        self._game = game
+        self._food = game.food
+        self._path.clear()
+
+        points, neighbors = _cell_tables()
+        start = head.y * snake_game.WIDTH + head.x
+        target = game.food.y * snake_game.WIDTH + game.food.x
+        parent = [-1] * len(points)
+        parent_dir = [0] * len(points)
+        depth = [0] * len(points)
+        parent[start] = start
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            steps = depth[cell]
+            for direction, next_cell in enumerate(neighbors[cell]):
+                if next_cell < 0 or parent[next_cell] >= 0:
+                    continue
+                if not game.is_safe(points[next_cell], steps):
+                    continue
+                parent[next_cell] = cell
+                parent_dir[next_cell] = direction
+                depth[next_cell] = steps + 1
+                if next_cell == target:
+                    while next_cell != start:
+                        self._path.appendleft((points[next_cell], parent_dir[next_cell]))
+                        next_cell = parent[next_cell]
+                    return
+                queue.append(next_cell)
+
+
+_cell_table_cache: tuple[list[Point], list[list[int]]] | None = None
+
+
+def _cell_tables() -> tuple[list[Point], list[list[int]]]:
+    """Point of every cell id and, per cell and direction, the next open cell id (or -1)."""
+    global _cell_table_cache
+    if _cell_table_cache is None:
+        spec = snake_game.MAP
+        points = [spec.point(cell) for cell in range(spec.num_cells)]
+        neighbors = [
+            [
+                next_cell if next_cell >= 0 and not spec.blocked[next_cell] else -1
+                for next_cell in spec.next_cell[cell * 4 : cell * 4 + 4]
+            ]
+            for cell in range(spec.num_cells)
+        ]
+        _cell_table_cache = (points, neighbors)
+    return _cell_table_cache
+
+
+_planner = BfsPlanner()
+
+
+def agent_move_bfs(game: snake_game.SnakeGame) -> Direction | None:
+    """Moves along the shortest safe path to the food, see `BfsPlanner`."""
+    return _planner(game)
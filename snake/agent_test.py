@@ -0,0 +1,51 @@
+from snake.agent import BfsPlanner
+from snake.const import DOWN, RIGHT
+from snake.snake_game import SnakeGame
+from snake.types import Point
+
+
+def _game(snake, food):
+    game = SnakeGame()
+    game.snake = snake
+    game.food = food
+    game.direction = RIGHT
+    return game
+
+
+def test_bfs_follows_shortest_path():
+    game = _game([Point(5, 4), Point(4, 4), Point(3, 4)], Point(8, 4))
+    planner = BfsPlanner()
+    moves = 0
+    while len(game.snake) == 3:
+        game.set_next_direction(planner(game))
+        game.update_game()
+        moves += 1
+    assert moves == 3
+
+
+def test_bfs_reuses_cached_path(monkeypatch):
+    game = _game([Point(5, 4), Point(4, 4), Point(3, 4)], Point(8, 7))
+    planner = BfsPlanner()
+    plans = []
+    plan = planner._plan
+    monkeypatch.setattr(planner, "_plan", lambda *args: plans.append(1) or plan(*args))
+    for _ in range(3):
+        game.set_next_direction(planner(game))
+        game.update_game()
+    assert len(plans) == 1
+
+    # Moving the food invalidates the cached path
+    game.food = Point(2, 7)
+    planner(game)
+    assert len(plans) == 2
+
+
+def test_bfs_replans_when_path_blocked():
+    game = _game([Point(5, 4), Point(4, 4), Point(3, 4)], Point(5, 7))
+    planner = BfsPlanner()
+    assert planner(game) == DOWN
+    game.update_game()
+    # Pretend the snake now covers the rest of the planned path
+    game.snake = [Point(5, 5), Point(6, 6), Point(5, 6), Point(4, 6), Point(4, 5), Point(5, 4)]
+    direction = planner(game)
+    assert direction is not None and direction != DOWN
@@ -0,0 +1,107 @@
+"""
+Precomputed animations.
+
+An animation keeps a lookup table of colors for one period and always draws the
+same cells, only their colors change. On the LEDs, `draw(framebuffer, time_ms)`
+looks the strip indices of those cells up once, on the first frame, and every
+later frame recolors just those pixels (`LedFramebuffer.recolor`), without
+diffing the whole frame. `frame(time_ms)` returns the frame as `CellGroups` for
+the simulator instead. Both skip frames that look the same as the previous one.
+
+New idle or attract-mode effects subclass `Animation`, build their table in
+`__init__` and implement `groups(entry)`, whose cells must not depend on the entry.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Sequence
+
+from snake import snake_game
+from snake.framebuffer import CellGroups, LedFramebuffer
+from snake.types import Color, Point
+
+
+def flash_levels(speed: float) -> list[int]:
+    """Brightness 0..255..0 ramp of one flash, one entry per millisecond."""
+    period_ms = int(1000 / speed)
+    return [abs(int(ms * 255 * 2 * speed / 1000) % (255 * 2) - 255) for ms in range(period_ms)]
+
+
+class Animation(ABC):
+    def __init__(self, start_ms: int, duration_ms: int | None, table: Sequence):
+        self.start_ms = start_ms
+        self.duration_ms = duration_ms
+        self.table = table
+        self.done = False
+        self._last_entry = None
+        # Strip indices of every group's cells, earlier groups win
+        self._masks: list[tuple[int, ...]] | None = None
+
+    def _entry(self, time_ms: int):
+        # The table entry to show, None when there is nothing to redraw
+        elapsed = time_ms - self.start_ms
+        if self.duration_ms is not None and elapsed > self.duration_ms:
+            self.done = True
+        if self.done:
+            return None
+        entry = self.table[elapsed % len(self.table)]
+        if entry == self._last_entry:
+            return None
+        self._last_entry = entry
+        return entry
+
+    def frame(self, time_ms: int) -> CellGroups | None:
+        entry = self._entry(time_ms)
+        return None if entry is None else self.groups(entry)
+
+    def draw(self, framebuffer: LedFramebuffer, time_ms: int) -> bool:
+        """Recolors the animation's pixels. Returns True if the strip was updated."""
+        entry = self._entry(time_ms)
+        if entry is None:
+            return False
+        groups = self.groups(entry)
+        if self._masks is None:
+            self._masks = _masks(framebuffer, groups)
+        return framebuffer.recolor(zip((color for color, _ in groups), self._masks))
+
+    @abstractmethod
+    def groups(self, entry) -> CellGroups:
+        """The frame for one table entry."""
+
+
+def _masks(framebuffer: LedFramebuffer, groups: CellGroups) -> list[tuple[int, ...]]:
+    taken: set[int] = set()
+    masks = []
+    for _, cells in groups:
+        mask = []
+        for point in cells:
+            strip_index = framebuffer.strip_index(point)
+            if strip_index is not None and strip_index not in taken:
+                taken.add(strip_index)
+                mask.append(strip_index)
+        masks.append(tuple(mask))
+    return masks
+
+
+class FlashAnimation(Animation):
+    """Pulses the snake of a finished game, the food stays lit."""
+
+    def __init__(
+        self,
+        start_ms: int,
+        duration_ms: int,
+        game: snake_game.SnakeGame,
+        speed: float,
+        food_color: Color,
+    ):
+        levels = flash_levels(speed)
+        # One (head, body) colors entry per brightness level
+        colors = {level: ((level, 0, level), (0, 0, level)) for level in set(levels)}
+        super().__init__(start_ms, duration_ms, [colors[level] for level in levels])
+        self.head: tuple[Point, ...] = (game.snake_head,)
+        self.body: tuple[Point, ...] = tuple(game.snake)[1:]
+        self.food: tuple[Point, ...] = () if game.food is None else (game.food,)
+        self.food_color = food_color
+
+    def groups(self, entry) -> CellGroups:
+        head_color, body_color = entry
+        return ((head_color, self.head), (body_color, self.body), (self.food_color, self.food))
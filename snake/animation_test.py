@@ -0,0 +1,77 @@
+import pytest
+
+from snake import led_map_v2 as led_map
+from snake.animation import Animation, FlashAnimation, flash_levels
+from snake.framebuffer import LedFramebuffer
+from snake.led_output import FakePixelStrip
+from snake.snake_game import SnakeGame
+from snake.types import Point
+
+
+def test_flash_levels_ramp():
+    levels = flash_levels(1)
+    assert len(levels) == 1000
+    assert levels[0] == 255
+    assert levels[500] == 0
+    assert max(levels) == 255 and min(levels) == 0
+
+
+def test_flash_animation_recolors_final_board():
+    game = SnakeGame()
+    game.snake = [Point(5, 4), Point(4, 4), Point(3, 4)]
+    game.food = Point(8, 4)
+    animation = FlashAnimation(1000, 5000, game, 1, (255, 0, 0))
+    # The board is captured when the animation starts
+    game.snake = [Point(9, 4), Point(8, 4), Point(7, 4)]
+
+    head, body, food = animation.frame(1250)
+    assert head == ((128, 0, 128), (Point(5, 4),))
+    assert body == ((0, 0, 128), (Point(4, 4), Point(3, 4)))
+    assert food == ((255, 0, 0), (Point(8, 4),))
+    # Same brightness, nothing to redraw
+    assert animation.frame(1250) is None
+    assert animation.frame(6001) is None
+    assert animation.done
+
+
+class _CountingStrip(FakePixelStrip):
+    def __init__(self, num_pixels):
+        super().__init__(num_pixels)
+        self.writes = []
+
+    def __setitem__(self, index, color):
+        self.writes.append(index)
+        super().__setitem__(index, color)
+
+
+def test_draw_recolors_only_the_animated_pixels():
+    game = SnakeGame()
+    game.snake = [Point(5, 4), Point(4, 4), Point(3, 4)]
+    game.food = Point(8, 4)
+    strip = _CountingStrip(led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(strip, led_map.MAP, led_map.NUM_PIXELS, (2, 4, 0))
+    reference = LedFramebuffer(
+        FakePixelStrip(led_map.NUM_PIXELS), led_map.MAP, led_map.NUM_PIXELS, (2, 4, 0)
+    )
+    # The final board is on the strip when the animation starts
+    board = (((128, 0, 128), game.snake), ((255, 0, 0), (game.food,)))
+    framebuffer.render(board)
+    reference.render(board)
+    animation = FlashAnimation(1000, 5000, game, 1, (255, 0, 0))
+    expected = FlashAnimation(1000, 5000, game, 1, (255, 0, 0))
+    snake = {led_map.MAP[p.y][p.x] for p in game.snake}
+    for time_ms in (1000, 1100, 1250, 1250, 1600):
+        strip.writes.clear()
+        groups = expected.frame(time_ms)
+        assert animation.draw(framebuffer, time_ms) == (groups is not None)
+        if groups is not None:
+            reference.render(groups)
+        assert strip.buf == reference.pixels.buf
+        # The food keeps its color, only the snake is written
+        assert set(strip.writes) <= snake
+    assert not animation.draw(framebuffer, 6001) and animation.done
+
+
+def test_animation_needs_groups():
+    with pytest.raises(TypeError):
+        Animation(0, None, [0])
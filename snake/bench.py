@@ -0,0 +1,427 @@
+"""
+Headless benchmarks.
+
+    snake-bench agents --agent bfs --agent greedy --games 2000 --jobs 8
+    snake-bench startup --runs 20
+    snake-bench render --frames 5000
+    snake-bench micro --baseline baseline.json
+    snake-bench multi --size 64x64 --snakes 8
+
+`agents` plays games without any display across a process pool and reports the
+score distribution, game length, games/sec and decision latency of every agent.
+`startup` starts the game in fresh processes and reports how long it takes to
+import, to light up the first frame and to have the ML agent ready.
+`render` plays a game into the pygame simulator without a window and compares
+the dirty-cell renderer against full redraws, in time and pixel for pixel.
+`micro` times the hot paths one by one (see `snake.microbench`) and compares
+them with a saved baseline. `multi` runs the multi-snake attract mode on panels
+of growing size, written to a fake strip without showing the frames, and checks
+the ticks fit in a frame.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from snake import snake_game
+from snake.metrics import Histogram
+from snake.types import Direction
+
+# Agent name -> "module:function" taking a SnakeGame and returning Direction | None.
+# Imported lazily inside the workers so e.g. the ML agent only loads when asked for.
+AGENTS = {
+    "greedy": "snake.agent:agent_move",
+    "bfs": "snake.agent:agent_move_bfs",
+    "survival": "snake.search_agent:agent_move_survival",
+    "tour": "snake.tour_agent:agent_move_tour",
+    "ml": "snake.ml_agent.agent:agent_move",
+    "ml_lookahead": "snake.ml_agent.agent:agent_move_lookahead",
+}
+
+DEFAULT_MAX_STEPS = 5000
+
+
+def load_agent(name: str) -> Callable[[snake_game.SnakeGame], Direction | None]:
+    module_name, function_name = AGENTS.get(name, name).split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def run_games(agent_name: str, num_games: int, seed: int, max_steps: int) -> dict:
+    """Plays `num_games` games with one agent. Runs inside a worker process."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = load_agent(agent_name)
+        random.seed(seed)
+        game = snake_game.SnakeGame()
+        latency = Histogram()
+        scores = []
+        lengths = []
+        truncated = 0
+        start = time.perf_counter()
+        for _ in range(num_games):
+            game.initialize_game()
+            steps = 0
+            while not game.game_over and steps < max_steps:
+                decision_start = time.perf_counter_ns()
+                direction = agent(game)
+                latency.record(time.perf_counter_ns() - decision_start)
+                if direction is not None:
+                    game.set_next_direction(direction)
+                game.update_game()
+                steps += 1
+            truncated += not game.game_over
+            scores.append(len(game.snake))
+            lengths.append(steps)
+    return {
+        "scores": scores,
+        "lengths": lengths,
+        "truncated": truncated,
+        "latency": latency,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def _distribution(values: list[int]) -> dict[str, float]:
+    """Mean, spread and percentiles, all zero without values (like `Histogram`)."""
+    if not values:
+        return dict.fromkeys(("mean", "std", "min", "p10", "p50", "p90", "max"), 0)
+    ordered = sorted(values)
+
+    def percentile(q: float) -> int:
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "std": round(statistics.pstdev(ordered), 3),
+        "min": ordered[0],
+        "p10": percentile(10),
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "max": ordered[-1],
+    }
+
+
+def bench_agent(
+    pool: ProcessPoolExecutor,
+    agent_name: str,
+    num_games: int,
+    seed: int,
+    chunk_size: int,
+    max_steps: int,
+) -> dict:
+    # Chunks (and their seeds) don't depend on the number of workers, so a run
+    # is reproducible on any machine.
+    num_chunks = math.ceil(num_games / chunk_size)
+    start = time.perf_counter()
+    futures = [
+        pool.submit(
+            run_games,
+            agent_name,
+            min(chunk_size, num_games - i * chunk_size),
+            seed + i,
+            max_steps,
+        )
+        for i in range(num_chunks)
+    ]
+    scores: list[int] = []
+    lengths: list[int] = []
+    truncated = 0
+    latency = Histogram()
+    for future in futures:
+        result = future.result()
+        scores += result["scores"]
+        lengths += result["lengths"]
+        truncated += result["truncated"]
+        latency.merge(result["latency"])
+    elapsed = time.perf_counter() - start
+    return {
+        "games": num_games,
+        "truncated": truncated,
+        "score": _distribution(scores),
+        "game_length": _distribution(lengths),
+        "games_per_sec": round(num_games / elapsed, 2),
+        "steps_per_sec": round(sum(lengths) / elapsed, 2),
+        "decision_latency_us": latency.summary_us(),
+    }
+
+
+def bench_agents(args: argparse.Namespace) -> dict:
+    report = {
+        "seed": args.seed,
+        "jobs": args.jobs,
+        "max_steps": args.max_steps,
+        "agents": {},
+    }
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for agent_name in args.agent or ["greedy", "bfs"]:
+            report["agents"][agent_name] = bench_agent(
+                pool, agent_name, args.games, args.seed, args.chunk_size, args.max_steps
+            )
+    return report
+
+
+# Runs in a fresh interpreter, SNAKE_BENCH_T0 is the time.time() the process was spawned at
+_STARTUP_SCRIPT = """
+import json, os, time
+t0 = float(os.environ["SNAKE_BENCH_T0"])
+start = time.time()
+from snake import main
+imported = time.time()
+main.init_output()
+game = main.snake_game.SnakeGame()
+game.initialize_game()
+main.draw_game(game)
+if main.pixels is not None:
+    main.pixels.flush()
+drawn = time.time()
+main.warm_up_ml_agent().join()
+ready = time.time()
+print(json.dumps({
+    "interpreter": start - t0,
+    "import": imported - start,
+    "first_frame": drawn - t0,
+    "ml_ready": ready - t0,
+}))
+"""
+
+
+def _slowest_imports(env: dict[str, str], count: int) -> list[dict]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import snake.main"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # "import time: self [us] | cumulative | imported package"
+    imports = []
+    for line in result.stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            imports.append((int(fields[0]), int(fields[1]), fields[2].strip()))
+    return [
+        {"module": name, "self_ms": self_us / 1000, "cumulative_ms": cumulative / 1000}
+        for self_us, cumulative, name in sorted(imports, reverse=True)[:count]
+    ]
+
+
+def bench_startup(args: argparse.Namespace) -> dict:
+    env = dict(os.environ, SNAKE_DANCE_MODE=args.mode)
+    if args.mode != "RASPBERRYPI":
+        env.setdefault("SDL_VIDEODRIVER", "dummy")
+    env.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    runs: dict[str, list[float]] = {}
+    for _ in range(args.runs):
+        env["SNAKE_BENCH_T0"] = repr(time.time())
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT],
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for name, seconds in json.loads(result.stdout.splitlines()[-1]).items():
+            runs.setdefault(name, []).append(round(seconds * 1000, 1))
+    return {
+        "mode": args.mode,
+        "runs": args.runs,
+        "startup_ms": {name: _distribution(values) for name, values in runs.items()},
+        "slowest_imports": _slowest_imports(env, args.top_imports),
+    }
+
+
+def bench_render(args: argparse.Namespace) -> dict:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SNAKE_DANCE_MODE", "HEADLESS")
+    with contextlib.redirect_stdout(io.StringIO()):
+        import pygame
+
+        from snake import main as game_main
+        from snake.sim_renderer import SimRenderer, draw_full, frame_digest
+
+    pygame.display.init()
+    scale = game_main.SCALE
+    screen = pygame.display.set_mode((game_main.WIDTH * scale, game_main.HEIGHT * scale))
+    renderer = SimRenderer(
+        screen, game_main.MAP, scale, game_main.DARK, game_main.BLOCKED, game_main.PORTALS
+    )
+    reference = pygame.Surface(screen.get_size())
+    agent = load_agent(args.agent)
+    game = snake_game.SnakeGame(seed=args.seed)
+    game.initialize_game()
+
+    dirty_cells = Histogram()
+    full_redraw = Histogram()
+    checked = mismatched = 0
+    start = time.perf_counter()
+    for frame in range(args.frames):
+        if game.game_over:
+            game.initialize_game()
+        if (direction := agent(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+        groups = game_main.game_cells(game)
+
+        frame_start = time.perf_counter_ns()
+        renderer.render(groups)
+        dirty_cells.record(time.perf_counter_ns() - frame_start)
+
+        frame_start = time.perf_counter_ns()
+        draw_full(reference, renderer.static, groups, scale)
+        pygame.display.flip()
+        full_redraw.record(time.perf_counter_ns() - frame_start)
+
+        if args.check_every and frame % args.check_every == 0:
+            checked += 1
+            mismatched += frame_digest(screen) != frame_digest(reference)
+    elapsed = time.perf_counter() - start
+    pygame.display.quit()
+    return {
+        "agent": args.agent,
+        "seed": args.seed,
+        "frames": args.frames,
+        "frames_per_sec": round(args.frames / elapsed, 1),
+        "dirty_cells_us": dirty_cells.summary_us(),
+        "full_redraw_us": full_redraw.summary_us(),
+        "checked_frames": checked,
+        "mismatched_frames": mismatched,
+    }
+
+
+def bench_micro(args: argparse.Namespace) -> dict:
+    # draw_game imports the game, which imports pygame
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    from snake import microbench
+
+    report = microbench.run(args.filter, args.min_time, args.repeat)
+    if args.baseline:
+        report["comparison"] = microbench.compare(
+            report, microbench.load_baseline(args.baseline), args.threshold
+        )
+    if args.save_baseline:
+        microbench.save_baseline(report, args.save_baseline)
+    return report
+
+
+def bench_multi(args: argparse.Namespace) -> dict:
+    from snake.led_output import FakePixelStrip
+    from snake.multi_snake import MultiSnakeGame, greedy_moves, render_changes, serpentine_panel
+
+    budget_ns = 1e9 / args.fps
+    report = {"snakes": args.snakes, "ticks": args.ticks, "fps": args.fps, "panels": {}}
+    for size in args.size or ["14x10", "64x64", "128x128"]:
+        width, height = (int(n) for n in size.lower().split("x"))
+        start = time.perf_counter()
+        spec = serpentine_panel(width, height)
+        compile_ms = (time.perf_counter() - start) * 1000
+        game = MultiSnakeGame(spec, args.snakes, seed=args.seed)
+        strip = FakePixelStrip(spec.num_pixels, keep_frames=False)
+        tick = Histogram()
+        changed = 0
+        for _ in range(args.ticks):
+            tick_start = time.perf_counter_ns()
+            game.step(greedy_moves(game))
+            render_changes(game, strip)
+            tick.record(time.perf_counter_ns() - tick_start)
+            changed += len(game.changed)
+        report["panels"][size] = {
+            "compile_ms": round(compile_ms, 1),
+            "tick_us": tick.summary_us(),
+            "changed_cells_per_tick": round(changed / max(args.ticks, 1), 2),
+            "deaths": game.deaths,
+            "food_eaten": game.food_eaten,
+            "holds_frame_rate": tick.percentile(99) < budget_ns,
+        }
+    return report
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="snake-bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("-o", "--output", help="Write the JSON report to a file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    agents = subparsers.add_parser("agents", help="Play headless games with each agent")
+    agents.add_argument(
+        "--agent",
+        action="append",
+        help=f"One of {', '.join(AGENTS)} or module:function (repeatable)",
+    )
+    agents.add_argument("--games", type=int, default=1000)
+    agents.add_argument("--jobs", type=int, default=os.cpu_count())
+    agents.add_argument("--seed", type=int, default=0)
+    agents.add_argument("--chunk-size", type=int, default=25, help="Games per worker task")
+    agents.add_argument("--max-steps", type=int, default=DEFAULT_MAX_STEPS)
+    agents.set_defaults(run=bench_agents)
+
+    startup = subparsers.add_parser("startup", help="Measure cold start in fresh processes")
+    startup.add_argument("--runs", type=int, default=10)
+    startup.add_argument(
+        "--mode",
+        default="SIM",
+        help="SNAKE_DANCE_MODE to start in, RASPBERRYPI drives the real LEDs",
+    )
+    startup.add_argument("--top-imports", type=int, default=10)
+    startup.set_defaults(run=bench_startup)
+
+    render = subparsers.add_parser("render", help="Time the simulator renderer without a window")
+    render.add_argument("--frames", type=int, default=5000)
+    render.add_argument("--agent", default="bfs")
+    render.add_argument("--seed", type=int, default=0)
+    render.add_argument(
+        "--check-every",
+        type=int,
+        default=1,
+        help="Compare every n-th frame with a full redraw, 0 to skip the check",
+    )
+    render.set_defaults(run=bench_render)
+
+    micro = subparsers.add_parser("micro", help="Time the hot paths against a baseline")
+    micro.add_argument(
+        "--filter", action="append", help="Only benchmarks matching this glob (repeatable)"
+    )
+    micro.add_argument("--min-time", type=float, default=0.1, help="Seconds per timing run")
+    micro.add_argument("--repeat", type=int, default=5)
+    micro.add_argument("--baseline", help="Compare with a report saved with --save-baseline")
+    micro.add_argument("--save-baseline", help="Save this run as a baseline")
+    micro.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Slowdown (fraction) that counts as a regression, exits with 1",
+    )
+    micro.set_defaults(run=bench_micro)
+
+    multi = subparsers.add_parser("multi", help="Multi-snake attract mode on large panels")
+    multi.add_argument(
+        "--size", action="append", help="Panel WIDTHxHEIGHT (repeatable), 14x10 to 128x128"
+    )
+    multi.add_argument("--snakes", type=int, default=8)
+    multi.add_argument("--ticks", type=int, default=2000)
+    multi.add_argument("--seed", type=int, default=0)
+    multi.add_argument("--fps", type=float, default=30, help="Frame rate the ticks must fit in")
+    multi.set_defaults(run=bench_multi)
+
+    args = parser.parse_args(argv)
+    report = args.run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        sys.stdout.write(output + "\n")
+    if report.get("comparison", {}).get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from snake.bench import _distribution, main
+
+
+def test_distribution():
+    assert _distribution([3, 1, 2, 4]) == {
+        "mean": 2.5,
+        "std": 1.118,
+        "min": 1,
+        "p10": 1,
+        "p50": 3,
+        "p90": 4,
+        "max": 4,
+    }
+    assert set(_distribution([]).values()) == {0}
+
+
+def test_agents_report(tmp_path):
+    output = tmp_path / "report.json"
+    main(["-o", str(output), "agents", "--agent", "greedy", "--games", "2", "--jobs", "1"])
+    report = json.loads(output.read_text())
+    assert report["seed"] == 0 and report["jobs"] == 1
+    greedy = report["agents"]["greedy"]
+    assert set(greedy) == {
+        "games",
+        "truncated",
+        "score",
+        "game_length",
+        "games_per_sec",
+        "steps_per_sec",
+        "decision_latency_us",
+    }
+    assert greedy["games"] == 2 and greedy["score"]["min"] >= 3
+    # One decision per step
+    assert greedy["decision_latency_us"]["count"] == round(greedy["game_length"]["mean"] * 2)
+
+
+def test_no_games(tmp_path):
+    output = tmp_path / "report.json"
+    main(["-o", str(output), "agents", "--agent", "bfs", "--games", "0", "--jobs", "1"])
+    bfs = json.loads(output.read_text())["agents"]["bfs"]
+    assert bfs["games"] == 0 and bfs["score"]["mean"] == 0
+
+
+@pytest.mark.parametrize("ticks", [0, 20])
+def test_multi_report(tmp_path, ticks):
+    output = tmp_path / "report.json"
+    main(["-o", str(output), "multi", "--size", "14x10", "--snakes", "2", "--ticks", str(ticks)])
+    panel = json.loads(output.read_text())["panels"]["14x10"]
+    assert panel["tick_us"]["count"] == ticks
+    assert (panel["changed_cells_per_tick"] > 0) == (ticks > 0)
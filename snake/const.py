@@ -6,3 +6,7 @@ DOWN = Direction(0, 1)
 LEFT = Direction(-1, 0)
 RIGHT = Direction(1, 0)
 DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+# Game speeds in seconds per tick (lower is faster)
+PLAYER_GAME_SPEED = 0.15
+AGENT_GAME_SPEED = 0.07
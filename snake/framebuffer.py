@@ -0,0 +1,126 @@
+from typing import Iterable, Sequence
+
+from snake.types import Color, Point
+
+# A frame is described as a sequence of (color, cells) groups. Cells that are not
+# part of any group are drawn with the framebuffer background color.
+CellGroups = Iterable[tuple[Color, Iterable[Point]]]
+# The same by strip index, for callers that looked the indices up once
+IndexGroups = Iterable[tuple[Color, Iterable[int]]]
+
+
+class LedFramebuffer:
+    """
+    Diff-based framebuffer in front of a NeoPixel strip.
+
+    Keeps a byte copy of the last frame that was sent to the strip and a
+    precomputed point -> strip index lookup, so a redraw only touches the
+    pixels that changed since the previous frame and then pushes the whole
+    strip with a single show().
+
+    `render` draws a whole frame and diffs it against the buffer, which costs
+    O(lit cells). During a game `update` only gets the cells that changed on a
+    tick (the head, the old head, the vacated tail and the food), and `recolor`
+    repaints pixels whose strip indices the caller looked up once, so those
+    cost O(changed cells) whatever the length of the snake.
+    """
+
+    def __init__(self, pixels, led_map: Sequence[Sequence[int]], num_pixels: int, background):
+        self.pixels = pixels
+        self.num_pixels = num_pixels
+        self.background = _to_bytes(background)
+        self._index: dict[Point, int] = {}
+        for y, row in enumerate(led_map):
+            for x, strip_index in enumerate(row):
+                if strip_index >= 0:
+                    self._index[Point(x, y)] = strip_index
+        self._frame = bytearray(self.background * num_pixels)
+        self._lit: set[int] = set()
+        self.reset(background)
+
+    def strip_index(self, point: Point) -> int | None:
+        return self._index.get(point)
+
+    def reset(self, color=None):
+        """Fills the whole strip with `color` (default: background) and resyncs the buffer."""
+        raw = self.background if color is None else _to_bytes(color)
+        self.pixels.fill(tuple(raw))
+        self.pixels.show()
+        self._frame[:] = raw * self.num_pixels
+        # If the strip was filled with something else than the background, every
+        # pixel has to be considered lit for the next diff.
+        self._lit = set() if raw == self.background else set(range(self.num_pixels))
+
+    def render(self, groups: CellGroups) -> bool:
+        """Draws a frame. Returns True if anything changed and the strip was updated."""
+        target: dict[int, bytes] = {}
+        index = self._index
+        for color, cells in groups:
+            raw = _to_bytes(color)
+            for point in cells:
+                strip_index = index.get(point)
+                # Earlier groups win, matching the head > body > food precedence.
+                if strip_index is not None and strip_index not in target:
+                    target[strip_index] = raw
+
+        changed = False
+        frame = self._frame
+        pixels = self.pixels
+        for strip_index in self._lit.union(target):
+            raw = target.get(strip_index, self.background)
+            offset = strip_index * 3
+            if frame[offset : offset + 3] != raw:
+                frame[offset : offset + 3] = raw
+                pixels[strip_index] = tuple(raw)
+                changed = True
+        self._lit = set(target)
+
+        if changed:
+            pixels.show()
+        return changed
+
+    def update(self, cells: Iterable[tuple[Point, Color | None]]) -> bool:
+        """
+        Draws only `cells`, given as (point, color) with None for the background,
+        the rest of the frame stays as it is. Returns True if the strip was updated.
+        """
+        index = self._index
+        background = self.background
+        changes = (
+            (index[point], background if color is None else _to_bytes(color))
+            for point, color in cells
+            if point in index
+        )
+        return self._write(changes)
+
+    def recolor(self, groups: IndexGroups) -> bool:
+        """Paints (color, strip indices) groups. Returns True if anything changed."""
+        return self._write(
+            (strip_index, raw)
+            for color, indices in groups
+            for raw in (_to_bytes(color),)
+            for strip_index in indices
+        )
+
+    def _write(self, changes: Iterable[tuple[int, bytes]]) -> bool:
+        changed = False
+        frame = self._frame
+        pixels = self.pixels
+        lit = self._lit
+        for strip_index, raw in changes:
+            offset = strip_index * 3
+            if frame[offset : offset + 3] != raw:
+                frame[offset : offset + 3] = raw
+                pixels[strip_index] = tuple(raw)
+                changed = True
+                if raw == self.background:
+                    lit.discard(strip_index)
+                else:
+                    lit.add(strip_index)
+        if changed:
+            pixels.show()
+        return changed
+
+
+def _to_bytes(color) -> bytes:
+    return bytes(int(c) for c in color)
@@ -0,0 +1,125 @@
+from snake import led_map_v2 as led_map
+from snake import snake_game
+from snake.agent import agent_move_bfs
+from snake.framebuffer import LedFramebuffer
+from snake.types import Point
+
+DARK = (2, 4, 0)
+HEAD = (128, 0, 128)
+BODY = (0, 0, 128)
+FOOD = (255, 0, 0)
+
+
+class FakePixels:
+    def __init__(self, n):
+        self.buf = [None] * n
+        self.writes = 0
+        self.shows = 0
+
+    def __setitem__(self, index, color):
+        self.buf[index] = tuple(color)
+        self.writes += 1
+
+    def fill(self, color):
+        self.buf = [tuple(color)] * len(self.buf)
+
+    def show(self):
+        self.shows += 1
+
+
+def _groups(snake, food):
+    return ((HEAD, snake[:1]), (BODY, snake), (FOOD, () if food is None else (food,)))
+
+
+def _expected(snake, food):
+    expected = [DARK] * led_map.NUM_PIXELS
+    expected[led_map.MAP[food.y][food.x]] = FOOD
+    for point in snake:
+        expected[led_map.MAP[point.y][point.x]] = BODY
+    expected[led_map.MAP[snake[0].y][snake[0].x]] = HEAD
+    return expected
+
+
+def test_render_matches_full_redraw():
+    pixels = FakePixels(led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(pixels, led_map.MAP, led_map.NUM_PIXELS, DARK)
+    snake = [Point(7, 5), Point(6, 5), Point(5, 5)]
+    food = Point(2, 2)
+    framebuffer.render(_groups(snake, food))
+    assert pixels.buf == _expected(snake, food)
+
+    snake = [Point(8, 5)] + snake[:-1]
+    framebuffer.render(_groups(snake, food))
+    assert pixels.buf == _expected(snake, food)
+
+
+def test_render_only_writes_changed_pixels():
+    pixels = FakePixels(led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(pixels, led_map.MAP, led_map.NUM_PIXELS, DARK)
+    snake = [Point(x, 5) for x in range(12, 2, -1)]
+    food = Point(2, 2)
+    framebuffer.render(_groups(snake, food))
+
+    pixels.writes = 0
+    snake = [Point(13, 5)] + snake[:-1]
+    framebuffer.render(_groups(snake, food))
+    # New head, old head turned body, old tail cleared
+    assert pixels.writes == 3
+
+    shows = pixels.shows
+    assert not framebuffer.render(_groups(snake, food))
+    assert pixels.shows == shows
+
+
+def test_reset_invalidates_buffer():
+    pixels = FakePixels(led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(pixels, led_map.MAP, led_map.NUM_PIXELS, DARK)
+    snake = [Point(7, 5), Point(6, 5), Point(5, 5)]
+    food = Point(2, 2)
+    framebuffer.render(_groups(snake, food))
+    framebuffer.reset((0, 0, 0))
+    framebuffer.render(_groups(snake, food))
+    assert pixels.buf == _expected(snake, food)
+
+
+def test_update_with_game_changes_matches_full_redraw():
+    spec = snake_game.MAP
+    rows = spec.rows()
+    pixels = FakePixels(spec.num_pixels)
+    framebuffer = LedFramebuffer(pixels, rows, spec.num_pixels, DARK)
+    reference = FakePixels(spec.num_pixels)
+    full = LedFramebuffer(reference, rows, spec.num_pixels, DARK)
+
+    def color(game, point):
+        if point == game.snake_head:
+            return HEAD
+        if game.is_snake(point):
+            return BODY
+        return FOOD if point == game.food else None
+
+    game = snake_game.SnakeGame(seed=3)
+    game.initialize_game()
+    framebuffer.render(_groups(list(game.snake), game.food))
+    for _ in range(300):
+        if game.game_over:
+            break
+        if (direction := agent_move_bfs(game)) is not None:
+            game.set_next_direction(direction)
+        changed = game.update_game()
+        assert len(changed) <= 5
+        framebuffer.update([(point, color(game, point)) for point in changed])
+        full.render(_groups(list(game.snake), game.food))
+        assert pixels.buf == reference.buf
+    assert len(game.snake) > 10
+
+
+def test_recolor_only_writes_given_pixels():
+    pixels = FakePixels(led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(pixels, led_map.MAP, led_map.NUM_PIXELS, DARK)
+    assert framebuffer.recolor([(HEAD, [1]), (BODY, [2, 3])])
+    assert pixels.writes == 3 and pixels.shows == 2
+    assert pixels.buf[1] == HEAD and pixels.buf[2] == BODY
+    assert not framebuffer.recolor([(HEAD, [1])])
+    # Recolored pixels are part of the next full frame diff
+    framebuffer.render(())
+    assert pixels.buf[1:4] == [DARK] * 3
@@ -0,0 +1,138 @@
+"""
+Event-driven joystick input.
+
+Directions come from pygame JOYHATMOTION and JOYAXISMOTION events instead of
+polling the joystick every loop iteration. A turn is queued when the D-pad or
+the stick moves into a new direction (edge detection, holding it doesn't
+repeat), and the game takes one queued turn per tick, so a quick double turn
+between two ticks is played out over the next two ticks instead of only the
+last one being kept. Joysticks can be plugged and unplugged at any time.
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Callable
+
+import pygame
+
+from snake.const import DOWN, LEFT, RIGHT, UP
+from snake.types import Direction
+
+logger = logging.getLogger(__name__)
+
+TURN_QUEUE_SIZE = 3
+AXIS_THRESHOLD = 0.5
+
+
+def hat_direction(hat_x: int, hat_y: int) -> Direction | None:
+    if hat_x == -1:
+        return LEFT
+    if hat_x == 1:
+        return RIGHT
+    if hat_y == 1:
+        return UP
+    if hat_y == -1:
+        return DOWN
+    return None
+
+
+def axis_direction(x_axis: float, y_axis: float) -> Direction | None:
+    if abs(x_axis) > abs(y_axis):
+        if x_axis < -AXIS_THRESHOLD:
+            return LEFT
+        if x_axis > AXIS_THRESHOLD:
+            return RIGHT
+    else:
+        if y_axis < -AXIS_THRESHOLD:
+            return UP
+        if y_axis > AXIS_THRESHOLD:
+            return DOWN
+    return None
+
+
+class JoystickInput:
+    """
+    Joystick state built from pygame events.
+
+    `poll()` (or `wait()`) handles the pending events, `next_turn()` hands out
+    one queued turn per tick and `pop_buttons()` the buttons pressed since the
+    last call. Queued turns carry the time they were made, to measure
+    input-to-move latency.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = TURN_QUEUE_SIZE,
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ):
+        self.clock = clock
+        self.queue_size = queue_size
+        self.joysticks: dict[int, pygame.joystick.JoystickType] = {}  # By instance id
+        self._turns: deque[tuple[Direction, int]] = deque()
+        self._buttons: list[int] = []
+        self._hat: Direction | None = None
+        self._axes = [0.0, 0.0]
+        self._axis: Direction | None = None
+
+    def poll(self):
+        for event in pygame.event.get():
+            self.handle_event(event)
+
+    def wait(self, timeout: float):
+        """Sleeps up to `timeout` seconds, waking up as soon as an event arrives."""
+        timeout_ms = int(timeout * 1000)
+        if timeout_ms <= 0:
+            # pygame waits forever for a timeout of 0
+            time.sleep(max(timeout, 0.0))
+            return
+        self.handle_event(pygame.event.wait(timeout_ms))
+
+    def handle_event(self, event: pygame.event.Event):
+        if event.type == pygame.JOYDEVICEADDED:
+            joystick = pygame.joystick.Joystick(event.device_index)
+            self.joysticks[joystick.get_instance_id()] = joystick
+            logger.info("Joystick connected: %s", joystick.get_name())
+        elif event.type == pygame.JOYDEVICEREMOVED:
+            if self.joysticks.pop(event.instance_id, None) is not None:
+                logger.info("Joystick disconnected")
+                self._hat = self._axis = None
+                self._axes = [0.0, 0.0]
+        elif event.type == pygame.JOYHATMOTION:
+            direction = hat_direction(*event.value)
+            if direction is not None and direction != self._hat:
+                self._push_turn(direction)
+            self._hat = direction
+        elif event.type == pygame.JOYAXISMOTION and event.axis < 2:
+            self._axes[event.axis] = event.value
+            direction = axis_direction(*self._axes)
+            if direction is not None and direction != self._axis:
+                self._push_turn(direction)
+            self._axis = direction
+        elif event.type == pygame.JOYBUTTONDOWN:
+            self._buttons.append(event.button)
+
+    def _push_turn(self, direction: Direction):
+        if self._turns and self._turns[-1][0] == direction:
+            return
+        if len(self._turns) < self.queue_size:
+            self._turns.append((direction, self.clock()))
+
+    def next_turn(self, current: Direction) -> tuple[Direction, int] | None:
+        """
+        The next queued turn and when it was made. Turns the game would ignore
+        (the current direction or its reverse) are skipped instead of using up
+        a tick.
+        """
+        while self._turns:
+            direction, made_at = self._turns.popleft()
+            if direction != current and direction != Direction(-current.x, -current.y):
+                return direction, made_at
+        return None
+
+    def clear_turns(self):
+        self._turns.clear()
+
+    def pop_buttons(self) -> list[int]:
+        buttons, self._buttons = self._buttons, []
+        return buttons
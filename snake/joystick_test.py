@@ -0,0 +1,51 @@
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from snake.const import DOWN, LEFT, RIGHT, UP  # noqa: E402
+from snake.joystick import JoystickInput  # noqa: E402
+
+
+def _hat(value):
+    return pygame.event.Event(pygame.JOYHATMOTION, instance_id=0, hat=0, value=value)
+
+
+def _axis(axis, value):
+    return pygame.event.Event(pygame.JOYAXISMOTION, instance_id=0, axis=axis, value=value)
+
+
+def test_quick_double_turn_is_buffered():
+    now = [0]
+    joystick = JoystickInput(clock=lambda: now[0])
+    for value in [(0, 1), (0, 0), (-1, 0), (0, 0)]:
+        now[0] += 10
+        joystick.handle_event(_hat(value))
+    # One turn per tick, with the time it was made
+    assert joystick.next_turn(RIGHT) == (UP, 10)
+    assert joystick.next_turn(UP) == (LEFT, 30)
+    assert joystick.next_turn(LEFT) is None
+
+
+def test_holding_a_direction_queues_it_once():
+    joystick = JoystickInput()
+    for value in [-0.6, -0.8, -1.0]:
+        joystick.handle_event(_axis(1, value))
+    joystick.handle_event(_axis(1, 0.0))
+    joystick.handle_event(_axis(0, 0.9))
+    assert [joystick.next_turn(LEFT)[0], joystick.next_turn(UP)[0]] == [UP, RIGHT]
+
+
+def test_ignored_turns_are_skipped():
+    joystick = JoystickInput(queue_size=3)
+    for value in [(1, 0), (0, 0), (-1, 0), (0, 0), (0, -1), (0, 0), (0, 1)]:
+        joystick.handle_event(_hat(value))
+    # Moving right: RIGHT is a no-op and LEFT would be ignored, the 4th turn didn't fit
+    assert joystick.next_turn(RIGHT)[0] == DOWN
+    assert joystick.next_turn(DOWN) is None
+
+
+def test_buttons():
+    joystick = JoystickInput()
+    joystick.handle_event(pygame.event.Event(pygame.JOYBUTTONDOWN, instance_id=0, button=7))
+    assert joystick.pop_buttons() == [7]
+    assert joystick.pop_buttons() == []
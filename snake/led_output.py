@@ -0,0 +1,151 @@
+import threading
+import time
+
+from snake.metrics import Histogram
+
+
+class LedWriter:
+    """
+    Pixel strip front-end that pushes frames from a dedicated writer thread.
+
+    Has the same interface the game uses on a NeoPixel strip (item assignment,
+    fill and show) but never blocks on the hardware: the game loop composes the
+    next frame in a back buffer and show() hands the changed pixels over to the
+    writer thread, which owns the real strip. If the writer is still busy with
+    the previous transfer, the pending frame is replaced by the newer one
+    (latest frame wins) and counted as dropped.
+
+    If writing to the strip raises, the writer thread stops and the error is
+    raised again from the next show() or flush().
+    """
+
+    def __init__(self, pixels, num_pixels: int):
+        self.pixels = pixels
+        self.num_pixels = num_pixels
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.show_latency = Histogram()  # show() call -> frame out on the strip, in ns
+
+        # Back buffer, only touched by the game loop
+        self._fill = None
+        self._changes: dict[int, tuple] = {}
+        # Frame handed over to the writer: (fill color or None, changed pixels, show() time)
+        self._pending: tuple | None = None
+        self._busy = False
+        self._closed = False
+        self._error: Exception | None = None  # What stopped the writer thread
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="led-writer", daemon=True)
+        self._thread.start()
+
+    def __setitem__(self, index: int, color):
+        self._changes[index] = tuple(color)
+
+    def fill(self, color):
+        self._fill = tuple(color)
+        self._changes = {}
+
+    def _raise_error(self):
+        if self._error is not None:
+            raise RuntimeError("The LED writer thread failed") from self._error
+
+    def show(self):
+        with self._condition:
+            self._raise_error()
+            if self._pending is not None:
+                # The writer didn't pick up the previous frame yet, merge it into this one
+                self.frames_dropped += 1
+                fill, changes, _ = self._pending
+                if self._fill is None:
+                    self._fill = fill
+                    changes.update(self._changes)
+                    self._changes = changes
+            self._pending = (self._fill, self._changes, time.perf_counter_ns())
+            self._fill = None
+            self._changes = {}
+            self._condition.notify()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until every frame handed to show() is on the strip."""
+        with self._condition:
+            done = self._condition.wait_for(
+                lambda: (self._pending is None and not self._busy) or self._error is not None,
+                timeout=timeout,
+            )
+            self._raise_error()
+            return done
+
+    def close(self):
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "frames_dropped": self.frames_dropped,
+            "show_latency_us": self.show_latency.summary_us(),
+        }
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending is not None or self._closed)
+                if self._pending is None:
+                    return
+                fill, changes, shown_at = self._pending
+                self._pending = None
+                self._busy = True
+            try:
+                if fill is not None:
+                    self.pixels.fill(fill)
+                for index, color in changes.items():
+                    self.pixels[index] = color
+                self.pixels.show()
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._busy = False
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._busy = False
+                self.frames_sent += 1
+                self.show_latency.record(time.perf_counter_ns() - shown_at)
+                self._condition.notify_all()
+
+
+class FakePixelStrip:
+    """
+    Stand-in for `neopixel_spi.NeoPixel_SPI` on machines without LEDs.
+
+    Keeps the pixel values, records every frame sent with show() and can
+    simulate the time an SPI transfer takes. With `keep_frames=False` show()
+    doesn't copy the frame, for benchmarks on large panels.
+    """
+
+    def __init__(self, num_pixels: int, transfer_time: float = 0.0, keep_frames: bool = True):
+        self.buf: list[tuple] = [(0, 0, 0)] * num_pixels
+        self.frames: list[list[tuple]] = []
+        self.transfer_time = transfer_time
+        self.keep_frames = keep_frames
+
+    def __setitem__(self, index: int, color):
+        self.buf[index] = tuple(color)
+
+    def __getitem__(self, index: int):
+        return self.buf[index]
+
+    def __len__(self):
+        return len(self.buf)
+
+    def fill(self, color):
+        self.buf = [tuple(color)] * len(self.buf)
+
+    def show(self):
+        if self.transfer_time:
+            time.sleep(self.transfer_time)
+        if self.keep_frames:
+            self.frames.append(list(self.buf))
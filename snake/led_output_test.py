@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from snake import led_map_v2 as led_map
+from snake.framebuffer import LedFramebuffer
+from snake.led_output import FakePixelStrip, LedWriter
+from snake.types import Point
+
+
+def test_frames_reach_the_strip():
+    strip = FakePixelStrip(led_map.NUM_PIXELS)
+    writer = LedWriter(strip, led_map.NUM_PIXELS)
+    framebuffer = LedFramebuffer(writer, led_map.MAP, led_map.NUM_PIXELS, (2, 4, 0))
+    snake = [Point(7, 5), Point(6, 5), Point(5, 5)]
+    framebuffer.render((((128, 0, 128), snake[:1]), ((0, 0, 128), snake), ((255, 0, 0), ())))
+    assert writer.flush(timeout=1)
+    assert strip.buf[led_map.MAP[5][7]] == (128, 0, 128)
+    assert strip.buf[led_map.MAP[5][5]] == (0, 0, 128)
+    assert strip.buf[led_map.MAP[0][4]] == (2, 4, 0)
+    assert writer.frames_sent + writer.frames_dropped == 2
+    writer.close()
+
+
+def test_latest_frame_wins_when_strip_is_busy():
+    strip = FakePixelStrip(4)
+    writer = LedWriter(strip, 4)
+    # Hold the writer in its first transfer
+    release = threading.Event()
+    show = strip.show
+    strip.show = lambda: (release.wait(), show())
+    writer.fill((1, 1, 1))
+    writer.show()
+    for i in range(4):
+        writer[i] = (i, 0, 0)
+        writer.show()
+    release.set()
+    assert writer.flush(timeout=1)
+    assert strip.buf == [(0, 0, 0), (1, 0, 0), (2, 0, 0), (3, 0, 0)]
+    assert writer.frames_sent + writer.frames_dropped == 5
+    assert writer.frames_dropped >= 3
+    assert writer.show_latency.count == writer.frames_sent
+    writer.close()
+
+
+def test_strip_errors_are_raised_from_the_caller():
+    strip = FakePixelStrip(4)
+    writer = LedWriter(strip, 4)
+
+    def broken_show():
+        raise OSError("SPI write failed")
+
+    strip.show = broken_show
+    writer[0] = (1, 0, 0)
+    writer.show()
+    with pytest.raises(RuntimeError) as error:
+        writer.flush()
+    assert isinstance(error.value.__cause__, OSError)
+    with pytest.raises(RuntimeError):
+        writer.show()
+    with pytest.raises(RuntimeError):
+        writer.close()
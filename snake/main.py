@@ -1,30 +1,42 @@
 import enum
+import logging
 import os
 import random
 import signal
+import threading
+import time
+from typing import Iterable
 
 import pygame
 
-from snake import led_map_v2 as led_map
 from snake import snake_game
-from snake.agent import agent_move_bfs
-from snake.const import DOWN, LEFT, RIGHT, UP
-from snake.ml_agent import agent as ml_agent
-from snake.types import Color, Direction, Point
-
+from snake.animation import FlashAnimation
+from snake.const import AGENT_GAME_SPEED, PLAYER_GAME_SPEED
+from snake.framebuffer import CellGroups, LedFramebuffer
+from snake.joystick import JoystickInput
+from snake.led_output import LedWriter
+from snake.metrics import METRICS
+from snake.net_output import UdpPixelSender, sender_from_url
+from snake.scheduler import DecisionPipeline, TickScheduler
+from snake.search_agent import agent_move_survival
+from snake.sim_renderer import SimRenderer
+from snake.types import Color, Point
+
+# RASPBERRYPI drives the LEDs, SIM opens a simulator window, HEADLESS renders the
+# simulator without a window
 SNAKE_DANCE_MODE = os.environ.get("SNAKE_DANCE_MODE", "RASPBERRYPI")
+# udp://host:port streams the frames to a `snake-receiver` instead, in any mode
+SNAKE_OUTPUT = os.environ.get("SNAKE_OUTPUT")
+# SNAKE_ML_AGENT=1 makes the ML mode selectable and loads its model at boot
+SNAKE_ML_AGENT = os.environ.get("SNAKE_ML_AGENT", "") not in ("", "0")
 
-if SNAKE_DANCE_MODE == "RASPBERRYPI":
-    import board
-    import neopixel_spi as neopixel
-
+logger = logging.getLogger(__name__)
 
 # Game configuration
-WIDTH = len(led_map.MAP[0])  # 14
-HEIGHT = len(led_map.MAP)  # 8
+MAP = snake_game.MAP  # Picked with $SNAKE_MAP
+WIDTH = MAP.width  # 14
+HEIGHT = MAP.height  # 10
 INITIAL_SNAKE_LENGTH = 3
-PLAYER_GAME_SPEED = 0.15  # Seconds per frame (lower is faster)
-AGENT_GAME_SPEED = 0.07  # Seconds per frame (lower is faster)
 REFRESH_RATE = 30  # Frames per second
 END_SEQUENCE_FLASH_SPEED = 1
 END_SEQUENCE_LENGTH = 5
@@ -36,76 +48,145 @@ SNAKE_BODY = Color(0, 0, 128)
 FOOD = Color(255, 0, 0)
 BLOCKED = Color(0, 255, 0)
 PORTALS = {}
-for portal in led_map.PORTALS.keys():
+for portal, other in MAP.portals:
     color = Color(random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
-    if PORTALS.get(portal) is None:
-        PORTALS[portal] = color
-        PORTALS[led_map.PORTALS[portal]] = color
-
-# Initializations
-pygame.init()
-if SNAKE_DANCE_MODE == "RASPBERRYPI":
-    # Services Initialization
-    PIXEL_ORDER = neopixel.GRB
-    spi = board.SPI()
-    pixels = neopixel.NeoPixel_SPI(
-        spi, led_map.NUM_PIXELS, pixel_order=PIXEL_ORDER, auto_write=False
-    )
-else:
-    SCALE = 50
-    screen = pygame.display.set_mode((WIDTH * SCALE, HEIGHT * SCALE))
+    if PORTALS.get(MAP.point(portal)) is None:
+        PORTALS[MAP.point(portal)] = color
+        PORTALS[MAP.point(other)] = color
+
+SCALE = 50  # Simulator pixels per cell
+
+# Outputs, set up by init_output()
+pixels: LedWriter | UdpPixelSender | None = None
+framebuffer: LedFramebuffer | None = None
+renderer: SimRenderer | None = None
+# Started by ensure_ml_warm_up() once the ML mode can be used
+ml_warm_up: threading.Thread | None = None
+# Set when the ML agent has no usable policy, the ML mode is then turned off
+ml_agent_failed = False
+
+
+def init_output():
+    """Brings up the LED strip (or the simulator window) and the joystick."""
+    global pixels, framebuffer, renderer
+    if SNAKE_DANCE_MODE == "HEADLESS":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    # Only what the game uses: events need the display subsystem, audio and fonts stay off
+    pygame.display.init()
+    pygame.joystick.init()
+    if SNAKE_OUTPUT:
+        pixels = sender_from_url(SNAKE_OUTPUT, MAP.num_pixels)
+        framebuffer = LedFramebuffer(pixels, MAP.rows(), MAP.num_pixels, DARK)
+        METRICS.add_gauge("udp_frames_sent", lambda: pixels.frames_sent)
+        METRICS.add_gauge("udp_bytes_sent", lambda: pixels.bytes_sent)
+    elif SNAKE_DANCE_MODE == "RASPBERRYPI":
+        import board
+        import neopixel_spi as neopixel
+
+        spi = board.SPI()
+        # The strip is owned by a writer thread so the game loop never waits on SPI
+        pixels = LedWriter(
+            neopixel.NeoPixel_SPI(spi, MAP.num_pixels, pixel_order=neopixel.GRB, auto_write=False),
+            MAP.num_pixels,
+        )
+        framebuffer = LedFramebuffer(pixels, MAP.rows(), MAP.num_pixels, DARK)
+        METRICS.add_histogram("led_show", pixels.show_latency)
+        METRICS.add_gauge("led_frames_sent", lambda: pixels.frames_sent)
+        METRICS.add_gauge("led_frames_dropped", lambda: pixels.frames_dropped)
+    else:
+        screen = pygame.display.set_mode((WIDTH * SCALE, HEIGHT * SCALE))
+        renderer = SimRenderer(screen, MAP, SCALE, DARK, BLOCKED, PORTALS)
+
+
+def warm_up_ml_agent() -> threading.Thread:
+    """
+    Imports the ML agent and loads its model on a background thread, so the
+    first ML frame doesn't stall on it. `_agent_for` waits for it if needed.
+    If the model can't be loaded the ML mode is disabled.
+    """
+
+    def warm_up():
+        global ml_agent_failed
+        try:
+            from snake.ml_agent import agent as ml_agent
+
+            with METRICS.timer("ml_warm_up"):
+                ml_agent.warm_up()
+        except Exception:
+            logger.exception("Could not load the ML agent, the ML mode is disabled")
+            ml_agent_failed = True
+            for button, mode in list(BUTTON_MODES.items()):
+                if mode == GameMode.ML_AGENT:
+                    del BUTTON_MODES[button]
+
+    thread = threading.Thread(target=warm_up, name="ml-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def ensure_ml_warm_up():
+    """Starts warming up the ML agent, once, when the ML mode becomes available."""
+    global ml_warm_up
+    if ml_warm_up is None:
+        ml_warm_up = warm_up_ml_agent()
+
+
+def _now_ms() -> int:
+    return int(time.monotonic() * 1000)
 
 
 def clear_screen():
-    if SNAKE_DANCE_MODE == "RASPBERRYPI":
-        pixels.fill((0, 0, 0))
-        pixels.show()
+    if framebuffer is not None:
+        framebuffer.reset((0, 0, 0))
+        pixels.flush(timeout=1)
+    elif renderer is not None:
+        renderer.clear((0, 0, 0))
+
+
+def draw_cells(groups: CellGroups):
+    """Draws (color, cells) groups on a dark board, earlier groups win."""
+    if framebuffer is not None:
+        # Only the pixels that changed since the last frame are written
+        framebuffer.render(groups)
     else:
-        screen.fill((0, 0, 0))
-        pygame.display.flip()
+        # Only the cells that changed are repainted and pushed to the window
+        with METRICS.timer("display_update"):
+            renderer.render(groups)
 
 
-def draw_game(
+def game_cells(
     game: snake_game.SnakeGame,
     snake_head_color: Color = SNAKE_HEAD,
     snake_body_color: Color = SNAKE_BODY,
     food_color: Color = FOOD,
-):
-    if SNAKE_DANCE_MODE == "RASPBERRYPI":
-        """Draws the game board in the console."""
-        pixels.fill(DARK)
-        for y in range(HEIGHT):
-            for x in range(WIDTH):
-                point = Point(x, y)
-                if point == game.snake_head:
-                    pixels[led_map.MAP[y][x]] = snake_head_color  # Snake head
-                elif point in game.snake:
-                    pixels[led_map.MAP[y][x]] = snake_body_color  # Snake body
-                elif point == game.food:
-                    pixels[led_map.MAP[y][x]] = food_color  # Food
-
-        pixels.show()
+) -> CellGroups:
+    return (
+        (snake_head_color, (game.snake_head,)),
+        (snake_body_color, game.snake),
+        (food_color, () if game.food is None else (game.food,)),
+    )
+
+
+def cell_color(game: snake_game.SnakeGame, point: Point) -> Color | None:
+    """What `game_cells` draws at `point`, None for the background."""
+    if point == game.snake_head:
+        return SNAKE_HEAD
+    if game.is_snake(point):
+        return SNAKE_BODY
+    if point == game.food:
+        return FOOD
+    return None
+
+
+def draw_game(game: snake_game.SnakeGame, changed: Iterable[Point] | None = None):
+    """
+    Draws the game. With the cells `update_game()` reported as `changed`, the
+    LEDs only get those pixels written, otherwise the whole board is drawn.
+    """
+    if framebuffer is not None and changed is not None:
+        framebuffer.update([(point, cell_color(game, point)) for point in changed])
     else:
-        screen.fill(DARK)
-        for y in range(HEIGHT):
-            for x in range(WIDTH):
-                point = Point(x, y)
-                if point == game.snake_head:
-                    pygame.draw.rect(screen, snake_head_color, (x * SCALE, y * SCALE, SCALE, SCALE))
-                elif point in game.snake:
-                    pygame.draw.rect(screen, snake_body_color, (x * SCALE, y * SCALE, SCALE, SCALE))
-                elif point == game.food:
-                    pygame.draw.rect(screen, food_color, (x * SCALE, y * SCALE, SCALE, SCALE))
-                elif led_map.is_blocked(x, y):
-                    pygame.draw.rect(screen, BLOCKED, (x * SCALE, y * SCALE, SCALE, SCALE))
-                elif led_map.PORTALS.get(point) is not None:
-                    pygame.draw.circle(
-                        screen,
-                        PORTALS[point],
-                        (x * SCALE + SCALE / 2, y * SCALE + SCALE / 2),
-                        SCALE / 2,
-                    )
-        pygame.display.flip()
+        draw_cells(game_cells(game))
 
 
 class GameMode(enum.Enum):
@@ -114,141 +195,184 @@ class GameMode(enum.Enum):
     PLAYER = "player"
 
 
-def handle_joystick_direction() -> Direction | None:
-    input_direction = None
-    if pygame.joystick.get_count() == 0:
-        return  # Wait for joystick to be connected
-    joystick = pygame.joystick.Joystick(0)
-    # Use the hat (D-pad) instead of axes for direction
-    hat_x, hat_y = joystick.get_hat(0)
-    if hat_x != 0 or hat_y != 0:
-        # Use hat (D-pad) input if available
-        if hat_x == -1:
-            input_direction = LEFT
-        elif hat_x == 1:
-            input_direction = RIGHT
-        elif hat_y == 1:
-            input_direction = UP
-        elif hat_y == -1:
-            input_direction = DOWN
-    else:
-        # Fall back to analog stick (axes)
-        x_axis = joystick.get_axis(0)
-        y_axis = joystick.get_axis(1)
-        if abs(x_axis) > abs(y_axis):
-            if x_axis < -0.5:
-                input_direction = LEFT
-            elif x_axis > 0.5:
-                input_direction = RIGHT
-        else:
-            if y_axis < -0.5:
-                input_direction = UP
-            elif y_axis > 0.5:
-                input_direction = DOWN
-    return input_direction
-
-
-def handle_joystick_game_mode() -> GameMode | None:
-    if pygame.joystick.get_count() == 0:
-        return  # Wait for joystick to be connected
-    joystick = pygame.joystick.Joystick(0)
-
-    if joystick.get_button(7):
-        return GameMode.PLAYER
-    if joystick.get_button(6):
-        return GameMode.AGENT
-    return None
+# Joystick buttons that switch the game mode
+BUTTON_MODES = {7: GameMode.PLAYER, 6: GameMode.AGENT}
+if SNAKE_ML_AGENT:
+    BUTTON_MODES[5] = GameMode.ML_AGENT
 
 
 class EndSequence:
     def __init__(self, init_time_ms: int, game: snake_game.SnakeGame):
         self.init_time_ms = init_time_ms
         self.game = game
+        # The final board is captured once, frames only recolor it
+        self.animation = FlashAnimation(
+            init_time_ms, END_SEQUENCE_LENGTH * 1000, game, END_SEQUENCE_FLASH_SPEED, FOOD
+        )
         self.done = False
 
     def draw_frame(self, time_ms: int):
-        if time_ms - self.init_time_ms > END_SEQUENCE_LENGTH * 1000:
-            self.done = True
-        if self.done:
-            return
-        i = abs(
-            ((time_ms - self.init_time_ms) * 255 * 2 * END_SEQUENCE_FLASH_SPEED / 1000) % (255 * 2)
-            - 255
-        )
-        draw_game(
-            self.game,
-            (i, 0, i),
-            (0, 0, i),
-            FOOD,
-        )
+        if framebuffer is not None:
+            # Only the snake's pixels are recolored
+            self.animation.draw(framebuffer, time_ms)
+        elif (groups := self.animation.frame(time_ms)) is not None:
+            draw_cells(groups)
+        self.done = self.animation.done
+
+
+def _agent_for(game_mode: GameMode):
+    if game_mode == GameMode.ML_AGENT:
+        # Waits until the model is loaded (usually long done), or found missing
+        ensure_ml_warm_up()
+        ml_warm_up.join()
+    if game_mode == GameMode.ML_AGENT and not ml_agent_failed:
+        from snake.ml_agent import agent as ml_agent
+
+        return ml_agent.agent_move_lookahead
+    return agent_move_survival
+
+
+def _game_speed(game_mode: GameMode) -> float:
+    return PLAYER_GAME_SPEED if game_mode == GameMode.PLAYER else AGENT_GAME_SPEED
+
+
+def _open_recorder():
+    """Records every game to $SNAKE_RECORD_DIR/snake-<date>.snkr if set."""
+    if not (record_dir := os.environ.get("SNAKE_RECORD_DIR")):
+        return None
+    from snake.recording import GameRecorder
+
+    os.makedirs(record_dir, exist_ok=True)
+    return GameRecorder(os.path.join(record_dir, time.strftime("snake-%Y%m%d.snkr")))
 
 
 def game_loop():
     """Main game loop."""
 
     game = snake_game.SnakeGame()
+    recorder = _open_recorder()
 
     game.initialize_game()
-
+    if recorder:
+        recorder.start(game)
+    # Light the board up right away, the ML agent loads while the game runs
+    draw_game(game)
+    if SNAKE_ML_AGENT:
+        ensure_ml_warm_up()
+
+    joystick = JoystickInput()
     game_mode = GameMode.AGENT
-    last_update_tick = pygame.time.get_ticks()
+    # Game ticks fire on absolute deadlines, the loop itself runs at REFRESH_RATE
+    # to poll input and animate the end sequence.
+    scheduler = TickScheduler(_game_speed(game_mode))
+    # Agent decisions for the next tick are computed while the current frame is drawn
+    pipeline = DecisionPipeline()
     end_sequence = None
-    input_direction = None
-    game_clock = pygame.time.Clock()
+    reported_overruns = 0
 
     while True:
-        pygame.event.pump()
+        joystick.poll()
         if not game.game_over:
-            if (
-                game_mode == GameMode.AGENT or game_mode == GameMode.ML_AGENT
-            ) and pygame.time.get_ticks() - last_update_tick >= AGENT_GAME_SPEED * 1000:
-                if game_mode == GameMode.AGENT:
-                    if (tmp_dir := agent_move_bfs(game)) is not None:
-                        game.set_next_direction(tmp_dir)
-                elif game_mode == GameMode.ML_AGENT:
-                    if (tmp_dir := ml_agent.agent_move(game)) is not None:
+            if scheduler.poll():
+                tick_start = time.perf_counter_ns()
+                METRICS.record("tick_lateness", int(scheduler.lateness * 1e9))
+                if scheduler.overruns > reported_overruns:
+                    missed = scheduler.overruns - reported_overruns
+                    METRICS.increment(f"missed_deadlines_{game_mode.value}", missed)
+                    reported_overruns = scheduler.overruns
+                if game_mode == GameMode.PLAYER:
+                    # One buffered turn per tick
+                    if (turn := joystick.next_turn(game.direction)) is not None:
+                        direction, made_at = turn
+                        game.set_next_direction(direction)
+                        METRICS.record("input_latency", time.perf_counter_ns() - made_at)
+                else:
+                    agent = _agent_for(game_mode)
+                    with METRICS.timer("agent_wait"):
+                        tmp_dir = pipeline.decision(agent, game)
+                    if tmp_dir is not None:
                         game.set_next_direction(tmp_dir)
-                game.update_game()
-                draw_game(game)
-                last_update_tick = pygame.time.get_ticks()
-            elif game_mode == GameMode.PLAYER:
-                if (tmp_dir := handle_joystick_direction()) is not None:
-                    input_direction = tmp_dir
-                if pygame.time.get_ticks() - last_update_tick >= PLAYER_GAME_SPEED * 1000:
-                    if input_direction is not None:
-                        game.set_next_direction(input_direction)
-                        input_direction = None
-                    game.update_game()
-                    draw_game(game)
-                    last_update_tick = pygame.time.get_ticks()
+                if recorder:
+                    recorder.record(game)
+                with METRICS.timer("update_game"):
+                    changed = game.update_game()
+                if game_mode != GameMode.PLAYER and not game.game_over:
+                    pipeline.prefetch(agent, game)
+                with METRICS.timer("draw_game"):
+                    draw_game(game, changed)
+                tick_ns = time.perf_counter_ns() - tick_start
+                METRICS.record("tick", tick_ns)
+                if tick_ns > scheduler.period * 1e9:
+                    METRICS.increment(f"slow_ticks_{game_mode.value}")
         else:
             if end_sequence is None:
-                last_update_tick = pygame.time.get_ticks()
-                end_sequence = EndSequence(last_update_tick, game)
-            end_sequence.draw_frame(pygame.time.get_ticks())
+                if recorder:
+                    recorder.finish(game)
+                end_sequence = EndSequence(_now_ms(), game)
+            end_sequence.draw_frame(_now_ms())
             if end_sequence.done:
+                pipeline.discard()
                 game.initialize_game()
+                if recorder:
+                    recorder.start(game)
+                # Ticks only redraw what they changed, a new game starts from a full frame
+                draw_game(game)
                 end_sequence = None
-                last_update_tick = pygame.time.get_ticks()
+                joystick.clear_turns()
+                scheduler.reset()
 
-        req_game_mode = handle_joystick_game_mode()
+        req_game_mode = None
+        for button in joystick.pop_buttons():
+            req_game_mode = BUTTON_MODES.get(button, req_game_mode)
         if req_game_mode != game_mode and req_game_mode is not None:
+            pipeline.discard()
             game_mode = req_game_mode
+            if game_mode == GameMode.ML_AGENT:
+                ensure_ml_warm_up()
+            if recorder and not game.game_over:
+                recorder.finish(game)
             game.initialize_game()
+            if recorder:
+                recorder.start(game)
+            draw_game(game)
             end_sequence = None
-            last_update_tick = pygame.time.get_ticks()
+            joystick.clear_turns()
+            scheduler.reset(_game_speed(game_mode))
+            reported_overruns = scheduler.overruns
             continue
 
-        game_clock.tick(REFRESH_RATE)
+        if game.game_over:
+            joystick.wait(1 / REFRESH_RATE)
+        else:
+            # Wake up on input, for the next frame or exactly at the next tick deadline
+            joystick.wait(min(1 / REFRESH_RATE, scheduler.time_until_due()))
 
 
-def exit_game():
+def exit_game(*_):
     clear_screen()
     exit(0)
 
 
+def dump_metrics(*_):
+    logger.info("Metrics:\n%s", METRICS.to_prometheus())
+
+
+def setup_observability():
+    logging.basicConfig(
+        level=os.environ.get("SNAKE_LOG_LEVEL", "INFO").upper(),
+        format="%(levelname)s %(name)s: %(message)s",
+    )
+    signal.signal(signal.SIGUSR1, dump_metrics)
+    if metrics_file := os.environ.get("SNAKE_METRICS_FILE"):
+        METRICS.export_periodically(metrics_file)
+    if metrics_socket := os.environ.get("SNAKE_METRICS_SOCKET"):
+        METRICS.serve_unix_socket(metrics_socket)
+
+
 def main():
     """Entry point for the snake game."""
+    setup_observability()
+    init_output()
     signal.signal(signal.SIGTERM, exit_game)
     try:
         game_loop()
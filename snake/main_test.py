@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("pygame")
+
+
+def test_startup_is_lazy():
+    code = (
+        "import sys; import snake.main as m; "
+        "assert 'snake.ml_agent.agent' not in sys.modules; "
+        "m.init_output(); "
+        "assert not m.pygame.mixer.get_init(); "
+        "m.warm_up_ml_agent().join(); "
+        "assert m.METRICS.histograms['ml_warm_up'].total.count == 1"
+    )
+    env = dict(os.environ, SNAKE_DANCE_MODE="SIM", SDL_VIDEODRIVER="dummy")
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
+
+
+@pytest.mark.parametrize("enabled", ["", "1"])
+def test_ml_mode_is_opt_in(enabled):
+    code = (
+        "import snake.main as m; "
+        f"assert (m.GameMode.ML_AGENT in m.BUTTON_MODES.values()) == {bool(enabled)}; "
+        "assert m.ml_warm_up is None; "
+        "m.ensure_ml_warm_up(); thread = m.ml_warm_up; m.ensure_ml_warm_up(); "
+        "assert m.ml_warm_up is thread"
+    )
+    env = dict(os.environ, SNAKE_DANCE_MODE="SIM", SDL_VIDEODRIVER="dummy", SNAKE_ML_AGENT=enabled)
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
+
+
+def test_ml_mode_is_disabled_without_a_policy():
+    # No policy_1600 file is checked in, the ML agent can't load
+    code = (
+        "import snake.main as m; "
+        "m.ensure_ml_warm_up(); m.ml_warm_up.join(); "
+        "assert m.ml_agent_failed; "
+        "assert m.GameMode.ML_AGENT not in m.BUTTON_MODES.values(); "
+        "assert m._agent_for(m.GameMode.ML_AGENT) is m.agent_move_survival"
+    )
+    env = dict(os.environ, SNAKE_DANCE_MODE="SIM", SDL_VIDEODRIVER="dummy", SNAKE_ML_AGENT="1")
+    assert subprocess.run([sys.executable, "-c", code], env=env).returncode == 0
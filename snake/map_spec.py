@@ -0,0 +1,199 @@
+"""
+Map compiler.
+
+Turns a `led_map*` module (MAP, PORTALS, NUM_PIXELS, is_blocked) into an
+immutable `MapSpec` with integer cell ids (y * width + x) and flat lookup
+tables, so the engine and the agents never recompute wrap-around or look up
+portals while playing:
+
+- `next_cell[cell * 4 + d]`: cell reached when moving in `DIRECTIONS[d]`,
+  including wrap-around and portals, -1 when the move leaves the grid
+- `flips[cell * 4 + d]`: the move goes through a portal, which turns UP into DOWN
+- `blocked[cell]` and `strip_index[cell]` (-1 for blocked cells)
+- `distances[a * num_cells + b]`: shortest number of moves from a to b over
+  open cells, ignoring the snake (`UNREACHABLE` if there is no way)
+
+Compiled maps are cached on disk, keyed by a hash of the map, so the
+all-pairs distances are only computed once per map. The map the game runs is
+picked with `SNAKE_MAP` (default `led_map_v2`).
+"""
+
+import hashlib
+import importlib
+import logging
+import os
+import pickle
+from array import array
+from collections import deque
+from types import ModuleType
+from typing import NamedTuple
+
+from snake.const import DIRECTIONS, UP
+from snake.types import Point
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAP = "led_map_v2"
+UNREACHABLE = 0xFFFF
+# Bump when the compiled layout changes, invalidates the disk cache
+COMPILER_VERSION = 1
+
+_UP_INDEX = DIRECTIONS.index(UP)
+
+
+class MapSpec(NamedTuple):
+    name: str
+    hash: str
+    width: int
+    height: int
+    num_pixels: int
+    blocked: tuple[bool, ...]
+    strip_index: tuple[int, ...]
+    open_cells: tuple[int, ...]
+    next_cell: tuple[int, ...]
+    flips: tuple[bool, ...]
+    portals: tuple[tuple[int, int], ...]
+    distances: array
+
+    @property
+    def num_cells(self) -> int:
+        return self.width * self.height
+
+    def cell(self, point: Point) -> int:
+        return point.y * self.width + point.x
+
+    def point(self, cell: int) -> Point:
+        return Point(cell % self.width, cell // self.width)
+
+    def is_blocked(self, x: int, y: int) -> bool:
+        """Same as the map module's is_blocked, cells off the grid are blocked."""
+        if not (0 <= y < self.height and 0 <= x < self.width):
+            return True
+        return self.blocked[y * self.width + x]
+
+    def distance(self, a: int, b: int) -> int:
+        return self.distances[a * self.width * self.height + b]
+
+    def rows(self) -> list[list[int]]:
+        """The strip index grid in the `led_map.MAP` layout."""
+        return [
+            list(self.strip_index[y * self.width : (y + 1) * self.width])
+            for y in range(self.height)
+        ]
+
+
+def map_hash(module: ModuleType) -> str:
+    width, height = len(module.MAP[0]), len(module.MAP)
+    blocked = [module.is_blocked(x, y) for y in range(height) for x in range(width)]
+    source = repr(
+        (COMPILER_VERSION, module.MAP, sorted(module.PORTALS.items()), module.NUM_PIXELS, blocked)
+    )
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def compile_map(module: ModuleType, distances: bool = True) -> MapSpec:
+    """Compiles a map module. Pass distances=False to skip the all-pairs distances."""
+    grid = module.MAP
+    width, height = len(grid[0]), len(grid)
+    num_cells = width * height
+    blocked = tuple(bool(module.is_blocked(x, y)) for y in range(height) for x in range(width))
+    strip_index = tuple(
+        -1 if blocked[y * width + x] else grid[y][x] for y in range(height) for x in range(width)
+    )
+
+    next_cell = []
+    flips = []
+    for cell in range(num_cells):
+        x, y = cell % width, cell // width
+        for d, direction in enumerate(DIRECTIONS):
+            portal = module.PORTALS.get((x, y)) if d == _UP_INDEX else None
+            if portal is not None:
+                next_x, next_y = portal
+            else:
+                next_x, next_y = (x + direction.x) % width, y + direction.y
+            next_cell.append(next_y * width + next_x if 0 <= next_y < height else -1)
+            # Portals turn an UP move into DOWN when coming out of the paired portal
+            flips.append(portal is not None and tuple(portal) in module.PORTALS)
+
+    portals = tuple(
+        sorted((a[1] * width + a[0], b[1] * width + b[0]) for a, b in module.PORTALS.items())
+    )
+    open_cells = tuple(cell for cell in range(num_cells) if not blocked[cell])
+    spec = MapSpec(
+        name=module.__name__.rsplit(".", 1)[-1],
+        hash=map_hash(module),
+        width=width,
+        height=height,
+        num_pixels=module.NUM_PIXELS,
+        blocked=blocked,
+        strip_index=strip_index,
+        open_cells=open_cells,
+        next_cell=tuple(next_cell),
+        flips=tuple(flips),
+        portals=portals,
+        distances=array("H"),
+    )
+    if distances:
+        spec = spec._replace(distances=_all_pairs_distances(spec))
+    return spec
+
+
+def _all_pairs_distances(spec: MapSpec) -> array:
+    """One BFS per open cell over the open cells."""
+    num_cells = spec.num_cells
+    neighbors = [
+        [
+            next_cell
+            for next_cell in spec.next_cell[cell * 4 : cell * 4 + 4]
+            if next_cell >= 0 and not spec.blocked[next_cell]
+        ]
+        for cell in range(num_cells)
+    ]
+    distances = array("H", [UNREACHABLE]) * (num_cells * num_cells)
+    for source in spec.open_cells:
+        row = [UNREACHABLE] * num_cells
+        row[source] = 0
+        queue = deque([source])
+        while queue:
+            cell = queue.popleft()
+            for next_cell in neighbors[cell]:
+                if row[next_cell] == UNREACHABLE:
+                    row[next_cell] = row[cell] + 1
+                    queue.append(next_cell)
+        distances[source * num_cells : (source + 1) * num_cells] = array("H", row)
+    return distances
+
+
+def cache_dir() -> str:
+    """Where compiled maps and what is derived from them (agent tours) are cached."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "snake", "maps")
+
+
+def load_map(name: str | None = None) -> MapSpec:
+    """
+    Compiled map by module name (`led_map`, `led_map_v2` or a dotted module path),
+    `$SNAKE_MAP` by default. Served from the disk cache when the map didn't change.
+    """
+    name = name or os.environ.get("SNAKE_MAP", DEFAULT_MAP)
+    module = importlib.import_module(name if "." in name else f"snake.{name}")
+    digest = map_hash(module)
+    path = os.path.join(cache_dir(), f"{module.__name__}-{digest[:16]}.pickle")
+    try:
+        with open(path, "rb") as f:
+            spec = pickle.load(f)
+        if isinstance(spec, MapSpec) and spec.hash == digest:
+            return spec
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        pass
+
+    spec = compile_map(module)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(spec, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not cache the compiled map in %s: %s", path, e)
+    return spec
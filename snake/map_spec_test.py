@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from snake import led_map, led_map_v2
+from snake.const import DIRECTIONS, UP
+from snake.map_spec import UNREACHABLE, compile_map, load_map
+from snake.types import Direction, Point
+
+
+def _reference_move(module, head: Point, direction: Direction) -> tuple[Point, bool]:
+    """The original get_next_head and portal direction flip."""
+    width = len(module.MAP[0])
+    new_head = Point((head.x + direction.x) % width, head.y + direction.y)
+    if head in module.PORTALS and direction == UP:
+        new_head = Point(*module.PORTALS[head])
+    flip = new_head in module.PORTALS and head in module.PORTALS and direction == UP
+    return new_head, flip
+
+
+@pytest.mark.parametrize("module", [led_map, led_map_v2])
+def test_tables_match_map_module(module):
+    spec = compile_map(module)
+    assert spec.rows() == module.MAP
+    for cell in range(spec.num_cells):
+        head = spec.point(cell)
+        assert spec.blocked[cell] == module.is_blocked(head.x, head.y)
+        for d, direction in enumerate(DIRECTIONS):
+            new_head, flip = _reference_move(module, head, direction)
+            expected = spec.cell(new_head) if 0 <= new_head.y < spec.height else -1
+            assert spec.next_cell[cell * 4 + d] == expected
+            assert spec.flips[cell * 4 + d] == flip
+
+
+def test_distances():
+    spec = compile_map(led_map_v2)
+    for a in spec.open_cells:
+        assert spec.distance(a, a) == 0
+        for next_cell in spec.next_cell[a * 4 : a * 4 + 4]:
+            if next_cell >= 0 and not spec.blocked[next_cell]:
+                assert spec.distance(a, next_cell) == 1
+                for b in spec.open_cells:
+                    assert spec.distance(a, b) <= spec.distance(next_cell, b) + 1
+    blocked = spec.blocked.index(True)
+    assert spec.distance(spec.open_cells[0], blocked) == UNREACHABLE
+    # Going left from x=0 wraps around
+    assert spec.distance(spec.cell(Point(0, 4)), spec.cell(Point(13, 4))) == 1
+
+
+def test_load_map_uses_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    spec = load_map("led_map")
+    assert spec.name == "led_map" and spec.num_pixels == led_map.NUM_PIXELS
+    (cached,) = os.listdir(tmp_path / "snake" / "maps")
+    assert load_map("led_map") == spec
+    monkeypatch.setenv("SNAKE_MAP", "led_map_v2")
+    assert load_map().name == "led_map_v2"
+    assert os.listdir(tmp_path / "snake" / "maps") != [cached]
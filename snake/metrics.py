@@ -0,0 +1,243 @@
+import contextlib
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """
+    Log-bucketed histogram of durations in nanoseconds.
+
+    Values below 16 ns get exact buckets, above that every power of two is split
+    into 8 buckets (~9% resolution). Recording is a couple of integer operations
+    and histograms from several processes can be merged.
+    """
+
+    SUB_BUCKETS = 8
+    NUM_BUCKETS = 16 + 60 * SUB_BUCKETS
+
+    def __init__(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def bucket(ns: int) -> int:
+        if ns < 16:
+            return max(ns, 0)
+        bits = ns.bit_length()
+        return 16 + (bits - 5) * 8 + ((ns >> (bits - 4)) & 7)
+
+    @staticmethod
+    def bucket_upper_bound(index: int) -> int:
+        if index < 16:
+            return index
+        bits, mantissa = divmod(index - 16, 8)
+        return ((9 + mantissa) << (bits + 1)) - 1
+
+    def record(self, ns: int):
+        self.counts[self.bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def merge(self, other: "Histogram"):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def clear(self):
+        self.counts = [0] * self.NUM_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def percentile(self, q: float) -> int:
+        """Upper bound of the bucket holding the q-th percentile (0 <= q <= 100)."""
+        if self.count == 0:
+            return 0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bucket_upper_bound(i), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary_us(self) -> dict[str, float]:
+        """Count, mean and percentiles in microseconds."""
+        return {
+            "count": self.count,
+            "mean": round(self.mean() / 1000, 3),
+            "p50": round(self.percentile(50) / 1000, 3),
+            "p90": round(self.percentile(90) / 1000, 3),
+            "p99": round(self.percentile(99) / 1000, 3),
+            "max": round(self.max / 1000, 3),
+        }
+
+
+class RollingHistogram:
+    """
+    Histogram over roughly the last `window` seconds.
+
+    Samples go into the current histogram; every `window` seconds it becomes the
+    previous one and a fresh one starts. Reads cover both, so they span between
+    one and two windows of recent samples. `total` keeps everything since start.
+    """
+
+    def __init__(self, window: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.clock = clock
+        self.current = Histogram()
+        self.previous = Histogram()
+        self.total = Histogram()
+        self._rotate_at = clock() + window
+
+    def record(self, ns: int):
+        self._rotate()
+        self.current.record(ns)
+        self.total.record(ns)
+
+    def snapshot(self) -> Histogram:
+        self._rotate()
+        merged = Histogram()
+        merged.merge(self.previous)
+        merged.merge(self.current)
+        return merged
+
+    def _rotate(self):
+        now = self.clock()
+        if now >= self._rotate_at:
+            # After a whole idle window the previous samples are too old as well
+            idle = now - self._rotate_at >= self.window
+            self.previous = Histogram() if idle else self.current
+            self.current = Histogram()
+            self._rotate_at = now + self.window
+
+
+class _Timer:
+    # One per `with`, so nested timers and timers on other threads keep their own start
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram: RollingHistogram | Histogram):
+        self.histogram = histogram
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.record(time.perf_counter_ns() - self.start)
+
+
+class Metrics:
+    """
+    Registry of timings and counters for the game loop.
+
+    `with metrics.timer("update_game"): ...` costs two perf_counter_ns() calls.
+    Histograms and counters owned elsewhere (e.g. by the LED writer) can be
+    attached with `add_histogram` and `add_gauge`.
+    """
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self.histograms: dict[str, RollingHistogram | Histogram] = {}
+        self.counters: dict[str, int] = {}
+        self.gauges: dict[str, Callable[[], float]] = {}
+
+    def _histogram(self, name: str) -> RollingHistogram | Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = RollingHistogram(self.window)
+        return histogram
+
+    def timer(self, name: str) -> _Timer:
+        return _Timer(self._histogram(name))
+
+    def record(self, name: str, ns: int):
+        self._histogram(name).record(ns)
+
+    def increment(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_histogram(self, name: str, histogram: Histogram):
+        self.histograms[name] = histogram
+
+    def add_gauge(self, name: str, read: Callable[[], float]):
+        self.gauges[name] = read
+
+    def to_prometheus(self, prefix: str = "snake") -> str:
+        """Metrics in the Prometheus text exposition format, durations in seconds."""
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            if isinstance(histogram, RollingHistogram):
+                recent, total = histogram.snapshot(), histogram.total
+            else:
+                recent = total = histogram
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'{metric}{{quantile="{q}"}} {recent.percentile(q * 100) / 1e9:.9f}')
+            lines.append(f"{metric}_sum {total.total / 1e9:.9f}")
+            lines.append(f"{metric}_count {total.count}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, read in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {read()}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """Writes the metrics atomically, e.g. for the node_exporter textfile collector."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def serve_unix_socket(self, path: str) -> threading.Thread:
+        """Answers every connection on a Unix socket with the current metrics."""
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen()
+
+        def serve():
+            while True:
+                connection, _ = server.accept()
+                with connection:
+                    connection.sendall(self.to_prometheus().encode())
+
+        thread = threading.Thread(target=serve, name="metrics-socket", daemon=True)
+        thread.start()
+        return thread
+
+    def export_periodically(self, path: str, interval: float = 10.0) -> threading.Thread:
+        def export():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    logger.warning("Could not write metrics to %s: %s", path, e)
+
+        thread = threading.Thread(target=export, name="metrics-file", daemon=True)
+        thread.start()
+        return thread
+
+
+METRICS = Metrics()
@@ -0,0 +1,80 @@
+import random
+import threading
+import time
+
+from snake.metrics import Histogram, Metrics, RollingHistogram
+
+
+def test_bucket_bounds():
+    for ns in list(range(2000)) + [random.randrange(1, 10**12) for _ in range(2000)]:
+        index = Histogram.bucket(ns)
+        assert ns <= Histogram.bucket_upper_bound(index)
+        assert index == 0 or Histogram.bucket_upper_bound(index - 1) < ns
+
+
+def test_percentiles_within_bucket_resolution():
+    histogram = Histogram()
+    for ns in range(1000, 101000, 100):
+        histogram.record(ns)
+    assert 50000 <= histogram.percentile(50) <= 50000 * 1.13
+    assert histogram.percentile(100) == histogram.max == 100900
+
+
+def test_merge():
+    a, b = Histogram(), Histogram()
+    a.record(10)
+    b.record(1000)
+    a.merge(b)
+    assert a.count == 2
+    assert a.max == 1000
+    assert a.total == 1010
+
+
+def test_rolling_histogram_forgets_old_samples():
+    now = [0.0]
+    histogram = RollingHistogram(window=10, clock=lambda: now[0])
+    histogram.record(1000)
+    now[0] = 11
+    histogram.record(5000)
+    assert histogram.snapshot().count == 2
+    now[0] = 22
+    assert histogram.snapshot().count == 1
+    now[0] = 50
+    assert histogram.snapshot().count == 0
+    assert histogram.total.count == 2
+
+
+def test_nested_and_concurrent_timers():
+    metrics = Metrics()
+    entered = threading.Barrier(2)
+
+    def inner():
+        with metrics.timer("step"):
+            entered.wait()
+
+    with metrics.timer("step"):
+        time.sleep(0.002)
+        thread = threading.Thread(target=inner)
+        thread.start()
+        entered.wait()
+        thread.join()
+        with metrics.timer("step"):
+            pass
+    # The outer timer wasn't restarted by the nested and the concurrent ones
+    histogram = metrics.histograms["step"].total
+    assert histogram.count == 3
+    assert histogram.max >= 2_000_000
+
+
+def test_prometheus_export(tmp_path):
+    metrics = Metrics()
+    with metrics.timer("update_game"):
+        pass
+    metrics.increment("missed_deadlines_agent", 2)
+    metrics.add_gauge("led_frames_dropped", lambda: 3)
+    metrics.write_textfile(str(tmp_path / "snake.prom"))
+    text = (tmp_path / "snake.prom").read_text()
+    assert 'snake_update_game_seconds{quantile="0.99"}' in text
+    assert "snake_update_game_seconds_count 1" in text
+    assert "snake_missed_deadlines_agent_total 2" in text
+    assert "snake_led_frames_dropped 3" in text
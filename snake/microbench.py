@@ -0,0 +1,279 @@
+"""
+Micro-benchmarks of the hot paths.
+
+Every benchmark builds its fixture once (seeded, so the boards are the same on
+every run) and times a small operation in a loop, timeit style: the loop count
+is calibrated to `min_time`, the garbage collector is off while timing and the
+best of `repeat` runs is reported as nanoseconds per operation.
+
+    snake-bench micro --save-baseline bench/baseline.json
+    snake-bench micro --baseline bench/baseline.json --threshold 0.2
+
+Against a baseline, a benchmark regressed when it got slower by more than
+`threshold` (a fraction). Baselines are only comparable on the same machine
+and Python version, both are stored with the numbers.
+"""
+
+import fnmatch
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+from snake import snake_game
+from snake.agent import agent_move, agent_move_bfs
+from snake.const import DIRECTIONS
+from snake.tour_agent import agent_move_tour
+from snake.types import Point
+
+# setup() -> (operation, operations per call)
+Setup = Callable[[], tuple[Callable[[], object], int]]
+BENCHMARKS: dict[str, Setup] = {}
+
+DEFAULT_THRESHOLD = 0.2
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def _played_game(length: int, seed: int = 0) -> snake_game.SnakeGame:
+    """A game played by the BFS agent until the snake is `length` long."""
+    game = snake_game.SnakeGame(seed=seed)
+    game.initialize_game()
+    while len(game.snake) < length:
+        if game.game_over:
+            game.initialize_game()
+        if (direction := agent_move_bfs(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+    return game
+
+
+def _nearly_full_game(free_cells: int) -> snake_game.SnakeGame:
+    game = snake_game.SnakeGame(seed=0)
+    game.initialize_game()
+    game.snake = [snake_game.MAP.point(cell) for cell in snake_game.MAP.open_cells[free_cells:]]
+    return game
+
+
+def _points() -> list[Point]:
+    return [Point(x, y) for y in range(snake_game.HEIGHT) for x in range(snake_game.WIDTH)]
+
+
+@benchmark("get_next_head")
+def _get_next_head():
+    moves = [
+        (snake_game.MAP.point(cell), direction)
+        for cell in snake_game.MAP.open_cells
+        for direction in DIRECTIONS
+    ]
+    get_next_head = snake_game.get_next_head
+
+    def run():
+        for head, direction in moves:
+            get_next_head(head, direction)
+
+    return run, len(moves)
+
+
+def _is_safe(length: int, step: str):
+    def setup():
+        game = _played_game(length)
+        steps = {"0": 0, "half": len(game.snake) // 2, "len": len(game.snake)}[step]
+        points = _points()
+        is_safe = game.is_safe
+
+        def run():
+            for point in points:
+                is_safe(point, steps)
+
+        return run, len(points)
+
+    return setup
+
+
+for _length in (3, 40):
+    for _step in ("0", "half", "len"):
+        benchmark(f"is_safe[len={_length},step={_step}]")(_is_safe(_length, _step))
+
+
+@benchmark("update_game")
+def _update_game():
+    # A recorded stretch of BFS play, replayed from a snapshot
+    game = _played_game(10)
+    snapshot = game.snapshot()
+    moves = []
+    while len(moves) < 200 and not game.game_over:
+        moves.append(agent_move_bfs(game))
+        game.apply_move(moves[-1])
+
+    def run():
+        game.restore(snapshot)
+        for direction in moves:
+            if direction is not None:
+                game.set_next_direction(direction)
+            game.update_game()
+
+    return run, len(moves)
+
+
+@benchmark("place_food[free=5]")
+def _place_food():
+    game = _nearly_full_game(5)
+    return game._place_food, 1
+
+
+def _agent(agent, length: int):
+    def setup():
+        game = _played_game(length)
+        return (lambda: agent(game)), 1
+
+    return setup
+
+
+for _length in (3, 40):
+    benchmark(f"agent_move[len={_length}]")(_agent(agent_move, _length))
+    benchmark(f"agent_move_bfs[len={_length}]")(_agent(agent_move_bfs, _length))
+    benchmark(f"agent_move_tour[len={_length}]")(_agent(agent_move_tour, _length))
+
+
+@benchmark("ml.get_state")
+def _get_state():
+    from snake.ml_agent.agent import get_state
+
+    game = _played_game(20)
+    return (lambda: get_state(game)), 1
+
+
+@benchmark("ml.encoder")
+def _encoder():
+    from snake.ml_agent.observation import ObservationEncoder
+
+    encoder = ObservationEncoder()
+    game = _played_game(20)
+    return (lambda: encoder.encode(game)), 1
+
+
+@benchmark("ml.dqn_forward")
+def _dqn_forward():
+    import numpy as np
+
+    from snake.ml_agent.agent import N_ACTIONS, N_OBSERVATIONS
+    from snake.ml_agent.numpy_model import NumpyDQN, random_weights
+
+    model = NumpyDQN(random_weights(N_OBSERVATIONS, N_ACTIONS, seed=0))
+    state = np.random.default_rng(0).random(N_OBSERVATIONS, dtype=np.float32)
+    return (lambda: model(state)), 1
+
+
+@benchmark("draw_game[led]")
+def _draw_game():
+    from snake import main
+    from snake.framebuffer import LedFramebuffer
+    from snake.led_output import FakePixelStrip
+
+    strip = FakePixelStrip(snake_game.MAP.num_pixels, keep_frames=False)
+    framebuffer = LedFramebuffer(
+        strip, snake_game.MAP.rows(), snake_game.MAP.num_pixels, main.DARK
+    )
+    # Two consecutive positions and the cells the tick changed, drawn back and
+    # forth like the game loop does, so every frame moves the head and the tail
+    game = _played_game(20)
+    before = game.clone()
+    changed = game.update_game()
+    frames = [
+        [(point, main.cell_color(state, point)) for point in changed] for state in (before, game)
+    ]
+    framebuffer.render(main.game_cells(before))
+
+    def run():
+        for cells in frames:
+            framebuffer.update(cells)
+
+    return run, len(frames)
+
+
+def _time(operation: Callable[[], object], loops: int) -> float:
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            operation()
+        return time.perf_counter() - start
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def measure(setup: Setup, min_time: float = 0.1, repeat: int = 5) -> dict:
+    operation, ops_per_call = setup()
+    loops = 1
+    while (elapsed := _time(operation, loops)) < min_time / 10:
+        loops *= 10
+    loops = max(1, round(loops * min_time / elapsed))
+    samples = [_time(operation, loops) * 1e9 / (loops * ops_per_call) for _ in range(repeat)]
+    return {
+        "ns_per_op": round(min(samples), 2),
+        "median_ns": round(statistics.median(samples), 2),
+        "ops": loops * ops_per_call,
+    }
+
+
+def run(patterns: list[str] | None = None, min_time: float = 0.1, repeat: int = 5) -> dict:
+    """Runs the benchmarks matching any of the glob `patterns` (all by default)."""
+    results: dict[str, dict] = {}
+    for name, setup in BENCHMARKS.items():
+        if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        try:
+            results[name] = measure(setup, min_time, repeat)
+        except ImportError as e:
+            # ML benchmarks need the optional numpy dependency
+            results[name] = {"skipped": str(e)}
+    return {
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> dict:
+    """Current / baseline time of every benchmark in both, and the ones that regressed."""
+    ratios = {}
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        before = baseline["benchmarks"].get(name, {}).get("ns_per_op")
+        if before is None or "ns_per_op" not in result:
+            continue
+        ratios[name] = round(result["ns_per_op"] / before, 3)
+        if ratios[name] > 1 + threshold:
+            regressions.append(name)
+    return {
+        "threshold": threshold,
+        "same_environment": all(
+            report[key] == baseline.get(key) for key in ("python", "machine", "platform")
+        ),
+        "ratios": ratios,
+        "regressions": regressions,
+    }
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
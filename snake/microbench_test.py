@@ -0,0 +1,37 @@
+from snake import microbench
+
+
+def test_every_benchmark_runs():
+    report = microbench.run(min_time=0.001, repeat=1)
+    assert set(report["benchmarks"]) == set(microbench.BENCHMARKS)
+    for name, result in report["benchmarks"].items():
+        assert "skipped" in result or result["ns_per_op"] > 0, name
+
+
+def test_filter_by_glob():
+    report = microbench.run(["is_safe[len=3,*", "get_next_head"], min_time=0.001, repeat=1)
+    assert sorted(report["benchmarks"]) == [
+        "get_next_head",
+        "is_safe[len=3,step=0]",
+        "is_safe[len=3,step=half]",
+        "is_safe[len=3,step=len]",
+    ]
+
+
+def test_compare_flags_slowdowns_over_threshold(tmp_path):
+    baseline = {
+        "python": "3.11.7",
+        "machine": "x86_64",
+        "platform": "Linux",
+        "benchmarks": {"a": {"ns_per_op": 100.0}, "b": {"ns_per_op": 100.0}},
+    }
+    path = tmp_path / "baseline.json"
+    microbench.save_baseline(baseline, path)
+    report = dict(
+        baseline,
+        benchmarks={"a": {"ns_per_op": 119.0}, "b": {"ns_per_op": 130.0}, "c": {"ns_per_op": 1.0}},
+    )
+    comparison = microbench.compare(report, microbench.load_baseline(path), threshold=0.2)
+    assert comparison["ratios"] == {"a": 1.19, "b": 1.3}
+    assert comparison["regressions"] == ["b"]
+    assert comparison["same_environment"]
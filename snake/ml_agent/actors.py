@@ -0,0 +1,256 @@
+"""
+Actor processes for `snake-train --actors N`.
+
+Every actor steps its own `VecSnakeGame` with its own epsilon schedule and
+writes the transitions into a replay buffer in shared memory. The learner (in
+`train.py`) samples from that buffer, trains the `DQN` and publishes its weights
+to a shared block that the actors poll between steps.
+
+Actors only need NumPy: they play with `NumpyDQN`, and as long as the learner
+was started from the torch-free `train_main` they don't import torch or compete
+with the learner for its threads.
+
+- The replay buffer has one ring buffer (shard) per actor, so every row has a
+  single writer and no lock is needed. An actor bumps its `written` counter
+  after the rows are in place, the learner only samples rows that were written.
+  A sampled row can be overwritten while it is copied once its shard wrapped
+  around, which only swaps one old transition for a newer one.
+- The weights are published seqlock style: the version is odd while the learner
+  writes, and an actor keeps its copy if the version changed while it read.
+"""
+
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from snake.ml_agent.agent import N_ACTIONS
+from snake.ml_agent.numpy_model import LAYERS, NumpyDQN
+from snake.ml_agent.observation import encode_vec
+from snake.vec_game import VecSnakeGame
+
+
+class SharedArrays:
+    """
+    NumPy arrays laid out in one shared memory block. Pickling sends the block's
+    name, the copy in another process attaches to the same memory.
+    """
+
+    def __init__(self, fields: list[tuple[str, tuple, str]], name: str | None = None):
+        self.fields = fields
+        sizes = [int(np.prod(shape)) * np.dtype(dtype).itemsize for _, shape, dtype in fields]
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, sum(sizes)))
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.arrays: dict[str, np.ndarray] = {}
+        offset = 0
+        for (key, shape, dtype), size in zip(fields, sizes):
+            self.arrays[key] = np.ndarray(shape, dtype, buffer=self.shm.buf, offset=offset)
+            offset += size
+
+    def __reduce__(self):
+        return SharedArrays, (self.fields, self.shm.name)
+
+    def close(self):
+        # Views into the block have to go before the block can be closed
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self):
+        """Frees the block, called once by the process that created it."""
+        self.shm.unlink()
+
+
+class SharedReplayBuffer:
+    """
+    `train.ReplayBuffer` in shared memory, with one ring buffer per actor. Actors
+    `push` into their own shard, the learner `sample`s across all of them.
+    """
+
+    def __init__(self, capacity: int, n_observations: int, num_shards: int):
+        self.num_shards = num_shards
+        self.shard_capacity = max(1, capacity // num_shards)
+        rows = self.shard_capacity * num_shards
+        self._attach(
+            SharedArrays(
+                [
+                    ("states", (rows, n_observations), "float32"),
+                    ("actions", (rows,), "int64"),
+                    ("rewards", (rows,), "float32"),
+                    ("next_states", (rows, n_observations), "float32"),
+                    ("dones", (rows,), "bool"),
+                    ("written", (num_shards,), "int64"),  # Transitions pushed per shard, ever
+                ]
+            )
+        )
+
+    def _attach(self, shared: SharedArrays):
+        self.shared = shared
+        for key, array in shared.arrays.items():
+            setattr(self, key, array)
+
+    def __getstate__(self):
+        return self.num_shards, self.shard_capacity, self.shared
+
+    def __setstate__(self, state):
+        self.num_shards, self.shard_capacity, shared = state
+        self._attach(shared)
+
+    def push(self, shard: int, states, actions, rewards, next_states, dones):
+        """Stores a batch of transitions in `shard`, overwriting its oldest ones when full."""
+        n = len(actions)
+        written = self.written[shard]
+        index = shard * self.shard_capacity + (written + np.arange(n)) % self.shard_capacity
+        self.states[index] = states
+        self.actions[index] = actions
+        self.rewards[index] = rewards
+        self.next_states[index] = next_states
+        self.dones[index] = dones
+        # Published last, the learner doesn't sample rows that aren't written yet
+        self.written[shard] = written + n
+
+    def sizes(self) -> np.ndarray:
+        return np.minimum(self.written, self.shard_capacity)
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        sizes = self.sizes()
+        ends = np.cumsum(sizes)
+        flat = rng.integers(0, ends[-1], batch_size)
+        shard = np.searchsorted(ends, flat, side="right")
+        index = shard * self.shard_capacity + flat - (ends[shard] - sizes[shard])
+        return (
+            self.states[index],
+            self.actions[index],
+            self.rewards[index],
+            self.next_states[index],
+            self.dones[index],
+        )
+
+    def __len__(self):
+        return int(self.sizes().sum())
+
+    def close(self):
+        for key in self.shared.arrays:
+            delattr(self, key)
+        self.shared.close()
+
+    def unlink(self):
+        self.shared.unlink()
+
+
+def weight_fields(n_observations: int, n_actions: int) -> list[tuple[str, tuple, str]]:
+    """Shapes of the `DQN` state_dict entries, in state_dict order."""
+    sizes = [n_observations, n_observations * 2, n_observations, n_actions * 2, n_actions]
+    fields = []
+    for layer, n_in, n_out in zip(LAYERS, sizes, sizes[1:]):
+        fields.append((f"{layer}.weight", (n_out, n_in), "float32"))
+        fields.append((f"{layer}.bias", (n_out,), "float32"))
+    return fields
+
+
+class SharedWeights:
+    """The learner's latest weights, published to the actors."""
+
+    def __init__(self, n_observations: int, n_actions: int):
+        self.shared = SharedArrays(
+            [("version", (1,), "int64")] + weight_fields(n_observations, n_actions)
+        )
+
+    def publish(self, weights: dict[str, np.ndarray]):
+        arrays = self.shared.arrays
+        version = arrays["version"]
+        version[0] += 1
+        for key, value in weights.items():
+            arrays[key][...] = value
+        version[0] += 1
+
+    def read(self, known_version: int) -> tuple[dict[str, np.ndarray] | None, int]:
+        """Copies of the weights if newer than `known_version`, and their version."""
+        arrays = self.shared.arrays
+        version = int(arrays["version"][0])
+        if version == known_version or version % 2:
+            return None, known_version
+        weights = {key: value.copy() for key, value in arrays.items() if key != "version"}
+        if int(arrays["version"][0]) != version:
+            # Published again while copying, try on the next poll
+            return None, known_version
+        return weights, version
+
+    def close(self):
+        self.shared.close()
+
+    def unlink(self):
+        self.shared.unlink()
+
+
+class ActorConfig(NamedTuple):
+    index: int
+    num_envs: int
+    seed: int
+    max_steps: int
+    eps_start: float
+    eps_end: float
+    eps_decay: float  # In this actor's own environment steps
+
+
+def actor_epsilons(num_actors: int, eps_end: float, eps_max: float) -> list[float]:
+    """
+    Final epsilon per actor, spread geometrically from `eps_max` down to
+    `eps_end` (Ape-X), so some actors keep exploring while others play greedily.
+    A single actor ends at `eps_end`, like the single-process trainer.
+    """
+    if num_actors == 1:
+        return [eps_end]
+    return [
+        eps_max ** (1 - i / (num_actors - 1)) * eps_end ** (i / (num_actors - 1))
+        for i in range(num_actors)
+    ]
+
+
+def epsilon(config: ActorConfig, steps: int) -> float:
+    return config.eps_end + (config.eps_start - config.eps_end) * np.exp(-steps / config.eps_decay)
+
+
+def run_actor(
+    config: ActorConfig, memory: SharedReplayBuffer, weights: SharedWeights, episodes, stop
+):
+    """
+    Actor process: plays until `stop` is set, pushing every transition into its
+    shard of `memory` and the lengths of finished episodes into the `episodes` queue.
+    """
+    rng = np.random.default_rng(config.seed)
+    vec = VecSnakeGame(config.num_envs, seed=config.seed)
+    n_observations = memory.states.shape[1]
+    states = np.zeros((config.num_envs, n_observations), dtype=np.float32)
+    next_states = np.zeros_like(states)
+    model = None
+    version = 0
+    steps = 0
+    try:
+        while not stop.is_set():
+            latest, version = weights.read(version)
+            if latest is not None:
+                model = NumpyDQN(latest)
+
+            encode_vec(vec, states)
+            actions = rng.integers(0, N_ACTIONS, config.num_envs)
+            greedy = rng.random(config.num_envs) > epsilon(config, steps)
+            if model is not None and greedy.any():
+                actions[greedy] = model.forward_batch(states[greedy]).argmax(1)
+            rewards, dones = vec.step(actions, auto_reset=False)
+            encode_vec(vec, next_states)
+            memory.push(config.index, states, actions, rewards, next_states, dones)
+            steps += config.num_envs
+
+            ended = dones | (vec.steps >= config.max_steps)
+            if ended.any():
+                episodes.put(vec.length[ended].tolist())
+                vec.reset(ended)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Don't wait for the learner to read the last episodes when exiting
+        episodes.cancel_join_thread()
+        memory.close()
+        weights.close()
@@ -0,0 +1,111 @@
+import multiprocessing
+import pickle
+import sys
+
+import numpy as np
+import pytest
+
+from snake.ml_agent import train_main
+from snake.ml_agent.actors import (
+    ActorConfig,
+    SharedReplayBuffer,
+    SharedWeights,
+    actor_epsilons,
+    run_actor,
+    weight_fields,
+)
+from snake.ml_agent.agent import N_ACTIONS, N_OBSERVATIONS
+from snake.ml_agent.numpy_model import random_weights
+
+
+@pytest.fixture
+def memory():
+    memory = SharedReplayBuffer(8, 2, num_shards=2)
+    yield memory
+    memory.close()
+    memory.unlink()
+
+
+def _push(memory, shard, actions):
+    states = np.full((len(actions), 2), shard, dtype=np.float32)
+    n = len(actions)
+    memory.push(shard, states, np.array(actions), np.zeros(n), states, np.zeros(n, dtype=bool))
+
+
+def test_replay_buffer_shards_wrap_around(memory):
+    _push(memory, 0, [0, 1, 2])
+    assert len(memory) == 3
+    _push(memory, 1, [10, 11, 12, 13, 14, 15])
+    # Each shard keeps its 4 newest transitions
+    assert len(memory) == 7
+    assert sorted(memory.actions[4:]) == [12, 13, 14, 15]
+    states, actions, _, _, _ = memory.sample(64, np.random.default_rng(0))
+    assert set(actions) == {0, 1, 2, 12, 13, 14, 15}
+    # Rows come from the shard that wrote them
+    assert np.all(states[:, 0] == (actions >= 10))
+
+
+def test_replay_buffer_is_shared_when_pickled(memory):
+    other = pickle.loads(pickle.dumps(memory))
+    try:
+        _push(other, 1, [7])
+        assert len(memory) == 1 and memory.actions[4] == 7
+    finally:
+        other.close()
+
+
+def test_weights_are_read_once_per_publish():
+    weights = SharedWeights(6, 2)
+    try:
+        assert [key for key, _, _ in weight_fields(6, 2)] == list(random_weights(6, 2))
+        published = random_weights(6, 2, seed=0)
+        weights.publish(published)
+        latest, version = weights.read(0)
+        assert version == 2
+        for key, value in published.items():
+            np.testing.assert_array_equal(latest[key], value)
+        assert weights.read(version) == (None, version)
+    finally:
+        weights.close()
+        weights.unlink()
+
+
+def test_actor_epsilons():
+    assert actor_epsilons(1, 0.01, 0.4) == [0.01]
+    epsilons = actor_epsilons(4, 0.01, 0.4)
+    assert epsilons[0] == pytest.approx(0.4) and epsilons[-1] == pytest.approx(0.01)
+    assert epsilons == sorted(epsilons, reverse=True)
+
+
+def _run_actor_and_report(result, *args):
+    run_actor(*args)
+    result.put("torch" in sys.modules)
+
+
+def test_spawned_actors_do_not_import_torch(monkeypatch):
+    # As when started by snake-train, spawning imports the parent's __main__ in the actor
+    monkeypatch.setitem(sys.modules, "__main__", train_main)
+    context = multiprocessing.get_context("spawn")
+    memory = SharedReplayBuffer(64, N_OBSERVATIONS, num_shards=1)
+    weights = SharedWeights(N_OBSERVATIONS, N_ACTIONS)
+    episodes, result, stop = context.Queue(), context.Queue(), context.Event()
+    config = ActorConfig(
+        index=0, num_envs=2, seed=0, max_steps=10, eps_start=0.9, eps_end=0.05, eps_decay=100
+    )
+    actor = context.Process(
+        target=_run_actor_and_report, args=(result, config, memory, weights, episodes, stop)
+    )
+    actor.start()
+    try:
+        assert episodes.get(timeout=60)
+        stop.set()
+        assert result.get(timeout=60) is False
+        actor.join(timeout=10)
+        assert actor.exitcode == 0
+    finally:
+        if actor.is_alive():
+            actor.terminate()
+        memory.close()
+        memory.unlink()
+        weights.close()
+        weights.unlink()
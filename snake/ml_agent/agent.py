@@ -1,18 +1,26 @@
+import logging
 import pathlib
+import threading
 from typing import Optional
 
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.nn.functional as F
 
-from snake import led_map_v2 as led_map
 from snake import snake_game
 from snake.const import DIRECTIONS
+from snake.ml_agent.numpy_model import NumpyDQN, load_weights
+from snake.ml_agent.observation import ObservationEncoder
 from snake.types import Direction
 
-WIDTH = len(led_map.MAP[0])  # 14
-HEIGHT = len(led_map.MAP)  # 8
+WIDTH = snake_game.WIDTH  # 14
+HEIGHT = snake_game.HEIGHT  # 10
+
+logger = logging.getLogger(__name__)
+
+N_ACTIONS = 4  # UP, DOWN, LEFT, RIGHT
+N_OBSERVATIONS = WIDTH * HEIGHT * 2
+POLICY_NUMBER = 1600
+# Discount the policy was trained with (train.GAMMA), for the lookahead values
+GAMMA = 0.90
 
 
 def get_state(game: snake_game.SnakeGame):
@@ -24,77 +32,91 @@ def get_state(game: snake_game.SnakeGame):
     return state.flatten()
 
 
-class DQN(nn.Module):
+def __getattr__(name):
+    # The torch model is only needed for training and exporting, keep torch out of
+    # the import path of the game itself.
+    if name == "DQN":
+        from snake.ml_agent.model import DQN
 
-    def __init__(self, n_observations, n_actions):
-        super(DQN, self).__init__()
-        self.layer1 = nn.Linear(n_observations, n_observations * 2)
-        self.layer2 = nn.Linear(n_observations * 2, n_observations)
-        self.layer3 = nn.Linear(n_observations, n_actions * 2)
-        self.layer4 = nn.Linear(n_actions * 2, n_actions)
+        return DQN
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    # Called with either one element to determine next action, or a batch
-    # during optimization. Returns tensor([[left0exp,right0exp]...]).
-    def forward(self, x):
-        x = F.leaky_relu(self.layer1(x))
-        x = F.leaky_relu(self.layer2(x))
-        x = F.leaky_relu(self.layer3(x))
-        return self.layer4(x)
 
+def _policy_paths(suffix: str) -> list[pathlib.Path]:
+    # Try to find policy files in multiple locations
+    return [
+        pathlib.Path(__file__).parent / f"policy_{POLICY_NUMBER}{suffix}",
+        pathlib.Path(__file__).parent.parent.parent / f"policy_{POLICY_NUMBER}{suffix}",
+    ]
 
-# Global model instance
-_model: Optional[DQN] = None
-_device = torch.device(
-    "cuda" if torch.cuda.is_available() else "mps" if torch.backends.mps.is_available() else "cpu"
-)
 
+def _find_policy(suffix: str) -> Optional[pathlib.Path]:
+    for path in _policy_paths(suffix):
+        if path.exists():
+            return path
+    return None
 
-def _load_model() -> DQN:
-    """Load the trained model from checkpoint file."""
-    global _model
 
-    if _model is not None:
-        return _model
+# Global model instance, loaded once under the lock: the warm-up and agent threads race for it
+_inference_model: Optional[NumpyDQN] = None
+_load_lock = threading.Lock()
+_encoder = ObservationEncoder()
+# Successor observations for the lookahead, one row per action
+_successor_encoder = ObservationEncoder()
+_successors = np.zeros((N_ACTIONS, N_OBSERVATIONS), dtype=np.float32)
 
-    # Calculate model dimensions
-    n_actions = 4  # UP, DOWN, LEFT, RIGHT
-    n_observations = WIDTH * HEIGHT * 2  # 14 * 8 * 2 = 224
 
-    # Initialize model
-    model = DQN(n_observations, n_actions).to(_device)
+def _checkpoint_weights(checkpoint_path: pathlib.Path) -> dict[str, np.ndarray]:
+    """The state_dict of a torch checkpoint as NumPy arrays, needs torch."""
+    import torch
 
-    # Try to find checkpoint file in multiple locations
-    policy_number = 1600
-    possible_paths = [
-        pathlib.Path(__file__).parent / f"policy_{policy_number}.checkpoint",
-        pathlib.Path(__file__).parent.parent.parent / f"policy_{policy_number}.checkpoint",
-    ]
+    state_dict = torch.load(checkpoint_path, map_location="cpu")
+    return {key: value.cpu().numpy() for key, value in state_dict.items()}
 
-    checkpoint_path = None
-    for path in possible_paths:
-        if path.exists():
-            checkpoint_path = path
-            break
-
-    if checkpoint_path is None:
-        # If no checkpoint found, return untrained model
-        print("Warning: No checkpoint file found. Using untrained model.")
-        print(f"Looked for checkpoint in: {[str(p) for p in possible_paths]}")
-        _model = model
-        return _model
-
-    try:
-        # Load checkpoint
-        checkpoint = torch.load(checkpoint_path, map_location=_device)
-        model.load_state_dict(checkpoint)
-        model.eval()  # Set to evaluation mode
-        print(f"Loaded model from {checkpoint_path}")
-    except Exception as e:
-        print(f"Error loading checkpoint from {checkpoint_path}: {e}")
-        print("Using untrained model.")
-
-    _model = model
-    return _model
+
+def _load_inference_model() -> NumpyDQN:
+    """
+    Load the model used to play.
+
+    Prefers weights exported with `python -m snake.ml_agent.export`, which only
+    need NumPy, and falls back to converting the torch checkpoint when torch is
+    installed. There is no fallback to untrained weights: raises
+    FileNotFoundError when there is no policy and ValueError when the policy
+    doesn't fit the agent's observations.
+    """
+    global _inference_model
+
+    if _inference_model is not None:
+        return _inference_model
+    with _load_lock:
+        if _inference_model is None:
+            _inference_model = _read_policy()
+    return _inference_model
+
+
+def _read_policy() -> NumpyDQN:
+    if (path := _find_policy(".npz") or _find_policy(".int8.npz")) is not None:
+        model = NumpyDQN(load_weights(path))
+    elif (path := _find_policy(".checkpoint")) is not None:
+        model = NumpyDQN(_checkpoint_weights(path))
+    else:
+        paths = [str(p) for suffix in (".npz", ".checkpoint") for p in _policy_paths(suffix)]
+        raise FileNotFoundError(f"No ML agent policy found, looked for {paths}")
+
+    if (model.n_observations, model.n_actions) != (N_OBSERVATIONS, N_ACTIONS):
+        raise ValueError(
+            f"{path} takes {model.n_observations} observations and {model.n_actions} actions, "
+            f"the agent needs {N_OBSERVATIONS} and {N_ACTIONS}"
+        )
+    logger.info("Loaded model from %s", path)
+    return model
+
+
+def warm_up():
+    """Loads the model and runs it once, so the first real decision is fast."""
+    model = _load_inference_model()
+    model(np.zeros(model.n_observations, dtype=np.float32))
+    model(np.zeros((N_ACTIONS, model.n_observations), dtype=np.float32))
 
 
 def agent_move(game: snake_game.SnakeGame) -> Optional[Direction]:
@@ -107,21 +129,16 @@ def agent_move(game: snake_game.SnakeGame) -> Optional[Direction]:
     Returns:
         The best direction to move, or None if no valid move is found
     """
-    model = _load_model()
-
-    # Get current state
-    state = get_state(game)
-    state_tensor = torch.tensor(state, dtype=torch.float32, device=_device).unsqueeze(0)
+    model = _load_inference_model()
 
     # Get Q-values from model
-    with torch.no_grad():
-        q_values = model(state_tensor)
+    action_scores = model(_encoder.encode(game))
 
     # Get action indices sorted by Q-value (highest first)
-    action_scores = q_values[0].cpu().numpy()
     sorted_actions = np.argsort(action_scores)[::-1]  # Descending order
-    print(f"Action scores: {action_scores}")
-    print(f"Sorted actions: {sorted_actions}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Action scores: %s", action_scores)
+        logger.debug("Sorted actions: %s", sorted_actions)
 
     # Try actions in order of Q-value, but only if they're safe
     head = game.snake_head
@@ -136,3 +153,46 @@ def agent_move(game: snake_game.SnakeGame) -> Optional[Direction]:
 
     # No safe move found
     return None
+
+
+def agent_move_lookahead(game: snake_game.SnakeGame) -> Optional[Direction]:
+    """
+    One-step lookahead with the same model as `agent_move`.
+
+    Every move is played on a copy of the game (food that gets eaten is
+    replaced deterministically) and the successor states are scored in one
+    batched forward pass: reward + GAMMA * max Q of the successor, or just the
+    reward when the move ends the game. Moves into unsafe cells and the ignored
+    reverse move are masked out before the argmax.
+    """
+    model = _load_inference_model()
+    head = game.snake_head
+    reverse = Direction(-game.direction.x, -game.direction.y)
+    safe = np.array(
+        [
+            direction != reverse and game.is_safe(snake_game.get_next_head(head, direction))
+            for direction in DIRECTIONS
+        ]
+    )
+    if not safe.any():
+        return None
+
+    lookahead = game.clone(deterministic_food=True)
+    rewards = np.zeros(N_ACTIONS, dtype=np.float32)
+    done = np.zeros(N_ACTIONS, dtype=bool)
+    length = len(game.snake)
+    for action in np.flatnonzero(safe):
+        undo = lookahead.apply_move(DIRECTIONS[action])
+        rewards[action] = len(lookahead.snake) > length
+        done[action] = lookahead.game_over
+        if not lookahead.game_over:
+            _successor_encoder.encode(lookahead, _successors[action])
+        lookahead.undo_move(undo)
+
+    # Rows of masked actions hold stale observations, their values are dropped
+    successor_values = model(_successors).max(axis=1)
+    values = np.where(done, rewards, rewards + GAMMA * successor_values)
+    values[~safe] = -np.inf
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Lookahead values: %s", values)
+    return DIRECTIONS[int(np.argmax(values))]
@@ -0,0 +1,97 @@
+import random
+import threading
+import time
+
+import numpy as np
+
+from snake.const import DIRECTIONS, RIGHT, UP
+from snake.ml_agent import agent
+from snake.ml_agent.agent import N_ACTIONS, N_OBSERVATIONS, agent_move_lookahead, get_state
+from snake.ml_agent.numpy_model import NumpyDQN, random_weights, save_weights
+from snake.snake_game import SnakeGame, get_next_head
+from snake.types import Point
+
+
+class _RecordingModel(NumpyDQN):
+    def __init__(self, weights):
+        super().__init__(weights)
+        self.batches = []
+
+    def __call__(self, state):
+        self.batches.append(np.array(state))
+        return super().__call__(state)
+
+
+def test_lookahead_scores_successor_states(monkeypatch):
+    model = _RecordingModel(random_weights(N_OBSERVATIONS, N_ACTIONS, seed=0))
+    monkeypatch.setattr(agent, "_inference_model", model)
+    random.seed(1)
+    game = SnakeGame()
+    game.initialize_game()
+    for _ in range(300):
+        if game.game_over:
+            game.initialize_game()
+        before = game.snapshot()
+        direction = agent_move_lookahead(game)
+        # The game itself is left alone
+        assert game.snapshot() == before
+        assert direction is None or game.is_safe(get_next_head(game.snake_head, direction))
+
+        # One batched forward pass, with the state after each safe move
+        (batch,) = model.batches
+        model.batches.clear()
+        assert batch.shape == (N_ACTIONS, N_OBSERVATIONS)
+        for action, move in enumerate(DIRECTIONS):
+            successor = game.clone(deterministic_food=True)
+            successor.set_next_direction(move)
+            if successor.direction != move or not game.is_safe(
+                get_next_head(game.snake_head, move)
+            ):
+                continue
+            successor.update_game()
+            if not successor.game_over:
+                np.testing.assert_allclose(batch[action], get_state(successor), atol=1e-6)
+
+        if direction is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+
+
+def test_lookahead_takes_the_food(monkeypatch):
+    # With all Q-values at 0 only the immediate reward counts
+    weights = {name: np.zeros_like(w) for name, w in random_weights(N_OBSERVATIONS, 4).items()}
+    monkeypatch.setattr(agent, "_inference_model", NumpyDQN(weights))
+    game = SnakeGame(seed=2)
+    game.initialize_game()
+    game.snake = [Point(6, 5), Point(5, 5), Point(4, 5)]
+    game.direction = RIGHT
+    game.food = Point(6, 4)
+    assert agent_move_lookahead(game) == UP
+
+
+def test_model_loads_once_across_threads(tmp_path, monkeypatch):
+    path = tmp_path / "policy_1600.npz"
+    save_weights(path, random_weights(N_OBSERVATIONS, N_ACTIONS, seed=0))
+    monkeypatch.setattr(agent, "_policy_paths", lambda suffix: [tmp_path / f"policy_1600{suffix}"])
+    monkeypatch.setattr(agent, "_inference_model", None)
+    loads = []
+
+    def slow_load(path):
+        loads.append(path)
+        time.sleep(0.05)
+        return load_weights(path)
+
+    load_weights = agent.load_weights
+    monkeypatch.setattr(agent, "load_weights", slow_load)
+    # The warm-up thread and the agent worker both ask for the model
+    models = []
+    threads = [
+        threading.Thread(target=lambda: models.append(agent._load_inference_model()))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert models[0] is models[1]
@@ -0,0 +1,69 @@
+"""
+Offline training data from game recordings (see `snake.recording`).
+
+Recorded games are replayed on the fly and encoded with the incremental
+`ObservationEncoder`, so a few bytes per move on disk turn into `get_state`
+observations without regenerating the games.
+"""
+
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from snake.const import DIRECTIONS
+from snake.ml_agent.observation import OBSERVATION_SIZE, ObservationEncoder
+from snake.recording import RecordingReader, replay
+
+
+class ReplayDataset:
+    """
+    Batches of (observation, action) pairs from one or more recording files.
+
+    Observations are float32 (batch, OBSERVATION_SIZE) arrays in the `get_state`
+    layout, actions the int64 index in `const.DIRECTIONS` of the move taken.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self.readers = [RecordingReader(path) for path in paths]
+
+    def __len__(self) -> int:
+        return sum(reader.num_moves() for reader in self.readers)
+
+    def num_games(self) -> int:
+        return sum(len(reader) for reader in self.readers)
+
+    def batches(
+        self,
+        batch_size: int = 128,
+        shuffle: bool = False,
+        seed: int | None = None,
+        drop_last: bool = False,
+    ) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        Yields the moves of every game in order, or in a random game order with
+        `shuffle`. Moves within a game stay consecutive, shuffle the batches on top
+        for decorrelated samples.
+        """
+        games = [(reader, i) for reader in self.readers for i in range(len(reader))]
+        if shuffle:
+            order = np.random.default_rng(seed).permutation(len(games))
+            games = [games[i] for i in order]
+
+        encoder = ObservationEncoder()
+        observations = np.empty((batch_size, OBSERVATION_SIZE), dtype=np.float32)
+        actions = np.empty(batch_size, dtype=np.int64)
+        n = 0
+        for reader, i in games:
+            for game, direction in replay(reader[i]):
+                encoder.encode(game, observations[n])
+                actions[n] = DIRECTIONS.index(direction)
+                n += 1
+                if n == batch_size:
+                    yield observations.copy(), actions.copy()
+                    n = 0
+        if n and not drop_last:
+            yield observations[:n].copy(), actions[:n].copy()
+
+    def close(self):
+        for reader in self.readers:
+            reader.close()
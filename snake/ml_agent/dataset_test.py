@@ -0,0 +1,31 @@
+import numpy as np
+
+from snake.const import DIRECTIONS
+from snake.ml_agent.agent import get_state
+from snake.ml_agent.dataset import ReplayDataset
+from snake.recording import MAGIC, RecordingReader, record_games, replay
+
+
+def test_batches_match_replayed_states(tmp_path):
+    path = str(tmp_path / "bfs.snkr")
+    with open(path, "wb") as f:
+        f.write(MAGIC + record_games("bfs", 3, seed=0, max_steps=200))
+
+    expected_states, expected_actions = [], []
+    for record in RecordingReader(path):
+        for game, direction in replay(record):
+            expected_states.append(get_state(game))
+            expected_actions.append(DIRECTIONS.index(direction))
+
+    dataset = ReplayDataset([path])
+    assert len(dataset) == len(expected_actions)
+    batches = list(dataset.batches(batch_size=64))
+    assert all(len(actions) == 64 for _, actions in batches[:-1])
+    states = np.concatenate([states for states, _ in batches])
+    actions = np.concatenate([actions for _, actions in batches])
+    np.testing.assert_allclose(states, np.array(expected_states), atol=1e-6)
+    np.testing.assert_array_equal(actions, expected_actions)
+
+    shuffled = list(dataset.batches(batch_size=64, shuffle=True, seed=1, drop_last=True))
+    assert sum(len(actions) for _, actions in shuffled) == len(actions) // 64 * 64
+    dataset.close()
@@ -0,0 +1,95 @@
+"""
+Export a DQN checkpoint to NumPy weights for torch-free inference.
+
+    python -m snake.ml_agent.export checkpoints/policy.checkpoint
+        [-o snake/ml_agent/policy_1600.npz] [--int8] [--verify] [--bench 10000]
+
+Without `-o` writes `policy.npz` (or `policy.int8.npz`) next to the checkpoint,
+the agent loads `policy_1600.npz` from `snake/ml_agent/`. Exporting needs
+torch, playing with the exported weights only needs NumPy.
+"""
+
+import argparse
+import pathlib
+import time
+
+import numpy as np
+
+from snake.ml_agent.numpy_model import LAYERS, NumpyDQN, load_weights, save_weights
+
+
+def export_checkpoint(checkpoint_path, output_path=None, int8: bool = False) -> pathlib.Path:
+    import torch
+
+    checkpoint_path = pathlib.Path(checkpoint_path)
+    if output_path is None:
+        suffix = ".int8.npz" if int8 else ".npz"
+        output_path = checkpoint_path.with_suffix(suffix)
+    state_dict = torch.load(checkpoint_path, map_location="cpu")
+    save_weights(output_path, {k: v.numpy() for k, v in state_dict.items()}, int8=int8)
+    return pathlib.Path(output_path)
+
+
+def _torch_forward(checkpoint_path):
+    """Same forward pass as `DQN`, for any layer sizes found in the checkpoint."""
+    import torch
+    import torch.nn.functional as F
+
+    state_dict = torch.load(checkpoint_path, map_location="cpu")
+
+    def forward(states: np.ndarray) -> np.ndarray:
+        with torch.no_grad():
+            x = torch.as_tensor(states)
+            for i, layer in enumerate(LAYERS):
+                x = F.linear(x, state_dict[f"{layer}.weight"], state_dict[f"{layer}.bias"])
+                if i != len(LAYERS) - 1:
+                    x = F.leaky_relu(x)
+            return x.numpy()
+
+    return forward
+
+
+def verify(checkpoint_path, model: NumpyDQN, states: np.ndarray, atol: float) -> float:
+    """Max absolute Q-value difference between torch and NumPy on `states`."""
+    expected = _torch_forward(checkpoint_path)(states)
+    actual = np.stack([model(state).copy() for state in states])
+    error = float(np.abs(expected - actual).max())
+    if error > atol:
+        raise AssertionError(f"Q-values differ by {error} (tolerance {atol})")
+    return error
+
+
+def bench(forward, states: np.ndarray, iterations: int) -> float:
+    """Mean per-decision latency in microseconds."""
+    start = time.perf_counter()
+    for i in range(iterations):
+        forward(states[i % len(states)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("checkpoint")
+    parser.add_argument("-o", "--output")
+    parser.add_argument("--int8", action="store_true", help="Quantize weights to int8")
+    parser.add_argument("--verify", action="store_true", help="Compare with torch Q-values")
+    parser.add_argument("--atol", type=float, default=None)
+    parser.add_argument("--bench", type=int, default=0, help="Time this many decisions")
+    args = parser.parse_args(argv)
+
+    output_path = export_checkpoint(args.checkpoint, args.output, args.int8)
+    print(f"Wrote {output_path} ({output_path.stat().st_size} bytes)")
+
+    model = NumpyDQN(load_weights(output_path))
+    states = np.random.default_rng(0).random((256, model.n_observations), dtype=np.float32)
+    if args.verify:
+        atol = args.atol if args.atol is not None else (5e-2 if args.int8 else 1e-4)
+        print(f"Max Q-value difference: {verify(args.checkpoint, model, states, atol):.2e}")
+    if args.bench:
+        print(f"NumPy: {bench(model, states, args.bench):.1f} us/decision")
+        torch_forward = _torch_forward(args.checkpoint)
+        print(f"Torch: {bench(torch_forward, states[:, None], args.bench):.1f} us/decision")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import pathlib
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from snake.ml_agent import agent, export, train  # noqa: E402
+
+SHIPPED_CHECKPOINT = pathlib.Path(agent.__file__).parent / "policy.checkpoint"
+
+
+def _use_policy(monkeypatch, directory: pathlib.Path):
+    monkeypatch.setattr(
+        agent, "_policy_paths", lambda suffix: [directory / f"policy_{agent.POLICY_NUMBER}{suffix}"]
+    )
+    monkeypatch.setattr(agent, "_inference_model", None)
+
+
+@pytest.mark.parametrize("int8", [False, True])
+def test_exported_policy_loads_in_agent(tmp_path, monkeypatch, capsys, int8):
+    train.main(
+        ["--episodes", "2", "--num-envs", "2", "--batch-size", "4", "--out-dir", str(tmp_path)]
+    )
+    suffix = ".int8.npz" if int8 else ".npz"
+    output = tmp_path / f"policy_{agent.POLICY_NUMBER}{suffix}"
+    export.main(
+        [str(tmp_path / "policy.checkpoint"), "-o", str(output), "--verify"]
+        + (["--int8"] if int8 else [])
+    )
+    assert "Max Q-value difference" in capsys.readouterr().out
+    _use_policy(monkeypatch, tmp_path)
+    model = agent._load_inference_model()
+    assert (model.n_observations, model.n_actions) == (agent.N_OBSERVATIONS, agent.N_ACTIONS)
+
+
+def test_mismatched_policy_is_rejected(tmp_path, monkeypatch):
+    # The checkpoint in the repository predates the current observations
+    export.main([str(SHIPPED_CHECKPOINT), "-o", str(tmp_path / "policy_1600.npz"), "--verify"])
+    _use_policy(monkeypatch, tmp_path)
+    with pytest.raises(ValueError, match="observations"):
+        agent.warm_up()
+
+
+def test_missing_policy_is_an_error(tmp_path, monkeypatch):
+    _use_policy(monkeypatch, tmp_path)
+    with pytest.raises(FileNotFoundError):
+        agent.warm_up()
@@ -0,0 +1,20 @@
+import torch.nn as nn
+import torch.nn.functional as F
+
+
+class DQN(nn.Module):
+
+    def __init__(self, n_observations, n_actions):
+        super(DQN, self).__init__()
+        self.layer1 = nn.Linear(n_observations, n_observations * 2)
+        self.layer2 = nn.Linear(n_observations * 2, n_observations)
+        self.layer3 = nn.Linear(n_observations, n_actions * 2)
+        self.layer4 = nn.Linear(n_actions * 2, n_actions)
+
+    # Called with either one element to determine next action, or a batch
+    # during optimization. Returns tensor([[left0exp,right0exp]...]).
+    def forward(self, x):
+        x = F.leaky_relu(self.layer1(x))
+        x = F.leaky_relu(self.layer2(x))
+        x = F.leaky_relu(self.layer3(x))
+        return self.layer4(x)
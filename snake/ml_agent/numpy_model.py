@@ -0,0 +1,113 @@
+"""
+Torch-free inference for the `DQN` policy.
+
+Weights are stored as a `.npz` file with the same keys as the torch state_dict
+(`layer1.weight`, `layer1.bias`, ...). In the int8 variant every weight matrix
+is stored as `<key>.q` (int8) plus a per-row `<key>.scale` (float32), and is
+dequantized once when loading.
+"""
+
+import pathlib
+from typing import Mapping
+
+import numpy as np
+
+LAYERS = ("layer1", "layer2", "layer3", "layer4")
+LEAKY_RELU_SLOPE = 0.01  # torch.nn.functional.leaky_relu default
+
+
+def quantize(weight: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization, returns (int8 weights, float32 row scales)."""
+    scale = np.abs(weight).max(axis=1) / 127
+    scale[scale == 0] = 1
+    q = np.clip(np.round(weight / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+def save_weights(path, weights: Mapping[str, np.ndarray], int8: bool = False):
+    arrays = {}
+    for key, value in weights.items():
+        value = np.asarray(value, dtype=np.float32)
+        if int8 and key.endswith(".weight"):
+            arrays[f"{key}.q"], arrays[f"{key}.scale"] = quantize(value)
+        else:
+            arrays[key] = value
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+
+def load_weights(path) -> dict[str, np.ndarray]:
+    weights = {}
+    with np.load(path) as data:
+        for key in data.files:
+            if key.endswith(".q"):
+                name = key[: -len(".q")]
+                weights[name] = data[key].astype(np.float32) * data[f"{name}.scale"][:, None]
+            elif not key.endswith(".scale"):
+                weights[key] = data[key].astype(np.float32)
+    return weights
+
+
+def random_weights(n_observations: int, n_actions: int, seed: int | None = None):
+    """Untrained weights with the `DQN` layer sizes and nn.Linear's default init."""
+    rng = np.random.default_rng(seed)
+    sizes = [n_observations, n_observations * 2, n_observations, n_actions * 2, n_actions]
+    weights = {}
+    for layer, n_in, n_out in zip(LAYERS, sizes, sizes[1:]):
+        bound = 1 / np.sqrt(n_in)
+        weights[f"{layer}.weight"] = rng.uniform(-bound, bound, (n_out, n_in)).astype(np.float32)
+        weights[f"{layer}.bias"] = rng.uniform(-bound, bound, n_out).astype(np.float32)
+    return weights
+
+
+class NumpyDQN:
+    """
+    Forward pass of `DQN` in NumPy.
+
+    Single states go through preallocated activation buffers, so a decision
+    doesn't allocate; batches of states (2-D input) allocate as usual.
+    """
+
+    def __init__(self, weights: Mapping[str, np.ndarray]):
+        # Stored transposed so a state row multiplies straight into the next layer
+        self.weights = [
+            np.ascontiguousarray(weights[f"{layer}.weight"].T, dtype=np.float32) for layer in LAYERS
+        ]
+        self.biases = [np.asarray(weights[f"{layer}.bias"], dtype=np.float32) for layer in LAYERS]
+        self.n_observations = self.weights[0].shape[0]
+        self.n_actions = self.weights[-1].shape[1]
+        self._input = np.zeros(self.n_observations, dtype=np.float32)
+        self._activations = [np.zeros(w.shape[1], dtype=np.float32) for w in self.weights]
+        self._scratch = [np.zeros(w.shape[1], dtype=np.float32) for w in self.weights]
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> "NumpyDQN":
+        return cls(load_weights(path))
+
+    def __call__(self, state: np.ndarray) -> np.ndarray:
+        """Q-values for one state (returns an internal buffer) or a batch of states."""
+        if state.ndim != 1:
+            return self.forward_batch(state)
+        x = self._input
+        x[:] = state
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            out = self._activations[i]
+            np.dot(x, weight, out=out)
+            out += bias
+            if i != last:
+                scratch = self._scratch[i]
+                np.multiply(out, LEAKY_RELU_SLOPE, out=scratch)
+                np.maximum(out, scratch, out=out)
+            x = out
+        return x
+
+    def forward_batch(self, states: np.ndarray) -> np.ndarray:
+        x = np.asarray(states, dtype=np.float32)
+        last = len(self.weights) - 1
+        for i, (weight, bias) in enumerate(zip(self.weights, self.biases)):
+            x = x @ weight
+            x += bias
+            if i != last:
+                np.maximum(x, x * LEAKY_RELU_SLOPE, out=x)
+        return x
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from snake.ml_agent.numpy_model import (
+    LEAKY_RELU_SLOPE,
+    NumpyDQN,
+    load_weights,
+    random_weights,
+    save_weights,
+)
+
+
+def _reference_forward(weights, state):
+    x = state.astype(np.float64)
+    for i in range(1, 5):
+        x = weights[f"layer{i}.weight"] @ x + weights[f"layer{i}.bias"]
+        if i != 4:
+            x = np.where(x > 0, x, x * LEAKY_RELU_SLOPE)
+    return x
+
+
+def test_forward_matches_reference():
+    weights = random_weights(280, 4, seed=0)
+    model = NumpyDQN(weights)
+    states = np.random.default_rng(1).random((8, 280), dtype=np.float32)
+    for state in states:
+        np.testing.assert_allclose(model(state), _reference_forward(weights, state), atol=1e-5)
+    np.testing.assert_allclose(
+        model(states), np.stack([_reference_forward(weights, s) for s in states]), atol=1e-5
+    )
+
+
+def test_int8_round_trip(tmp_path):
+    weights = random_weights(280, 4, seed=0)
+    save_weights(tmp_path / "policy.npz", weights)
+    save_weights(tmp_path / "policy.int8.npz", weights, int8=True)
+    exact = NumpyDQN(load_weights(tmp_path / "policy.npz"))
+    quantized = NumpyDQN(load_weights(tmp_path / "policy.int8.npz"))
+    state = np.random.default_rng(2).random(280, dtype=np.float32)
+    np.testing.assert_allclose(exact(state), _reference_forward(weights, state), atol=1e-5)
+    np.testing.assert_allclose(quantized(state), exact(state), atol=2e-2)
+
+
+def test_matches_torch_dqn():
+    torch = pytest.importorskip("torch")
+    from snake.ml_agent.model import DQN
+
+    model = DQN(280, 4).eval()
+    numpy_model = NumpyDQN({k: v.numpy() for k, v in model.state_dict().items()})
+    states = torch.rand(16, 280)
+    with torch.no_grad():
+        expected = model(states).numpy()
+    np.testing.assert_allclose(numpy_model(states.numpy()), expected, atol=1e-4)
+
+
+def test_agent_does_not_import_torch():
+    code = "import sys, snake.ml_agent.agent; sys.exit('torch' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,144 @@
+"""
+Observation encoding for the DQN, with the same layout as `agent.get_state`.
+
+The observation is a flattened (WIDTH, HEIGHT, 2) array: channel 0 holds the
+snake, where segment i (head is 0) of a snake of length n is worth
+0.5 + (n - i) / (2 n), and channel 1 holds the food.
+
+Instead of rebuilding that from the snake every tick, the encoders keep the tick
+at which each segment entered its cell. A segment's value only depends on that
+tick, the current tick and the length, so the recency values are rescaled in one
+vectorized step when the observation is read.
+"""
+
+from collections import deque
+
+import numpy as np
+
+from snake import snake_game
+from snake.snake_game import HEIGHT, WIDTH
+from snake.types import Point
+from snake.vec_game import NUM_CELLS, VecSnakeGame
+
+OBSERVATION_SIZE = WIDTH * HEIGHT * 2
+# Game cell id (y * WIDTH + x) -> position in the (WIDTH, HEIGHT) observation grid
+_GRID_INDEX = np.array([(c % WIDTH) * HEIGHT + c // WIDTH for c in range(NUM_CELLS)])
+# Observation grid position -> game cell id
+_CELL_OF_GRID = np.argsort(_GRID_INDEX)
+
+
+def _grid(point: Point) -> int:
+    return point.x * HEIGHT + point.y
+
+
+class ObservationEncoder:
+    """
+    Incremental `get_state` for one game.
+
+    `encode(game)` only applies what changed since the previous call (new heads,
+    vacated tail cells and the food) as long as it keeps being called with the
+    same game every tick; anything else (a new game, a skipped tick with growth,
+    a restart) triggers a full rebuild.
+    """
+
+    def __init__(self):
+        self._ticks = np.zeros(WIDTH * HEIGHT, dtype=np.float64)
+        self._occupied = np.zeros(WIDTH * HEIGHT, dtype=bool)
+        self._values = np.zeros(WIDTH * HEIGHT, dtype=np.float64)
+        self._out = np.zeros((WIDTH * HEIGHT, 2), dtype=np.float64)
+        self._cells: deque[Point] = deque()
+        self._tick = 0
+        self._game: snake_game.SnakeGame | None = None
+        self._food: Point | None = None
+
+    def encode(self, game: snake_game.SnakeGame, out: np.ndarray | None = None) -> np.ndarray:
+        """Observation of `game`. Returns an internal buffer unless `out` is given."""
+        if not self._sync(game):
+            self._rebuild(game)
+
+        length = len(self._cells)
+        values = self._values
+        # Segment entered at tick t is at index tick - t, worth 0.5 + (length - index) / (2 length).
+        # Empty cells have tick 0 and are left out of the offset.
+        np.multiply(self._ticks, 1 / (2 * length), out=values)
+        np.add(values, 0.5 + (length - self._tick) / (2 * length), out=values, where=self._occupied)
+        self._out[:, 0] = values
+
+        if self._food != game.food:
+            if self._food is not None:
+                self._out[_grid(self._food), 1] = 0
+            self._food = game.food
+            self._out[_grid(self._food), 1] = 1
+
+        flat = self._out.reshape(-1)
+        if out is None:
+            return flat
+        out[:] = flat
+        return out
+
+    def _rebuild(self, game: snake_game.SnakeGame):
+        self._game = game
+        self._ticks[:] = 0
+        self._occupied[:] = False
+        self._out[:, 1] = 0
+        self._food = None
+        self._cells = deque(game.snake)
+        self._tick = len(self._cells)
+        for i, point in enumerate(self._cells):
+            self._ticks[_grid(point)] = self._tick - i
+            self._occupied[_grid(point)] = True
+
+    def _sync(self, game: snake_game.SnakeGame) -> bool:
+        """Applies the moves made since the last call, False if a rebuild is needed."""
+        if game is not self._game or not self._cells:
+            return False
+        snake = game.snake
+        head = self._cells[0]
+        # Find how many moves were made: the old head is now at index `moves`
+        for moves in range(min(3, len(snake))):
+            if snake[moves] == head:
+                break
+        else:
+            return False
+        grown = len(snake) - len(self._cells)
+        if not 0 <= grown <= moves:
+            return False
+        for i in range(moves - 1, -1, -1):
+            self._tick += 1
+            self._cells.appendleft(snake[i])
+            self._ticks[_grid(snake[i])] = self._tick
+            self._occupied[_grid(snake[i])] = True
+        for _ in range(moves - grown):
+            tail = self._cells.pop()
+            if self._ticks[_grid(tail)] <= self._tick - len(snake):
+                self._ticks[_grid(tail)] = 0
+                self._occupied[_grid(tail)] = False
+        return self._cells[-1] == snake[-1]
+
+
+def encode_batch(
+    encoders: list[ObservationEncoder],
+    games: list[snake_game.SnakeGame],
+    out: np.ndarray | None = None,
+) -> np.ndarray:
+    """Fills an (N, OBSERVATION_SIZE) array with the observations of `games`."""
+    if out is None:
+        out = np.empty((len(games), OBSERVATION_SIZE), dtype=np.float32)
+    for i, (encoder, game) in enumerate(zip(encoders, games)):
+        encoder.encode(game, out[i])
+    return out
+
+
+def encode_vec(vec: VecSnakeGame, out: np.ndarray | None = None) -> np.ndarray:
+    """Fills an (N, OBSERVATION_SIZE) array with the observations of every game in `vec`."""
+    n = vec.num_games
+    if out is None:
+        out = np.empty((n, OBSERVATION_SIZE), dtype=np.float32)
+    grid = out.reshape(n, WIDTH * HEIGHT, 2)
+    ticks = vec.occupancy[:, _CELL_OF_GRID]
+    length = vec.length[:, None].astype(np.float64)
+    values = 0.5 + (length - vec.tick[:, None] + ticks) / (2 * length)
+    grid[:, :, 0] = np.where(ticks > 0, values, 0)
+    grid[:, :, 1] = 0
+    grid[np.arange(n), _GRID_INDEX[vec.food], 1] = 1
+    return out
@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+
+from snake.agent import agent_move_bfs
+from snake.const import DIRECTIONS
+from snake.ml_agent.agent import get_state
+from snake.ml_agent.observation import ObservationEncoder, encode_batch, encode_vec
+from snake.snake_game import HEIGHT, WIDTH, SnakeGame
+from snake.types import Point
+from snake.vec_game import VecSnakeGame
+
+
+def test_encoder_matches_get_state():
+    random.seed(4)
+    game = SnakeGame()
+    game.initialize_game()
+    encoder = ObservationEncoder()
+    for tick in range(3000):
+        if game.game_over:
+            game.initialize_game()
+        np.testing.assert_allclose(encoder.encode(game), get_state(game), atol=1e-12)
+        # Skipping an encode now and then has to be handled too
+        for _ in range(1 + (tick % 7 == 0)):
+            if (direction := agent_move_bfs(game)) is not None:
+                game.set_next_direction(direction)
+            game.update_game()
+
+
+def test_encode_batch():
+    random.seed(5)
+    games = [SnakeGame() for _ in range(4)]
+    encoders = [ObservationEncoder() for _ in games]
+    for game in games:
+        game.initialize_game()
+    for _ in range(50):
+        out = encode_batch(encoders, games)
+        assert out.shape == (4, WIDTH * HEIGHT * 2)
+        for row, game in zip(out, games):
+            np.testing.assert_allclose(row, get_state(game), atol=1e-6)
+        for game in games:
+            game.set_next_direction(random.choice(DIRECTIONS))
+            game.update_game()
+            if game.game_over:
+                game.initialize_game()
+
+
+def test_encode_vec_matches_get_state():
+    vec = VecSnakeGame(16, seed=6)
+    rng = np.random.default_rng(6)
+    game = SnakeGame()
+    for _ in range(200):
+        out = encode_vec(vec)
+        for i in range(vec.num_games):
+            game.snake = vec.snake(i)
+            cell = int(vec.food[i])
+            game.food = Point(cell % WIDTH, cell // WIDTH)
+            np.testing.assert_allclose(out[i], get_state(game), atol=1e-6)
+        vec.step(rng.integers(0, 4, vec.num_games))
@@ -0,0 +1,374 @@
+"""
+Train the DQN policy.
+
+    snake-train --episodes 10000 --num-envs 32 --out-dir checkpoints
+
+Same algorithm and hyperparameters as `training.ipynb`, but the environments are
+stepped together with `VecSnakeGame`, transitions go into a preallocated
+array-backed replay buffer, and the target network is soft-updated in place.
+Checkpoints are plain `DQN` state_dicts, `export.py` converts them for the agent.
+
+With `--actors N` the games are played by N actor processes that fill a
+shared-memory replay buffer (see `actors.py`), while this process only trains
+and publishes the weights back to them every `--sync-every` optimizer steps, so
+the games no longer share a core with the optimizer. Use one actor per core,
+minus one for the learner. Start it with `snake-train` or
+`python -m snake.ml_agent.train_main`, which don't import torch in the actors.
+"""
+
+import argparse
+import math
+import multiprocessing
+import pathlib
+import queue
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from snake.ml_agent.actors import (
+    ActorConfig,
+    SharedReplayBuffer,
+    SharedWeights,
+    actor_epsilons,
+    epsilon as actor_epsilon,
+    run_actor,
+)
+from snake.ml_agent.agent import N_ACTIONS, N_OBSERVATIONS
+from snake.ml_agent.model import DQN
+from snake.ml_agent.observation import encode_vec
+from snake.vec_game import VecSnakeGame
+
+# BATCH_SIZE is the number of transitions sampled from the replay buffer
+# GAMMA is the discount factor
+# EPS_START is the starting value of epsilon
+# EPS_END is the final value of epsilon
+# EPS_DECAY controls the rate of exponential decay of epsilon, higher means a slower decay
+# TAU is the update rate of the target network
+# LR is the learning rate of the ``AdamW`` optimizer
+BATCH_SIZE = 128
+GAMMA = 0.90
+EPS_START = 0.9
+EPS_END = 0.01
+EPS_DECAY = 50000
+TAU = 0.05
+LR = 3e-4
+MEMORY_SIZE = 10000
+MAX_N_STEPS = 3_000
+# Final epsilon of the most exploring actor, the others are spread down to EPS_END
+ACTOR_EPS_MAX = 0.4
+SYNC_EVERY = 100
+
+
+class ReplayBuffer:
+    """Fixed-size ring buffer of transitions stored in preallocated arrays."""
+
+    def __init__(self, capacity: int, n_observations: int):
+        self.capacity = capacity
+        self.states = np.zeros((capacity, n_observations), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, n_observations), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def push(self, states, actions, rewards, next_states, dones):
+        """Stores a batch of transitions, overwriting the oldest ones when full."""
+        n = len(actions)
+        index = (self.position + np.arange(n)) % self.capacity
+        self.states[index] = states
+        self.actions[index] = actions
+        self.rewards[index] = rewards
+        self.next_states[index] = next_states
+        self.dones[index] = dones
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size: int, rng: np.random.Generator):
+        index = rng.integers(0, self.size, batch_size)
+        return (
+            self.states[index],
+            self.actions[index],
+            self.rewards[index],
+            self.next_states[index],
+            self.dones[index],
+        )
+
+    def __len__(self):
+        return self.size
+
+
+def epsilon(steps_done: int) -> float:
+    return EPS_END + (EPS_START - EPS_END) * math.exp(-1.0 * steps_done / EPS_DECAY)
+
+
+@torch.no_grad()
+def soft_update(target_net: nn.Module, policy_net: nn.Module, tau: float):
+    """θ′ ← τ θ + (1 −τ )θ′, in place."""
+    for target, policy in zip(target_net.parameters(), policy_net.parameters()):
+        target.lerp_(policy, tau)
+
+
+class Trainer:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.device = torch.device(args.device)
+        self.rng = np.random.default_rng(args.seed)
+        torch.manual_seed(args.seed)
+
+        self.policy_net = DQN(N_OBSERVATIONS, N_ACTIONS).to(self.device)
+        self.target_net = DQN(N_OBSERVATIONS, N_ACTIONS).to(self.device)
+        self.target_net.load_state_dict(self.policy_net.state_dict())
+        self.optimizer = optim.AdamW(self.policy_net.parameters(), lr=args.lr, amsgrad=True)
+        self.criterion = nn.SmoothL1Loss()
+        self.memory = self._replay_buffer()
+        self.steps_done = 0
+
+    def _replay_buffer(self):
+        return ReplayBuffer(self.args.memory_size, N_OBSERVATIONS)
+
+    def select_actions(self, states: np.ndarray) -> np.ndarray:
+        n = len(states)
+        actions = self.rng.integers(0, N_ACTIONS, n)
+        greedy = self.rng.random(n) > epsilon(self.steps_done)
+        self.steps_done += n
+        if greedy.any():
+            with torch.no_grad():
+                batch = torch.from_numpy(states[greedy]).to(self.device)
+                actions[greedy] = self.policy_net(batch).argmax(1).cpu().numpy()
+        return actions
+
+    def optimize_model(self):
+        if len(self.memory) < self.args.batch_size:
+            return
+        states, actions, rewards, next_states, dones = (
+            torch.from_numpy(a).to(self.device)
+            for a in self.memory.sample(self.args.batch_size, self.rng)
+        )
+
+        # Q(s_t, a) for the actions that were taken
+        state_action_values = self.policy_net(states).gather(1, actions.unsqueeze(1))
+        # V(s_{t+1}) from the target network, 0 for final states
+        with torch.no_grad():
+            next_state_values = self.target_net(next_states).max(1).values
+            next_state_values[dones] = 0
+        expected_state_action_values = (next_state_values * self.args.gamma) + rewards
+
+        loss = self.criterion(state_action_values, expected_state_action_values.unsqueeze(1))
+        self.optimizer.zero_grad()
+        loss.backward()
+        # In-place gradient clipping
+        torch.nn.utils.clip_grad_value_(self.policy_net.parameters(), 100)
+        self.optimizer.step()
+
+    def save(self, path: pathlib.Path, net: nn.Module):
+        torch.save(net.state_dict(), path)
+        print(f"Saved {path}")
+
+    def _epsilon_report(self) -> str:
+        return f"eps {epsilon(self.steps_done):.3f}"
+
+    def _checkpoint(
+        self,
+        out_dir: pathlib.Path,
+        episode_lengths: list[int],
+        next_checkpoint: int,
+        env_steps: int,
+        start: float,
+    ) -> int:
+        """Saves and reports every `checkpoint_every` episodes, returns the next one to check."""
+        while len(episode_lengths) > next_checkpoint:
+            if next_checkpoint % self.args.checkpoint_every == 0:
+                self.save(out_dir / f"policy_{next_checkpoint}.checkpoint", self.policy_net)
+                recent = episode_lengths[-100:]
+                elapsed = time.perf_counter() - start
+                print(
+                    f"episode {next_checkpoint}: mean length {np.mean(recent):.2f}, "
+                    f"{self._epsilon_report()}, "
+                    f"{env_steps / elapsed:.0f} env steps/s"
+                )
+            next_checkpoint += 1
+        return next_checkpoint
+
+    def train(self) -> list[int]:
+        args = self.args
+        out_dir = pathlib.Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        vec = VecSnakeGame(args.num_envs, seed=args.seed)
+        states = np.zeros((args.num_envs, N_OBSERVATIONS), dtype=np.float32)
+        next_states = np.zeros_like(states)
+        episode_lengths: list[int] = []
+        next_checkpoint = 0
+        start = time.perf_counter()
+        env_steps = 0
+
+        while len(episode_lengths) < args.episodes:
+            encode_vec(vec, states)
+            actions = self.select_actions(states)
+            rewards, dones = vec.step(actions, auto_reset=False)
+            encode_vec(vec, next_states)
+            self.memory.push(states, actions, rewards, next_states, dones)
+            env_steps += args.num_envs
+
+            ended = dones | (vec.steps >= args.max_steps)
+            if ended.any():
+                episode_lengths += vec.length[ended].tolist()
+                vec.reset(ended)
+
+            # One optimizer step (and target update) per batch of environment steps
+            self.optimize_model()
+            soft_update(self.target_net, self.policy_net, args.tau)
+
+            next_checkpoint = self._checkpoint(
+                out_dir, episode_lengths, next_checkpoint, env_steps, start
+            )
+
+        self.save(out_dir / "policy.checkpoint", self.target_net)
+        return episode_lengths
+
+
+class ActorLearnerTrainer(Trainer):
+    """
+    Learner of `--actors N` training. The actors play in spawned processes and
+    push transitions into a `SharedReplayBuffer`, the learner trains on samples
+    from it as fast as it can and publishes the policy weights to the actors.
+    """
+
+    def __init__(self, args: argparse.Namespace):
+        super().__init__(args)
+        self.weights = SharedWeights(N_OBSERVATIONS, N_ACTIONS)
+        # The cores belong to the actors
+        torch.set_num_threads(args.learner_threads)
+
+    def _replay_buffer(self):
+        return SharedReplayBuffer(self.args.memory_size, N_OBSERVATIONS, self.args.actors)
+
+    def publish(self):
+        state_dict = self.policy_net.state_dict()
+        self.weights.publish({key: value.cpu().numpy() for key, value in state_dict.items()})
+
+    def actor_configs(self) -> list[ActorConfig]:
+        args = self.args
+        return [
+            ActorConfig(
+                index=i,
+                num_envs=args.num_envs,
+                seed=args.seed + 1 + i,
+                max_steps=args.max_steps,
+                eps_start=EPS_START,
+                eps_end=eps_end,
+                # Together the actors decay over as many steps as the single-process trainer
+                eps_decay=EPS_DECAY / args.actors,
+            )
+            for i, eps_end in enumerate(actor_epsilons(args.actors, EPS_END, ACTOR_EPS_MAX))
+        ]
+
+    def _epsilon_report(self) -> str:
+        # Every actor follows its own schedule, over its own environment steps
+        epsilons = [
+            actor_epsilon(config, int(self.memory.written[config.index]))
+            for config in self.configs
+        ]
+        return f"eps {min(epsilons):.3f}-{max(epsilons):.3f}"
+
+    def train(self) -> list[int]:
+        args = self.args
+        out_dir = pathlib.Path(args.out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        # Spawned, not forked: the actors don't inherit torch's threads
+        context = multiprocessing.get_context("spawn")
+        episodes = context.Queue()
+        stop = context.Event()
+        self.publish()
+        self.configs = self.actor_configs()
+        actors = [
+            context.Process(
+                target=run_actor,
+                args=(config, self.memory, self.weights, episodes, stop),
+                name=f"actor-{config.index}",
+                daemon=True,
+            )
+            for config in self.configs
+        ]
+        for actor in actors:
+            actor.start()
+
+        episode_lengths: list[int] = []
+        next_checkpoint = 0
+        updates = 0
+        start = time.perf_counter()
+        try:
+            while len(episode_lengths) < args.episodes:
+                try:
+                    while True:
+                        episode_lengths += episodes.get_nowait()
+                except queue.Empty:
+                    pass
+                for actor in actors:
+                    if actor.exitcode is not None:
+                        raise RuntimeError(f"{actor.name} exited with code {actor.exitcode}")
+
+                if len(self.memory) < args.batch_size:
+                    time.sleep(0.01)
+                    continue
+                self.optimize_model()
+                soft_update(self.target_net, self.policy_net, args.tau)
+                updates += 1
+                if updates % args.sync_every == 0:
+                    self.publish()
+
+                next_checkpoint = self._checkpoint(
+                    out_dir, episode_lengths, next_checkpoint, int(self.memory.written.sum()), start
+                )
+        finally:
+            stop.set()
+            for actor in actors:
+                actor.join(timeout=10)
+                if actor.is_alive():
+                    actor.terminate()
+            env_steps = int(self.memory.written.sum())
+            self.memory.close()
+            self.memory.unlink()
+            self.weights.close()
+            self.weights.unlink()
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"{args.actors} actors: {env_steps / elapsed:.0f} env steps/s, "
+            f"{updates / elapsed:.0f} updates/s"
+        )
+        self.save(out_dir / "policy.checkpoint", self.target_net)
+        return episode_lengths
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="snake-train", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--episodes", type=int, default=10000)
+    parser.add_argument("--num-envs", type=int, default=32)
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--gamma", type=float, default=GAMMA)
+    parser.add_argument("--tau", type=float, default=TAU)
+    parser.add_argument("--lr", type=float, default=LR)
+    parser.add_argument("--memory-size", type=int, default=MEMORY_SIZE)
+    parser.add_argument("--max-steps", type=int, default=MAX_N_STEPS)
+    parser.add_argument(
+        "--actors", type=int, default=0, help="Actor processes, 0 plays in the learner process"
+    )
+    parser.add_argument(
+        "--sync-every", type=int, default=SYNC_EVERY, help="Optimizer steps between weight syncs"
+    )
+    parser.add_argument("--learner-threads", type=int, default=1)
+    args = parser.parse_args(argv)
+    if args.actors > 0:
+        ActorLearnerTrainer(args).train()
+    else:
+        Trainer(args).train()
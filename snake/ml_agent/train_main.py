@@ -0,0 +1,16 @@
+"""
+Entry point of `snake-train`, the training itself is in `train.py`.
+
+This module must not import torch: the `--actors N` processes are spawned, and
+spawning imports the parent's `__main__` module again in every actor.
+"""
+
+
+def main(argv: list[str] | None = None):
+    from snake.ml_agent import train
+
+    train.main(argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import re
+
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from snake.ml_agent import agent  # noqa: E402
+from snake.ml_agent.model import DQN  # noqa: E402
+from snake.ml_agent.train import ReplayBuffer, main, soft_update  # noqa: E402
+
+
+def test_replay_buffer_wraps_around():
+    memory = ReplayBuffer(5, 2)
+    for i in range(3):
+        states = np.full((3, 2), i, dtype=np.float32)
+        memory.push(states, np.arange(3) + 3 * i, np.zeros(3), states, np.zeros(3, dtype=bool))
+    assert len(memory) == 5
+    # The 5 newest actions survive
+    assert sorted(memory.actions) == [4, 5, 6, 7, 8]
+    states, actions, _, _, _ = memory.sample(16, np.random.default_rng(0))
+    assert states.shape == (16, 2) and set(actions) <= {4, 5, 6, 7, 8}
+
+
+def test_soft_update_in_place():
+    target, policy = DQN(4, 2), DQN(4, 2)
+    before = [p.clone() for p in target.parameters()]
+    params = list(target.parameters())
+    soft_update(target, policy, 0.25)
+    for p, old, new, source in zip(params, before, target.parameters(), policy.parameters()):
+        assert p is new
+        torch.testing.assert_close(new, old * 0.75 + source * 0.25)
+
+
+def test_checkpoints_load_in_agent(tmp_path):
+    main(["--episodes", "4", "--num-envs", "4", "--batch-size", "8", "--out-dir", str(tmp_path)])
+    model = DQN(agent.N_OBSERVATIONS, agent.N_ACTIONS)
+    model.load_state_dict(torch.load(tmp_path / "policy_0.checkpoint"))
+    model.load_state_dict(torch.load(tmp_path / "policy.checkpoint"))
+
+
+def test_actor_learner_checkpoints_load_in_agent(tmp_path, capsys):
+    main(
+        ["--actors", "2", "--episodes", "4", "--num-envs", "4", "--batch-size", "8"]
+        + ["--out-dir", str(tmp_path)]
+    )
+    model = DQN(agent.N_OBSERVATIONS, agent.N_ACTIONS)
+    model.load_state_dict(torch.load(tmp_path / "policy_0.checkpoint"))
+    model.load_state_dict(torch.load(tmp_path / "policy.checkpoint"))
+    # The report shows the actors' epsilons, not the single-process schedule
+    assert re.search(r"episode 0: .* eps 0\.\d{3}-0\.\d{3}, ", capsys.readouterr().out)
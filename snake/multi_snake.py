@@ -0,0 +1,361 @@
+"""
+Several snakes on one large panel, for attract mode on LED walls.
+
+`MultiSnakeGame` takes its dimensions from the `MapSpec` it is given instead
+of the module-level `snake_game.WIDTH`/`HEIGHT`, so the same code runs the
+14x10 board and a 128x128 wall. Snakes move simultaneously and share the food:
+
+- a snake dies when its head moves into any cell occupied at the start of the
+  tick (its own body, another snake, the tail that is about to move away, as in
+  `SnakeGame`), off the panel, or into the same cell as another head
+- dead snakes clear their cells and respawn after `RESPAWN_TICKS` as a single
+  segment that grows back to `INITIAL_SNAKE_LENGTH`
+- eaten food is replaced right away, `num_food` pieces are always out
+
+Nothing scans the whole panel per tick: cell owners are a flat list, free cells
+a swap-remove pool (O(1) food and spawn placement), and every step lists the
+cells it changed in `changed`, which is all `render_changes` writes to the
+strip. Updating the game and writing the strip costs O(snakes + changed
+cells), independent of the panel size. What showing a frame costs is up to
+the output: `udp://` sends only the written pixels (plus a keyframe every 32
+frames), while the pygame `SimStrip` redraws the whole window on every show.
+"""
+
+import argparse
+import random
+import time
+import types
+from collections import deque
+from typing import Callable
+
+from snake.const import AGENT_GAME_SPEED, DIRECTIONS
+from snake.map_spec import MapSpec, compile_map
+from snake.scheduler import TickScheduler
+from snake.snake_game import INITIAL_SNAKE_LENGTH
+from snake.types import Color, Direction, Point
+
+EMPTY = -1
+FOOD = -2
+RESPAWN_TICKS = 20
+# How many cells the agent flood-fills to make sure a move isn't a dead end
+ROOM_LIMIT = 32
+
+BACKGROUND = Color(2, 4, 0)
+FOOD_COLOR = Color(255, 0, 0)
+SNAKE_COLORS = [
+    Color(0, 0, 128),
+    Color(128, 0, 128),
+    Color(128, 128, 0),
+    Color(0, 128, 128),
+    Color(200, 60, 0),
+    Color(60, 0, 200),
+    Color(128, 128, 128),
+    Color(0, 200, 60),
+]
+
+_REVERSE = [DIRECTIONS.index(Direction(-d.x, -d.y)) for d in DIRECTIONS]
+
+
+def serpentine_panel(width: int, height: int) -> MapSpec:
+    """
+    Compiled map of a `width` x `height` panel wired row by row in a serpentine
+    (even rows left to right, odd rows right to left), without blocked cells or
+    portals. All-pairs distances are skipped, they grow with the area squared.
+    """
+    module = types.ModuleType(f"serpentine_{width}x{height}")
+    module.NUM_PIXELS = width * height
+    module.MAP = [
+        [y * width + (x if y % 2 == 0 else width - 1 - x) for x in range(width)]
+        for y in range(height)
+    ]
+    module.PORTALS = {}
+    module.is_blocked = lambda x, y: not (0 <= y < height and 0 <= x < width)
+    return compile_map(module, distances=False)
+
+
+class Snake:
+    def __init__(self, index: int):
+        self.index = index
+        self.body: deque[int] = deque()  # Cell ids, head first
+        self.direction = 0  # Index into DIRECTIONS
+        self.grow = 0  # Segments still to add at the tail
+        self.alive = False
+        self.respawn_at = 0
+
+    @property
+    def head(self) -> int:
+        return self.body[0]
+
+
+class MultiSnakeGame:
+    def __init__(
+        self,
+        spec: MapSpec,
+        num_snakes: int = 4,
+        num_food: int | None = None,
+        seed: int | None = None,
+    ):
+        self.spec = spec
+        self.width = spec.width
+        self.height = spec.height
+        self.rng = random.Random(seed)
+        self.num_food = num_snakes if num_food is None else num_food
+        self.owner = [EMPTY] * spec.num_cells  # Snake index, EMPTY or FOOD per cell
+        self.food: set[int] = set()
+        self.tick = 0
+        self.deaths = 0
+        self.food_eaten = 0
+        # Cells whose owner changed in the last step (or since the start)
+        self.changed: list[int] = []
+        self._free: list[int] = []
+        self._free_pos = [-1] * spec.num_cells
+        for cell in spec.open_cells:
+            self._add_free(cell)
+        self.snakes = [Snake(i) for i in range(num_snakes)]
+        for snake in self.snakes:
+            self._spawn(snake)
+        self._refill_food()
+
+    def _add_free(self, cell: int):
+        self._free_pos[cell] = len(self._free)
+        self._free.append(cell)
+
+    def _remove_free(self, cell: int):
+        pos = self._free_pos[cell]
+        if pos < 0:
+            return
+        last = self._free.pop()
+        if last != cell:
+            self._free[pos] = last
+            self._free_pos[last] = pos
+        self._free_pos[cell] = -1
+
+    def _set_owner(self, cell: int, owner: int):
+        if owner == EMPTY:
+            self._add_free(cell)
+        elif self.owner[cell] == EMPTY:
+            self._remove_free(cell)
+        self.owner[cell] = owner
+        self.changed.append(cell)
+
+    def _spawn(self, snake: Snake):
+        if not self._free:
+            snake.respawn_at = self.tick + RESPAWN_TICKS
+            return
+        cell = self.rng.choice(self._free)
+        self.set_snake(snake.index, [self.spec.point(cell)], self.rng.choice(DIRECTIONS))
+        snake.grow = INITIAL_SNAKE_LENGTH - 1
+
+    def _refill_food(self):
+        while len(self.food) < self.num_food and self._free:
+            cell = self.rng.choice(self._free)
+            self.food.add(cell)
+            self._set_owner(cell, FOOD)
+
+    def _kill(self, snake: Snake):
+        for cell in snake.body:
+            self._set_owner(cell, EMPTY)
+        snake.body.clear()
+        snake.alive = False
+        snake.respawn_at = self.tick + RESPAWN_TICKS
+        self.deaths += 1
+
+    def set_snake(self, index: int, body: list[Point], direction: Direction):
+        """Puts snake `index` on the given cells (head first), replacing its old body."""
+        snake = self.snakes[index]
+        if snake.alive:
+            for cell in snake.body:
+                self._set_owner(cell, EMPTY)
+        snake.body = deque(self.spec.cell(point) for point in body)
+        for cell in snake.body:
+            if self.owner[cell] == FOOD:
+                self.food.discard(cell)
+            self._set_owner(cell, index)
+        snake.direction = DIRECTIONS.index(direction)
+        snake.grow = 0
+        snake.alive = True
+
+    def is_open(self, cell: int) -> bool:
+        """On the panel, not blocked and free or food."""
+        return cell >= 0 and not self.spec.blocked[cell] and self.owner[cell] < 0
+
+    def step(self, directions: list[int | None] | None = None):
+        """
+        Moves every live snake one cell, in `directions[i]` (index into
+        DIRECTIONS, None to keep going) or straight on.
+        """
+        self.changed = []
+        self.tick += 1
+        spec = self.spec
+        moves: list[tuple[Snake, int]] = []
+        targets: dict[int, int] = {}
+        for snake in self.snakes:
+            if not snake.alive:
+                continue
+            d = snake.direction
+            if directions is not None and directions[snake.index] is not None:
+                if len(snake.body) == 1 or directions[snake.index] != _REVERSE[d]:
+                    d = directions[snake.index]
+            head = snake.head
+            cell = spec.next_cell[head * 4 + d]
+            if cell < 0 or spec.blocked[cell]:
+                # Turn away from the edge or a blocked cell, like SnakeGame
+                options = [
+                    other
+                    for other in range(4)
+                    if other not in (d, _REVERSE[d])
+                    and self.is_open(spec.next_cell[head * 4 + other])
+                ]
+                if options:
+                    d = self.rng.choice(options)
+                    cell = spec.next_cell[head * 4 + d]
+            snake.direction = _REVERSE[d] if spec.flips[head * 4 + d] else d
+            moves.append((snake, cell))
+            targets[cell] = targets.get(cell, 0) + 1
+
+        # Collisions are judged on the board as it was at the start of the tick
+        dead = [
+            snake
+            for snake, cell in moves
+            if cell < 0 or spec.blocked[cell] or self.owner[cell] >= 0 or targets[cell] > 1
+        ]
+        for snake in dead:
+            self._kill(snake)
+        for snake, cell in moves:
+            if not snake.alive:
+                continue
+            if self.owner[cell] == FOOD:
+                self.food.remove(cell)
+                self.food_eaten += 1
+                snake.grow += 1
+            self._set_owner(cell, snake.index)
+            snake.body.appendleft(cell)
+            if snake.grow:
+                snake.grow -= 1
+            else:
+                self._set_owner(snake.body.pop(), EMPTY)
+
+        for snake in self.snakes:
+            if not snake.alive and snake.respawn_at <= self.tick:
+                self._spawn(snake)
+        self._refill_food()
+
+    def distance(self, a: int, b: int) -> int:
+        """Moves from a to b on an empty panel, rows wrap around."""
+        if len(self.spec.distances):
+            return self.spec.distance(a, b)
+        dx = abs(a % self.width - b % self.width)
+        return min(dx, self.width - dx) + abs(a // self.width - b // self.width)
+
+    def room(self, start: int, limit: int = ROOM_LIMIT) -> int:
+        """Free cells reachable from `start`, counting stops at `limit`."""
+        spec = self.spec
+        seen = {start}
+        queue = deque([start])
+        while queue and len(seen) < limit:
+            cell = queue.popleft()
+            for next_cell in spec.next_cell[cell * 4 : cell * 4 + 4]:
+                if next_cell not in seen and self.is_open(next_cell):
+                    seen.add(next_cell)
+                    queue.append(next_cell)
+        return len(seen)
+
+
+def greedy_moves(game: MultiSnakeGame) -> list[int | None]:
+    """
+    Per snake: the move towards the closest food that doesn't lead into a dead
+    end (less than ROOM_LIMIT free cells around, or the snake's length if shorter).
+    """
+    spec = game.spec
+    moves: list[int | None] = []
+    for snake in game.snakes:
+        if not snake.alive:
+            moves.append(None)
+            continue
+        head = snake.head
+        target = min(game.food, key=lambda food: game.distance(head, food), default=None)
+        best = None
+        for d in range(4):
+            if d == _REVERSE[snake.direction] and len(snake.body) > 1:
+                continue
+            cell = spec.next_cell[head * 4 + d]
+            if not game.is_open(cell):
+                continue
+            enough_room = game.room(cell) >= min(ROOM_LIMIT, len(snake.body) + snake.grow)
+            distance = 0 if target is None else game.distance(cell, target)
+            value = (enough_room, -distance, game.rng.random())
+            if best is None or value > best[0]:
+                best = (value, d)
+        moves.append(None if best is None else best[1])
+    return moves
+
+
+def cell_color(game: MultiSnakeGame, cell: int) -> Color:
+    owner = game.owner[cell]
+    if owner == EMPTY:
+        return BACKGROUND
+    if owner == FOOD:
+        return FOOD_COLOR
+    return SNAKE_COLORS[owner % len(SNAKE_COLORS)]
+
+
+def render_changes(game: MultiSnakeGame, pixels) -> bool:
+    """Writes the cells changed by the last step to a strip, shows it if any did."""
+    strip_index = game.spec.strip_index
+    changed = False
+    for cell in game.changed:
+        if strip_index[cell] >= 0:
+            pixels[strip_index[cell]] = cell_color(game, cell)
+            changed = True
+    if changed:
+        pixels.show()
+    return changed
+
+
+def run(
+    game: MultiSnakeGame,
+    pixels,
+    period: float = AGENT_GAME_SPEED,
+    ticks: int | None = None,
+    agent: Callable[[MultiSnakeGame], list[int | None]] = greedy_moves,
+):
+    """Attract mode loop: one agent decision, step and strip update per tick."""
+    pixels.fill(BACKGROUND)
+    render_changes(game, pixels)
+    scheduler = TickScheduler(period)
+    while ticks is None or game.tick < ticks:
+        time.sleep(scheduler.time_until_due())
+        if scheduler.poll():
+            game.step(agent(game))
+            render_changes(game, pixels)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Several AI snakes on one panel")
+    parser.add_argument("--width", type=int, default=64)
+    parser.add_argument("--height", type=int, default=64)
+    parser.add_argument("--snakes", type=int, default=8)
+    parser.add_argument("--food", type=int, help="Food on the panel, one per snake by default")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--output", default="sim", help="sim for a pygame window or udp://host:port"
+    )
+    parser.add_argument("--scale", type=int, default=10, help="Simulator pixels per cell")
+    args = parser.parse_args(argv)
+
+    from snake.net_output import SimStrip, sender_from_url
+
+    spec = serpentine_panel(args.width, args.height)
+    if args.output == "sim":
+        pixels = SimStrip(spec, args.scale)
+    else:
+        pixels = sender_from_url(args.output, spec.num_pixels)
+    game = MultiSnakeGame(spec, args.snakes, args.food, args.seed)
+    try:
+        run(game, pixels)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
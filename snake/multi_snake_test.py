@@ -0,0 +1,73 @@
+from snake.const import DIRECTIONS, LEFT, RIGHT, UP
+from snake.led_output import FakePixelStrip
+from snake.multi_snake import (
+    EMPTY,
+    FOOD,
+    MultiSnakeGame,
+    cell_color,
+    greedy_moves,
+    render_changes,
+    serpentine_panel,
+)
+from snake.types import Point
+
+
+def test_serpentine_wiring():
+    spec = serpentine_panel(8, 5)
+    assert sorted(spec.strip_index) == list(range(40))
+    cells = sorted(range(spec.num_cells), key=lambda cell: spec.strip_index[cell])
+    for a, b in zip(cells, cells[1:]):
+        # Consecutive pixels are neighbors on the panel
+        assert b in spec.next_cell[a * 4 : a * 4 + 4]
+
+
+def _check_board(game):
+    owner = [EMPTY] * game.spec.num_cells
+    for snake in game.snakes:
+        for cell in snake.body:
+            assert owner[cell] == EMPTY
+            owner[cell] = snake.index
+    for cell in game.food:
+        owner[cell] = FOOD
+    assert game.owner == owner
+    assert sorted(game._free) == [cell for cell in range(len(owner)) if owner[cell] == EMPTY]
+
+
+def test_changed_cells_cover_every_change():
+    game = MultiSnakeGame(serpentine_panel(24, 16), num_snakes=6, seed=1)
+    strip = FakePixelStrip(game.spec.num_pixels)
+    strip.fill(cell_color(game, game._free[0]))
+    render_changes(game, strip)
+    for _ in range(500):
+        before = list(game.owner)
+        game.step(greedy_moves(game))
+        _check_board(game)
+        assert {i for i, owner in enumerate(game.owner) if owner != before[i]} <= set(game.changed)
+        render_changes(game, strip)
+        # The strip is kept in sync from the changed cells alone
+        for cell in range(game.spec.num_cells):
+            assert strip.buf[game.spec.strip_index[cell]] == cell_color(game, cell)
+    assert game.food_eaten > 0
+    assert len(game.food) == game.num_food
+
+
+def test_head_on_collision_kills_both():
+    game = MultiSnakeGame(serpentine_panel(10, 5), num_snakes=2, num_food=0, seed=2)
+    game.set_snake(0, [Point(3, 2), Point(2, 2)], RIGHT)
+    game.set_snake(1, [Point(5, 2), Point(6, 2)], LEFT)
+    game.step()
+    assert not game.snakes[0].alive and not game.snakes[1].alive
+    assert game.deaths == 2
+    _check_board(game)
+
+
+def test_running_into_another_snake():
+    game = MultiSnakeGame(serpentine_panel(10, 5), num_snakes=2, num_food=0, seed=3)
+    game.set_snake(0, [Point(3, 3), Point(2, 3)], RIGHT)
+    game.set_snake(1, [Point(4, 2), Point(4, 3), Point(4, 4)], UP)
+    game.step([None, DIRECTIONS.index(RIGHT)])
+    assert not game.snakes[0].alive
+    assert list(game.snakes[1].body) == [
+        game.spec.cell(point) for point in (Point(5, 2), Point(4, 2), Point(4, 3))
+    ]
+    _check_board(game)
@@ -0,0 +1,421 @@
+"""
+Network LED output.
+
+`UdpPixelSender` stands in for the NeoPixel strip (item assignment, fill and
+show) and streams the frames over UDP, so the game and the agents can run on a
+fast host while a small board only pushes pixels:
+
+    host:  SNAKE_OUTPUT=udp://pi-zero.local:7777 snake
+    board: snake-receiver --listen 0.0.0.0:7777 --output strip
+
+A frame goes out as one or more packets that each fit an Ethernet MTU. Every
+packet starts with a header (magic, kind, session, sequence number, number of
+pixels, first pixel, chunk index, number of chunks) followed by one of:
+
+- KEYFRAME: a chunk of the whole strip, run-length encoded as (count, 3 color
+  bytes) runs from the first pixel in the header on
+- DELTA: a chunk of the pixels written since the previous sequence number, as
+  (start, count) runs of raw colors
+
+The sender remembers which pixels were written since the last frame, so a delta
+costs O(changed pixels) whatever the size of the panel. Keyframes cost O(pixels)
+and only go out every `keyframe_interval` frames, after `fill()` and when most
+of the strip changed.
+
+A delta only applies on top of the frame right before it, so the receiver
+drops deltas after a lost or reordered packet and waits for the next keyframe
+to arrive in full.
+
+Every sender picks a random session id. When the host restarts, the new sender
+counts from sequence 1 again, and the receiver resyncs on the first keyframe of
+the new session instead of dropping it as older than the last frame it showed.
+"""
+
+import argparse
+import logging
+import random
+import socket
+import struct
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"S2"
+KEYFRAME = 0
+DELTA = 1
+DEFAULT_PORT = 7777
+KEYFRAME_INTERVAL = 32
+
+# magic, kind, session, sequence number, number of pixels, first pixel, chunk, chunks
+_HEADER = struct.Struct("<2sBIIIIHH")
+_DELTA_RUN = struct.Struct("<IB")  # start pixel, number of pixels, then their colors
+_MAX_RUN = 255
+_MAX_DATAGRAM = 65507
+# Ethernet MTU minus the IP and UDP headers, packets aren't fragmented
+_MAX_PACKET = 1472
+MAX_PAYLOAD = _MAX_PACKET - _HEADER.size
+_SEQUENCE_MASK = 0xFFFFFFFF
+
+
+def _is_newer(sequence: int, than: int) -> bool:
+    """Sequence number comparison that survives wrapping around."""
+    return 0 < (sequence - than) & _SEQUENCE_MASK < 1 << 31
+
+
+def encode_keyframe(frame: bytes, max_payload: int = MAX_PAYLOAD) -> list[tuple[int, bytes]]:
+    """The strip as (first pixel, runs) chunks of at most `max_payload` bytes."""
+    chunks = []
+    runs = bytearray()
+    first = 0
+    num_pixels = len(frame) // 3
+    i = 0
+    while i < num_pixels:
+        color = frame[i * 3 : i * 3 + 3]
+        count = 1
+        while (
+            i + count < num_pixels
+            and count < _MAX_RUN
+            and frame[(i + count) * 3 : (i + count) * 3 + 3] == color
+        ):
+            count += 1
+        if len(runs) + 4 > max_payload:
+            chunks.append((first, bytes(runs)))
+            runs = bytearray()
+            first = i
+        runs.append(count)
+        runs += color
+        i += count
+    chunks.append((first, bytes(runs)))
+    return chunks
+
+
+def decode_keyframe(payload: bytes) -> bytearray:
+    """The pixels of one keyframe chunk."""
+    frame = bytearray()
+    for offset in range(0, len(payload) - 3, 4):
+        frame += payload[offset + 1 : offset + 4] * payload[offset]
+    return frame
+
+
+def encode_delta(frame: bytes, indices: list[int], max_payload: int = MAX_PAYLOAD) -> list[bytes]:
+    """Runs of the pixels at the sorted `indices`, in chunks of at most `max_payload` bytes."""
+    chunks = []
+    runs = bytearray()
+    i = 0
+    while i < len(indices):
+        start = indices[i]
+        count = 1
+        while (
+            i + count < len(indices) and count < _MAX_RUN and indices[i + count] == start + count
+        ):
+            count += 1
+        if runs and len(runs) + _DELTA_RUN.size + count * 3 > max_payload:
+            chunks.append(bytes(runs))
+            runs = bytearray()
+        runs += _DELTA_RUN.pack(start, count)
+        runs += frame[start * 3 : (start + count) * 3]
+        i += count
+    chunks.append(bytes(runs))
+    return chunks
+
+
+def apply_delta(frame: bytearray, payload: bytes) -> list[int]:
+    """Writes the runs of a delta chunk into `frame`, returns the pixels that changed."""
+    changed = []
+    offset = 0
+    while offset < len(payload):
+        start, count = _DELTA_RUN.unpack_from(payload, offset)
+        offset += _DELTA_RUN.size
+        if (start + count) * 3 > len(frame):
+            raise ValueError(f"Delta run {start}+{count} is off the strip")
+        colors = payload[offset : offset + count * 3]
+        for i in range(count):
+            pixel = (start + i) * 3
+            if frame[pixel : pixel + 3] != colors[i * 3 : i * 3 + 3]:
+                changed.append(start + i)
+        frame[start * 3 : (start + count) * 3] = colors
+        offset += count * 3
+    return changed
+
+
+class UdpPixelSender:
+    """Pixel strip that sends each shown frame to `address` as UDP packets."""
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        num_pixels: int,
+        keyframe_interval: int = KEYFRAME_INTERVAL,
+        max_payload: int = MAX_PAYLOAD,
+    ):
+        self.address = address
+        self.num_pixels = num_pixels
+        self.keyframe_interval = keyframe_interval
+        self.max_payload = max_payload
+        self.session = random.getrandbits(32)
+        self.sequence = 0
+        self.frames_sent = 0
+        self.keyframes_sent = 0
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self._frame = bytearray(num_pixels * 3)
+        # Pixels written since the last frame, None when the next one has to be a keyframe
+        self._dirty: set[int] | None = None
+        self._since_keyframe = 0
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def __setitem__(self, index: int, color):
+        self._frame[index * 3 : index * 3 + 3] = bytes(color)
+        if self._dirty is not None:
+            self._dirty.add(index)
+
+    def fill(self, color):
+        self._frame[:] = bytes(color) * self.num_pixels
+        self._dirty = None
+
+    def show(self):
+        dirty = self._dirty
+        if (
+            dirty is None
+            or self._since_keyframe >= self.keyframe_interval
+            or len(dirty) > self.num_pixels // 4
+        ):
+            kind = KEYFRAME
+            chunks = encode_keyframe(self._frame, self.max_payload)
+        else:
+            kind = DELTA
+            runs = encode_delta(self._frame, sorted(dirty), self.max_payload)
+            chunks = [(0, payload) for payload in runs]
+        self.sequence = (self.sequence + 1) & _SEQUENCE_MASK
+        for chunk, (first, payload) in enumerate(chunks):
+            header = _HEADER.pack(
+                MAGIC, kind, self.session, self.sequence, self.num_pixels, first, chunk, len(chunks)
+            )
+            try:
+                self.bytes_sent += self._socket.sendto(header + payload, self.address)
+                self.packets_sent += 1
+            except OSError as e:
+                # Nobody listening or the network is down, the next keyframe catches up
+                logger.debug("Could not send frame %d: %s", self.sequence, e)
+        self._dirty = set()
+        self.frames_sent += 1
+        if kind == KEYFRAME:
+            self.keyframes_sent += 1
+            self._since_keyframe = 0
+        else:
+            self._since_keyframe += 1
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Frames leave in show(), there is nothing to wait for."""
+        return True
+
+    def close(self):
+        self._socket.close()
+
+    def stats(self) -> dict:
+        return {
+            "frames_sent": self.frames_sent,
+            "keyframes_sent": self.keyframes_sent,
+            "packets_sent": self.packets_sent,
+            "bytes_sent": self.bytes_sent,
+        }
+
+
+def sender_from_url(url: str, num_pixels: int) -> UdpPixelSender:
+    """`UdpPixelSender` for a `udp://host:port` url (`$SNAKE_OUTPUT`)."""
+    parts = urlsplit(url)
+    if parts.scheme != "udp" or not parts.hostname:
+        raise ValueError(f"Unsupported output {url!r}, expected udp://host:port")
+    return UdpPixelSender((parts.hostname, parts.port or DEFAULT_PORT), num_pixels)
+
+
+class PixelReceiver:
+    """Rebuilds the frames from `UdpPixelSender` packets."""
+
+    def __init__(self, num_pixels: int):
+        self.num_pixels = num_pixels
+        self.frame = bytearray(num_pixels * 3)
+        self.session: int | None = None  # Of the sender the frames come from
+        self.sequence: int | None = None  # Of the last complete frame, None until a keyframe
+        self.frames_applied = 0
+        self.packets_dropped = 0
+        self.completed = False  # The last packet handled completed a frame
+        # The frame whose chunks are arriving: (session, sequence), chunks, chunks received
+        self._receiving: tuple[int, int] | None = None
+        self._chunks = 0
+        self._received: set[int] = set()
+
+    def handle(self, packet: bytes) -> list[int]:
+        """Applies a packet, returns the strip indices that changed."""
+        self.completed = False
+        if len(packet) < _HEADER.size:
+            self.packets_dropped += 1
+            return []
+        magic, kind, session, sequence, num_pixels, first, chunk, chunks = _HEADER.unpack_from(
+            packet
+        )
+        payload = packet[_HEADER.size :]
+        if (
+            magic != MAGIC
+            or num_pixels != self.num_pixels
+            or kind not in (KEYFRAME, DELTA)
+            or chunk >= chunks
+        ):
+            self.packets_dropped += 1
+            return []
+        if (session, sequence) == self._receiving:
+            if chunk in self._received or chunks != self._chunks:
+                # Duplicate
+                self.packets_dropped += 1
+                return []
+        elif not self._starts_frame(kind, session, sequence):
+            self.packets_dropped += 1
+            return []
+        else:
+            self._receiving = (session, sequence)
+            self._chunks = chunks
+            self._received = set()
+
+        try:
+            if kind == KEYFRAME:
+                changed = self._apply_keyframe(first, decode_keyframe(payload))
+            else:
+                changed = apply_delta(self.frame, payload)
+        except (ValueError, struct.error) as e:
+            logger.warning("Dropping malformed packet %d: %s", sequence, e)
+            self.packets_dropped += 1
+            return []
+
+        self._received.add(chunk)
+        if len(self._received) == chunks:
+            self.session = session
+            self.sequence = sequence
+            self.frames_applied += 1
+            self.completed = True
+        return changed
+
+    def _starts_frame(self, kind: int, session: int, sequence: int) -> bool:
+        if session != self.session:
+            # A new sender, wait for its first keyframe
+            return kind == KEYFRAME
+        if self.sequence is not None and not _is_newer(sequence, self.sequence):
+            # Duplicate or older than the frame we have
+            return False
+        # A delta needs the complete frame right before it, after a lost packet
+        # only a keyframe gets the receiver back in sync
+        return kind == KEYFRAME or (
+            self.sequence is not None and sequence == (self.sequence + 1) & _SEQUENCE_MASK
+        )
+
+    def _apply_keyframe(self, first: int, pixels: bytearray) -> list[int]:
+        start, end = first * 3, first * 3 + len(pixels)
+        if end > len(self.frame):
+            raise ValueError(f"Keyframe chunk at {first} is off the strip")
+        if self.sequence is None:
+            # The strip's content is unknown before the first frame
+            changed = list(range(first, first + len(pixels) // 3))
+        else:
+            frame = self.frame
+            changed = [
+                first + i
+                for i in range(len(pixels) // 3)
+                if frame[start + i * 3 : start + i * 3 + 3] != pixels[i * 3 : i * 3 + 3]
+            ]
+        self.frame[start:end] = pixels
+        return changed
+
+    def pixel(self, index: int) -> tuple:
+        return tuple(self.frame[index * 3 : index * 3 + 3])
+
+
+def serve(sock: socket.socket, receiver: PixelReceiver, pixels, max_packets: int | None = None):
+    """
+    Writes the frames arriving on `sock` to a strip (anything with item
+    assignment and show). The strip is shown once a frame arrived in full.
+    """
+    handled = 0
+    pending = False
+    while max_packets is None or handled < max_packets:
+        packet = sock.recv(_MAX_DATAGRAM)
+        handled += 1
+        for index in receiver.handle(packet):
+            pixels[index] = receiver.pixel(index)
+            pending = True
+        if pending and receiver.completed:
+            pixels.show()
+            pending = False
+
+
+class SimStrip:
+    """Draws strip pixels into a pygame window, laid out like the map."""
+
+    def __init__(self, spec, scale: int):
+        import pygame
+
+        self.pygame = pygame
+        self.scale = scale
+        self.points = {
+            index: spec.point(cell) for cell, index in enumerate(spec.strip_index) if index >= 0
+        }
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((spec.width * scale, spec.height * scale))
+
+    def __setitem__(self, index: int, color):
+        point = self.points.get(index)
+        if point is not None:
+            rect = (point.x * self.scale, point.y * self.scale, self.scale, self.scale)
+            self.pygame.draw.rect(self.screen, color, rect)
+
+    def fill(self, color):
+        self.screen.fill(color)
+
+    def show(self):
+        self.pygame.display.flip()
+        # SDL turns SIGINT/SIGTERM into QUIT events, as does closing the window
+        if self.pygame.event.peek(self.pygame.QUIT):
+            raise KeyboardInterrupt
+
+
+def _open_strip(args: argparse.Namespace, spec):
+    if args.output == "sim":
+        return SimStrip(spec, args.scale)
+    import board
+    import neopixel_spi as neopixel
+
+    return neopixel.NeoPixel_SPI(
+        board.SPI(), spec.num_pixels, pixel_order=neopixel.GRB, auto_write=False
+    )
+
+
+def main(argv: list[str] | None = None):
+    from snake.map_spec import load_map
+
+    parser = argparse.ArgumentParser(
+        prog="snake-receiver", description="Shows frames streamed with SNAKE_OUTPUT=udp://..."
+    )
+    parser.add_argument("--listen", default=f"0.0.0.0:{DEFAULT_PORT}", help="host:port")
+    parser.add_argument("--output", choices=["strip", "sim"], default="strip")
+    parser.add_argument("--map", help="Map the sender runs, $SNAKE_MAP by default")
+    parser.add_argument("--scale", type=int, default=50, help="Simulator pixels per cell")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    spec = load_map(args.map)
+    host, _, port = args.listen.rpartition(":")
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host or "0.0.0.0", int(port)))
+    receiver = PixelReceiver(spec.num_pixels)
+    logger.info("Listening on %s for %d pixels", args.listen, spec.num_pixels)
+    try:
+        serve(sock, receiver, _open_strip(args, spec))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+        logger.info(
+            "%d frames shown, %d packets dropped", receiver.frames_applied, receiver.packets_dropped
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import random
+import socket
+
+import pytest
+
+from snake.framebuffer import LedFramebuffer
+from snake.led_output import FakePixelStrip
+from snake.net_output import (
+    DELTA,
+    KEYFRAME,
+    PixelReceiver,
+    UdpPixelSender,
+    apply_delta,
+    decode_keyframe,
+    encode_delta,
+    encode_keyframe,
+    serve,
+)
+from snake.snake_game import MAP, SnakeGame
+
+NUM_PIXELS = 300
+
+
+def _random_frame(rng, colors):
+    return b"".join(rng.choice(colors) for _ in range(NUM_PIXELS))
+
+
+def _decode_keyframe(chunks):
+    frame = bytearray()
+    for first, payload in chunks:
+        assert first * 3 == len(frame)
+        frame += decode_keyframe(payload)
+    return bytes(frame)
+
+
+def test_keyframe_and_delta_round_trip():
+    rng = random.Random(1)
+    colors = [bytes((2, 4, 0))] * 8 + [bytes((128, 0, 128)), bytes((255, 0, 0))]
+    previous = _random_frame(rng, colors)
+    for _ in range(50):
+        frame = _random_frame(rng, colors)
+        assert _decode_keyframe(encode_keyframe(frame)) == frame
+        assert _decode_keyframe(encode_keyframe(frame, max_payload=40)) == frame
+        changed = [
+            i for i in range(NUM_PIXELS) if frame[i * 3 : i * 3 + 3] != previous[i * 3 : i * 3 + 3]
+        ]
+        patched = bytearray(previous)
+        for payload in encode_delta(frame, changed, max_payload=100):
+            assert len(payload) <= 100
+            apply_delta(patched, payload)
+        assert patched == frame
+        previous = frame
+    # Long runs are split
+    assert _decode_keyframe(encode_keyframe(bytes(3) * 1000)) == bytes(3) * 1000
+    assert len(encode_keyframe(bytes(3) * 1000)[0][1]) == 4 * 4
+
+
+def _localhost_pair(keyframe_interval=8, num_pixels=MAP.num_pixels):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(5)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sender = UdpPixelSender(sock.getsockname(), num_pixels, keyframe_interval)
+    return sock, sender
+
+
+def test_game_frames_arrive_over_localhost():
+    sock, sender = _localhost_pair()
+    framebuffer = LedFramebuffer(sender, MAP.rows(), MAP.num_pixels, (2, 4, 0))
+    strip = FakePixelStrip(MAP.num_pixels)
+    receiver = PixelReceiver(MAP.num_pixels)
+    game = SnakeGame(seed=2)
+    game.initialize_game()
+    try:
+        serve(sock, receiver, strip, max_packets=1)  # The framebuffer reset
+        for _ in range(200):
+            if game.game_over:
+                game.initialize_game()
+            game.update_game()
+            groups = (((128, 0, 128), (game.snake_head,)), ((0, 0, 128), game.snake))
+            if framebuffer.render(groups):
+                serve(sock, receiver, strip, max_packets=1)
+                assert b"".join(bytes(color) for color in strip.buf) == sender._frame
+    finally:
+        sock.close()
+        sender.close()
+    assert receiver.packets_dropped == 0
+    # Most frames only move the head and the tail
+    assert sender.keyframes_sent < sender.frames_sent / 4
+    assert sender.bytes_sent < sender.frames_sent * MAP.num_pixels
+
+
+def test_lost_packet_waits_for_keyframe():
+    sock, sender = _localhost_pair(keyframe_interval=4)
+    receiver = PixelReceiver(MAP.num_pixels)
+    packets = []
+    try:
+        for i in range(10):
+            sender[i] = (255, 0, 0)
+            sender.show()
+            packets.append(sock.recv(65536))
+    finally:
+        sock.close()
+        sender.close()
+    kinds = [packet[2] for packet in packets]
+    assert kinds == [KEYFRAME, DELTA, DELTA, DELTA, DELTA, KEYFRAME, DELTA, DELTA, DELTA, DELTA]
+
+    assert receiver.handle(packets[0]) == list(range(MAP.num_pixels))
+    assert receiver.handle(packets[1]) == [1]
+    # packets[2] is lost, the deltas after it can't be applied
+    assert receiver.handle(packets[3]) == []
+    assert receiver.handle(packets[4]) == []
+    assert receiver.handle(packets[5]) == [2, 3, 4, 5]
+    assert receiver.handle(packets[5]) == []  # Duplicate
+    assert receiver.handle(packets[6]) == [6]
+    assert receiver.pixel(6) == (255, 0, 0)
+    assert receiver.packets_dropped == 3
+
+
+def test_restarted_sender_resyncs_on_keyframe():
+    receiver = PixelReceiver(MAP.num_pixels)
+    sock, sender = _localhost_pair()
+    try:
+        for i in range(100):
+            sender[i % MAP.num_pixels] = (255, 0, 0)
+            sender.show()
+            receiver.handle(sock.recv(65536))
+        assert receiver.frames_applied == 100
+        sender.close()
+
+        # The host restarted, the new sender counts from sequence 1 again
+        sender = UdpPixelSender(sock.getsockname(), MAP.num_pixels, keyframe_interval=4)
+        sender.fill((0, 0, 255))
+        for _ in range(3):
+            sender.show()
+            receiver.handle(sock.recv(65536))
+    finally:
+        sock.close()
+        sender.close()
+    assert receiver.frames_applied == 103 and receiver.packets_dropped == 0
+    assert receiver.pixel(0) == (0, 0, 255)
+
+
+def _receive_frame(sock, receiver):
+    changed = []
+    while True:
+        changed += receiver.handle(sock.recv(65536))
+        if receiver.completed:
+            return changed
+
+
+@pytest.mark.parametrize("size", [128, 256])
+def test_large_panels_split_keyframes(size):
+    num_pixels = size * size
+    rng = random.Random(size)
+    sock, sender = _localhost_pair(num_pixels=num_pixels)
+    receiver = PixelReceiver(num_pixels)
+    try:
+        for i in range(num_pixels):
+            sender[i] = (rng.randrange(256), 0, 0)
+        sender.show()
+        packets = sender.packets_sent
+        assert packets > 1
+        assert _receive_frame(sock, receiver) == list(range(num_pixels))
+        assert receiver.frame == sender._frame
+
+        # A delta is one packet however large the panel
+        for i in (5, num_pixels - 1):
+            sender[i] = (0, 255, 0)
+        sender.show()
+        assert sender.packets_sent == packets + 1
+        assert _receive_frame(sock, receiver) == [5, num_pixels - 1]
+        assert receiver.frame == sender._frame
+    finally:
+        sock.close()
+        sender.close()
+    assert receiver.packets_dropped == 0
+
+
+def test_delta_size_follows_the_changed_pixels():
+    sizes = []
+    for num_pixels in (140, 64 * 64, 256 * 256):
+        sock, sender = _localhost_pair(num_pixels=num_pixels)
+        try:
+            sender.fill((0, 0, 0))
+            sender.show()
+            sent = sender.bytes_sent
+            for i in (0, 1, num_pixels // 2):
+                sender[i] = (255, 0, 0)
+            sender.show()
+            sizes.append(sender.bytes_sent - sent)
+        finally:
+            sock.close()
+            sender.close()
+    assert sizes[0] == sizes[1] == sizes[2]
@@ -0,0 +1,259 @@
+"""
+Compact binary game recordings.
+
+A recording file is the magic header followed by one record per game:
+
+    b"G"  seed (u64)  map hash (8 bytes)  one byte per tick  0xFF  final length (u16)
+
+Every tick byte is the index in `const.DIRECTIONS` of the direction the snake
+was set to move in before `update_game`. Since all the randomness of a game
+comes from its seed, that is enough to replay it exactly on the same map. The
+map hash covers what the game rules see of a map (size, blocked cells and
+moves), replaying refuses games recorded on any other map. Files are
+append-only, a record cut short by a crash is ignored by the reader.
+
+    python -m snake.recording record --agent bfs --games 100000 -o bfs.snkr
+    python -m snake.recording verify bfs.snkr
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import mmap
+import os
+import random
+import struct
+import sys
+from collections import namedtuple
+from typing import BinaryIO, Iterator
+
+from snake import snake_game
+from snake.const import DIRECTIONS
+from snake.map_spec import MapSpec
+from snake.types import Direction
+
+MAGIC = b"SNKR\x02"
+GAME_MARKER = b"G"
+END_MARKER = 0xFF
+_GAME_HEADER = struct.Struct("<cQ8s")
+_GAME_END = struct.Struct("<BH")
+
+_DIRECTION_INDEX = {direction: i for i, direction in enumerate(DIRECTIONS)}
+
+RecordedGame = namedtuple("RecordedGame", ["seed", "map_hash", "moves", "final_length"])
+
+
+def game_map_hash(spec: MapSpec) -> bytes:
+    """Identifies the game rules of a map: its size, blocked cells and moves."""
+    source = repr((spec.width, spec.height, spec.blocked, spec.next_cell, spec.flips))
+    return hashlib.sha256(source.encode()).digest()[:8]
+
+
+CURRENT_MAP_HASH = game_map_hash(snake_game.MAP)
+
+
+def encode_game(
+    seed: int, moves: bytes | bytearray, final_length: int, map_hash: bytes = CURRENT_MAP_HASH
+) -> bytes:
+    header = _GAME_HEADER.pack(GAME_MARKER, seed, map_hash)
+    return header + moves + _GAME_END.pack(END_MARKER, final_length)
+
+
+class GameRecorder:
+    """
+    Appends the games played on a `SnakeGame` to a recording file.
+
+    Call `start(game)` after `initialize_game`, `record(game)` every tick right
+    before `update_game` (after the agent or player input has been applied) and
+    `finish(game)` once the game is over. A game is only written out when it
+    finishes, so recording costs an append to a bytearray per tick.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file: BinaryIO = open(path, "ab")
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+            self._file.flush()
+        self._seed: int | None = None
+        self._moves = bytearray()
+
+    def start(self, game: snake_game.SnakeGame):
+        self._seed = game.seed
+        self._moves.clear()
+
+    def record(self, game: snake_game.SnakeGame):
+        self._moves.append(_DIRECTION_INDEX[game.direction])
+
+    def finish(self, game: snake_game.SnakeGame):
+        if self._seed is None:
+            return
+        self._file.write(encode_game(self._seed, self._moves, len(game.snake)))
+        self._file.flush()
+        self._seed = None
+
+    def close(self):
+        self._file.close()
+
+
+class RecordingReader:
+    """
+    Memory-mapped recording file.
+
+    Opening it only scans for the record boundaries, `reader[i]` slices game i
+    out of the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            if self._mmap[: len(MAGIC) - 1] == MAGIC[:-1]:
+                raise ValueError(f"{path} is an older recording format without map hashes")
+            raise ValueError(f"{path} is not a snake recording")
+        # (seed, map hash, start of the moves, end of the moves) per complete record
+        self._index: list[tuple[int, bytes, int, int]] = []
+        data = self._mmap
+        pos = len(MAGIC)
+        while pos + _GAME_HEADER.size <= len(data):
+            marker, seed, map_hash = _GAME_HEADER.unpack_from(data, pos)
+            if marker != GAME_MARKER:
+                raise ValueError(f"{path}: corrupt record at offset {pos}")
+            start = pos + _GAME_HEADER.size
+            end = data.find(bytes([END_MARKER]), start)
+            if end < 0 or end + _GAME_END.size > len(data):
+                break  # Truncated last record
+            self._index.append((seed, map_hash, start, end))
+            pos = end + _GAME_END.size
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __getitem__(self, i: int) -> RecordedGame:
+        seed, map_hash, start, end = self._index[i]
+        _, final_length = _GAME_END.unpack_from(self._mmap, end)
+        return RecordedGame(seed, map_hash, self._mmap[start:end], final_length)
+
+    def __iter__(self) -> Iterator[RecordedGame]:
+        return (self[i] for i in range(len(self)))
+
+    def num_moves(self) -> int:
+        return sum(end - start for _, _, start, end in self._index)
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+
+def replay(record: RecordedGame) -> Iterator[tuple[snake_game.SnakeGame, Direction]]:
+    """
+    Replays a recorded game, yielding the game and the move taken at every tick.
+
+    The game is yielded in its state before the move and updated in place once
+    the consumer resumes, copy anything that has to outlive the iteration.
+    """
+    if record.map_hash != CURRENT_MAP_HASH:
+        raise ValueError(
+            f"Recorded on map {record.map_hash.hex()}, the game runs map {CURRENT_MAP_HASH.hex()}"
+        )
+    game = snake_game.SnakeGame()
+    game.initialize_game(record.seed)
+    for move in record.moves:
+        direction = DIRECTIONS[move]
+        yield game, direction
+        game.set_next_direction(direction)
+        game.update_game()
+
+
+def verify(record: RecordedGame) -> bool:
+    """True if replaying the game ends with the recorded length."""
+    game = None
+    for game, _ in replay(record):
+        pass
+    if game is None:
+        game = snake_game.SnakeGame()
+        game.initialize_game(record.seed)
+    return len(game.snake) == record.final_length
+
+
+def record_games(agent_name: str, num_games: int, seed: int, max_steps: int) -> bytes:
+    """Plays `num_games` games with one agent and returns their records. Runs inside a worker."""
+    from snake.bench import load_agent
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = load_agent(agent_name)
+        random.seed(seed)
+        game = snake_game.SnakeGame()
+        records = bytearray()
+        for _ in range(num_games):
+            game.initialize_game()
+            moves = bytearray()
+            while not game.game_over and len(moves) < max_steps:
+                direction = agent(game)
+                if direction is not None:
+                    game.set_next_direction(direction)
+                moves.append(_DIRECTION_INDEX[game.direction])
+                game.update_game()
+            records += encode_game(game.seed, moves, len(game.snake))
+    return bytes(records)
+
+
+def _record(args):
+    from concurrent.futures import ProcessPoolExecutor
+
+    from snake.bench import DEFAULT_MAX_STEPS
+
+    max_steps = args.max_steps or DEFAULT_MAX_STEPS
+    chunks = [
+        (args.agent, min(args.chunk_size, args.games - start), args.seed + i, max_steps)
+        for i, start in enumerate(range(0, args.games, args.chunk_size))
+    ]
+    with open(args.output, "ab") as f:
+        if f.tell() == 0:
+            f.write(MAGIC)
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            for records in executor.map(record_games, *zip(*chunks)):
+                f.write(records)
+    print(f"Recorded {args.games} {args.agent} games to {args.output}")
+
+
+def _verify(args) -> int:
+    failures = 0
+    for path in args.paths:
+        reader = RecordingReader(path)
+        bad = [i for i, record in enumerate(reader) if not verify(record)]
+        print(f"{path}: {len(reader)} games, {reader.num_moves()} moves, {len(bad)} diverged")
+        failures += len(bad)
+        reader.close()
+    return 1 if failures else 0
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m snake.recording", description=__doc__.split("\n\n")[0]
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record = subparsers.add_parser("record", help="Record headless games played by an agent")
+    record.add_argument("--agent", default="bfs")
+    record.add_argument("--games", type=int, default=1000)
+    record.add_argument("--jobs", type=int, default=os.cpu_count())
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("--chunk-size", type=int, default=100, help="Games per worker task")
+    record.add_argument("--max-steps", type=int)
+    record.add_argument("-o", "--output", required=True)
+    record.set_defaults(run=_record)
+
+    check = subparsers.add_parser("verify", help="Replay recordings and check they end the same")
+    check.add_argument("paths", nargs="+")
+    check.set_defaults(run=_verify)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.run(args))
+
+
+if __name__ == "__main__":
+    main()
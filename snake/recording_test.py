@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from snake.agent import agent_move_bfs
+from snake.map_spec import load_map
+from snake.recording import (
+    CURRENT_MAP_HASH,
+    GameRecorder,
+    RecordedGame,
+    RecordingReader,
+    game_map_hash,
+    record_games,
+    replay,
+    verify,
+)
+from snake.snake_game import SnakeGame
+
+
+def _play(game: SnakeGame, recorder: GameRecorder, max_steps: int = 300) -> list:
+    heads = []
+    recorder.start(game)
+    for _ in range(max_steps):
+        if game.game_over:
+            break
+        if (direction := agent_move_bfs(game)) is not None:
+            game.set_next_direction(direction)
+        recorder.record(game)
+        game.update_game()
+        heads.append(game.snake_head)
+    recorder.finish(game)
+    return heads
+
+
+def test_seeded_games_are_reproducible():
+    a, b = SnakeGame(), SnakeGame()
+    a.initialize_game(seed=7)
+    b.initialize_game(seed=7)
+    assert a.food == b.food
+    random.seed(1)
+    c = SnakeGame()
+    c.initialize_game()
+    random.seed(1)
+    d = SnakeGame()
+    d.initialize_game()
+    assert c.seed == d.seed and c.food == d.food
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "games.snkr")
+    recorder = GameRecorder(path)
+    game = SnakeGame(seed=5)
+    played = []
+    for _ in range(3):
+        game.initialize_game()
+        played.append((game.seed, _play(game, recorder)))
+    recorder.close()
+
+    reader = RecordingReader(path)
+    assert len(reader) == 3
+    assert reader.num_moves() == sum(len(heads) for _, heads in played)
+    for record, (seed, heads) in zip(reader, played):
+        assert record.seed == seed
+        # Every tick is yielded before its move, i.e. after the previous one
+        replayed = [replay_game.snake_head for replay_game, _ in replay(record)]
+        assert replayed[1:] == heads[:-1]
+        assert verify(record)
+    reader.close()
+
+
+def test_truncated_record_is_ignored(tmp_path):
+    path = tmp_path / "games.snkr"
+    recorder = GameRecorder(str(path))
+    game = SnakeGame(seed=1)
+    game.initialize_game()
+    _play(game, recorder, max_steps=20)
+    recorder.close()
+    # Appending a second file section works as well as a crash mid-record
+    with open(path, "ab") as f:
+        f.write(record_games("bfs", 2, seed=3, max_steps=50))
+        f.write(b"G\x01\x02\x03")
+    reader = RecordingReader(str(path))
+    assert len(reader) == 3
+    assert all(verify(record) for record in reader)
+    reader.close()
+
+
+def test_games_from_other_maps_are_refused(tmp_path):
+    hashes = {game_map_hash(load_map(name)) for name in ("led_map", "led_map_v2")}
+    assert len(hashes) == 2
+    other = next(iter(hashes - {CURRENT_MAP_HASH}))
+    with pytest.raises(ValueError, match="Recorded on map"):
+        next(replay(RecordedGame(1, other, b"\x00", 3)))
+
+    path = tmp_path / "old.snkr"
+    path.write_bytes(b"SNKR\x01G" + bytes(9))
+    with pytest.raises(ValueError, match="older recording format"):
+        RecordingReader(str(path))
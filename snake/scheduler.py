@@ -0,0 +1,92 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from snake import snake_game
+from snake.metrics import METRICS
+from snake.types import Direction
+
+Agent = Callable[[snake_game.SnakeGame], Direction | None]
+
+
+class TickScheduler:
+    """
+    Fires game ticks on absolute deadlines (start + n * period).
+
+    A slow tick doesn't push every later tick back: the next deadline stays on
+    the grid. Deadlines that were missed entirely are skipped and counted in
+    `overruns` instead of being run late.
+    """
+
+    def __init__(self, period: float, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.period = period
+        self.ticks = 0
+        self.overruns = 0
+        self.lateness = 0.0  # How late the last tick fired, in seconds
+        self.next_deadline = clock() + period
+
+    def reset(self, period: float | None = None):
+        """Restarts the deadline grid from now, e.g. after a pause or a speed change."""
+        if period is not None:
+            self.period = period
+        self.next_deadline = self.clock() + self.period
+
+    def poll(self) -> bool:
+        """True if a tick is due; advances to the next deadline."""
+        now = self.clock()
+        if now < self.next_deadline:
+            return False
+        self.lateness = now - self.next_deadline
+        missed = int(self.lateness // self.period)
+        self.overruns += missed
+        self.next_deadline += (missed + 1) * self.period
+        self.ticks += 1
+        return True
+
+    def time_until_due(self) -> float:
+        return max(0.0, self.next_deadline - self.clock())
+
+
+class DecisionPipeline:
+    """
+    Computes the agent decision for the next tick on a worker thread.
+
+    `prefetch` is called right after a tick's update, so the agent runs while the
+    frame is being pushed to the LEDs; `decision` then picks the result up at the
+    next tick. The game must not change in between, call `discard` before
+    modifying it out of band (restart, mode change).
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agent")
+        self._future: Future | None = None
+        self._agent: Agent | None = None
+
+    def prefetch(self, agent: Agent, game: snake_game.SnakeGame):
+        self.discard()
+        self._agent = agent
+        self._future = self._executor.submit(self._decide, agent, game)
+
+    def decision(self, agent: Agent, game: snake_game.SnakeGame) -> Direction | None:
+        future, self._future = self._future, None
+        if future is not None and self._agent is agent:
+            return future.result()
+        if future is not None:
+            future.result()
+        return self._decide(agent, game)
+
+    @staticmethod
+    def _decide(agent: Agent, game: snake_game.SnakeGame) -> Direction | None:
+        with METRICS.timer("agent_decision"):
+            return agent(game)
+
+    def discard(self):
+        """Waits for a pending decision (it may be reading the game) and drops it."""
+        future, self._future = self._future, None
+        if future is not None:
+            future.result()
+
+    def shutdown(self):
+        self.discard()
+        self._executor.shutdown()
@@ -0,0 +1,52 @@
+import threading
+
+from snake.scheduler import DecisionPipeline, TickScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ticks_on_absolute_deadlines():
+    clock = FakeClock()
+    scheduler = TickScheduler(0.1, clock)
+    clock.now += 0.05
+    assert not scheduler.poll()
+    # A late tick doesn't shift the grid
+    clock.now = 100.13
+    assert scheduler.poll()
+    assert abs(scheduler.next_deadline - 100.2) < 1e-9
+    assert abs(scheduler.time_until_due() - 0.07) < 1e-9
+    assert not scheduler.poll()
+
+
+def test_overruns_are_counted():
+    clock = FakeClock()
+    scheduler = TickScheduler(0.1, clock)
+    clock.now = 100.35
+    assert scheduler.poll()
+    assert not scheduler.poll()
+    assert scheduler.overruns == 2
+    assert scheduler.ticks == 1
+    assert abs(scheduler.next_deadline - 100.4) < 1e-9
+
+
+def test_pipeline_uses_prefetched_decision():
+    threads = []
+
+    def agent(game):
+        threads.append(threading.current_thread())
+        return game
+
+    pipeline = DecisionPipeline()
+    pipeline.prefetch(agent, "state")
+    assert pipeline.decision(agent, "state") == "state"
+    assert threads[0] is not threading.main_thread()
+    # Without a prefetch the agent runs inline
+    assert pipeline.decision(agent, "other") == "other"
+    assert threads[1] is threading.main_thread()
+    pipeline.shutdown()
@@ -0,0 +1,287 @@
+"""
+Survival-aware search agent.
+
+Every tick the agent first looks for the shortest safe path to the food and
+replays it on a virtual copy of the snake: the path is only taken if the tail
+is still reachable from the head once the food is eaten, so the snake never
+eats its way into a dead end. Otherwise it runs an iterative-deepening
+lookahead over the real move rules (wrap-around, portals, blocked cells and the
+ignored reverse move) and picks the move whose subtree keeps the snake alive
+the longest with the most room around it, preferring to stay close to the food.
+
+The lookahead is anytime: it stops at a hard per-tick deadline and answers
+with the best move of the deepest search that finished.
+
+On a nearly full board the food can stay unsafe to eat for good and the snake
+would chase its tail forever. After `patience` ticks without eating the agent
+goes for the food anyway, so a game on the display always ends.
+"""
+
+import time
+from collections import deque
+from typing import Callable
+
+from snake import snake_game
+from snake.const import AGENT_GAME_SPEED, DIRECTIONS
+from snake.types import Direction
+
+# Share of a game tick the agent may think for, the rest is left for the
+# update, drawing and the LEDs
+SEARCH_BUDGET = AGENT_GAME_SPEED * 0.4
+MAX_DEPTH = 16
+
+_REVERSE = [DIRECTIONS.index(Direction(-d.x, -d.y)) for d in DIRECTIONS]
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class VirtualSnake:
+    """
+    Minimal copy of a `SnakeGame` over integer cell ids that can make and undo
+    moves, with the same occupancy-by-entry-tick layout as the game.
+    """
+
+    def __init__(self, game: snake_game.SnakeGame):
+        spec = snake_game.MAP
+        self.spec = spec
+        self.body: deque[int] = deque(spec.cell(point) for point in game.snake)
+        self.occupancy = [0] * spec.num_cells
+        self.tick = len(self.body)
+        for i, cell in enumerate(self.body):
+            self.occupancy[cell] = self.tick - i
+        self.direction = DIRECTIONS.index(game.direction)
+        self.food = -1 if game.food is None else spec.cell(game.food)
+
+    def legal_moves(self) -> list[int]:
+        """Directions that don't end the game, the reverse move is ignored by the game."""
+        head = self.body[0]
+        moves = []
+        for d in range(4):
+            if d == _REVERSE[self.direction]:
+                continue
+            cell = self.spec.next_cell[head * 4 + d]
+            if cell >= 0 and not self.spec.blocked[cell] and self.occupancy[cell] == 0:
+                moves.append(d)
+        return moves
+
+    def apply(self, d: int) -> tuple:
+        """Moves in direction `d` (must be legal), returns what `undo` needs."""
+        head = self.body[0]
+        cell = self.spec.next_cell[head * 4 + d]
+        undo = (self.direction, self.food, -1)
+        self.direction = _REVERSE[d] if self.spec.flips[head * 4 + d] else d
+        self.tick += 1
+        self.occupancy[cell] = self.tick
+        self.body.appendleft(cell)
+        if cell == self.food:
+            self.food = -1  # The next food is unknown
+        else:
+            tail = self.body.pop()
+            self.occupancy[tail] = 0
+            undo = (undo[0], undo[1], tail)
+        return undo
+
+    def undo(self, undo: tuple):
+        direction, food, tail = undo
+        cell = self.body.popleft()
+        self.occupancy[cell] = 0
+        self.tick -= 1
+        if tail >= 0:
+            self.body.append(tail)
+            self.occupancy[tail] = self.tick - len(self.body) + 1
+        self.direction = direction
+        self.food = food
+
+    def _safe(self, cell: int, step: int) -> bool:
+        # Same rule as SnakeGame.is_safe: segments leave one by one from the tail
+        return self.occupancy[cell] <= self.tick - len(self.body) + step
+
+    def path_to(
+        self, target: int, check: Callable[[], None] | None = None
+    ) -> list[int] | None:
+        """
+        Directions of the shortest safe path from the head to `target`. `check`
+        is called before every BFS layer, to stop the search by raising.
+        """
+        spec = self.spec
+        start = self.body[0]
+        parent = {start: (-1, -1)}
+        frontier = [start]
+        step = 0
+        while frontier:
+            if check is not None:
+                check()
+            next_frontier = []
+            for cell in frontier:
+                for d in range(4):
+                    next_cell = spec.next_cell[cell * 4 + d]
+                    if (
+                        next_cell < 0
+                        or next_cell in parent
+                        or spec.blocked[next_cell]
+                        or not self._safe(next_cell, step)
+                    ):
+                        continue
+                    parent[next_cell] = (cell, d)
+                    if next_cell == target:
+                        path = []
+                        while next_cell != start:
+                            next_cell, d = parent[next_cell]
+                            path.append(d)
+                        return path[::-1]
+                    next_frontier.append(next_cell)
+            frontier = next_frontier
+            step += 1
+        return None
+
+    def flood(self, check: Callable[[], None] | None = None) -> tuple[bool, int]:
+        """
+        Whether the tail can be reached from the head, and how many cells can.
+        `check` is called before every BFS layer, like in `path_to`.
+        """
+        spec = self.spec
+        tail = self.body[-1]
+        seen = {self.body[0]}
+        frontier = [self.body[0]]
+        tail_reached = False
+        step = 0
+        while frontier:
+            if check is not None:
+                check()
+            next_frontier = []
+            for cell in frontier:
+                for next_cell in spec.next_cell[cell * 4 : cell * 4 + 4]:
+                    if (
+                        next_cell < 0
+                        or next_cell in seen
+                        or spec.blocked[next_cell]
+                        or not self._safe(next_cell, step)
+                    ):
+                        continue
+                    seen.add(next_cell)
+                    tail_reached = tail_reached or next_cell == tail
+                    next_frontier.append(next_cell)
+            frontier = next_frontier
+            step += 1
+        return tail_reached, len(seen) - 1
+
+
+class SurvivalAgent:
+    """
+    See the module docstring. `budget` is the thinking time per tick in seconds,
+    measured with `clock`. Every search (the path to the food, the flood fills
+    and the lookahead) checks the deadline as it goes.
+    """
+
+    def __init__(
+        self,
+        budget: float = SEARCH_BUDGET,
+        max_depth: int = MAX_DEPTH,
+        patience: int | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.budget = budget
+        self.clock = clock
+        self.max_depth = max_depth
+        # Two laps around the board by default
+        self.patience = 2 * len(snake_game.MAP.open_cells) if patience is None else patience
+        self.last_depth = 0  # Depth of the last finished lookahead, for tuning
+        self._deadline = 0.0
+        self._game: snake_game.SnakeGame | None = None
+        self._length = 0
+        self._hungry_ticks = 0
+
+    def __call__(self, game: snake_game.SnakeGame) -> Direction | None:
+        self._deadline = self.clock() + self.budget
+        if game is not self._game or len(game.snake) != self._length:
+            self._game, self._length, self._hungry_ticks = game, len(game.snake), 0
+        self._hungry_ticks += 1
+
+        snake = VirtualSnake(game)
+        try:
+            if snake.food >= 0 and (path := snake.path_to(snake.food, self._check_time)):
+                hungry = self._hungry_ticks > self.patience
+                if hungry or self._leaves_tail_reachable(snake, path):
+                    self.last_depth = 0
+                    return DIRECTIONS[path[0]]
+        except _OutOfTime:
+            # The virtual snake may be left mid-path, the lookahead answers with
+            # the first legal move
+            snake = VirtualSnake(game)
+        move = self._lookahead(snake)
+        return None if move is None else DIRECTIONS[move]
+
+    def _check_time(self):
+        if self.clock() > self._deadline:
+            raise _OutOfTime
+
+    def _leaves_tail_reachable(self, snake: VirtualSnake, path: list[int]) -> bool:
+        undos = []
+        for d in path:
+            if d not in snake.legal_moves():
+                break
+            undos.append(snake.apply(d))
+        else:
+            tail_reached, _ = snake.flood(self._check_time)
+            for undo in reversed(undos):
+                snake.undo(undo)
+            return tail_reached
+        for undo in reversed(undos):
+            snake.undo(undo)
+        return False
+
+    def _lookahead(self, snake: VirtualSnake) -> int | None:
+        moves = snake.legal_moves()
+        if not moves:
+            return None
+        best_move = moves[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                values = []
+                for d in moves:
+                    undo = snake.apply(d)
+                    values.append((self._search(snake, depth - 1, 1), d))
+                    snake.undo(undo)
+            except _OutOfTime:
+                # The virtual snake is left mid-search, it is not used after this
+                break
+            best_value, best_move = max(values, key=lambda value: value[0])
+            self.last_depth = depth
+            if best_value[0] < depth:
+                break  # Every move dies within the horizon, looking further won't help
+            # Search the best move first next time
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+        return best_move
+
+    def _search(self, snake: VirtualSnake, depth: int, survived: int) -> tuple:
+        """(moves survived, tail reachable, length, room, -distance to food)."""
+        self._check_time()
+        if depth == 0:
+            return self._evaluate(snake, survived)
+        best = None
+        for d in snake.legal_moves():
+            undo = snake.apply(d)
+            value = self._search(snake, depth - 1, survived + 1)
+            snake.undo(undo)
+            if best is None or value > best:
+                best = value
+        if best is None:
+            return (survived, False, len(snake.body), 0, 0)
+        return best
+
+    def _evaluate(self, snake: VirtualSnake, survived: int) -> tuple:
+        tail_reached, room = snake.flood(self._check_time)
+        # Eaten food shows up in the length, the next food is unknown
+        distance = snake.spec.distance(snake.body[0], snake.food) if snake.food >= 0 else 0
+        return (survived, tail_reached, len(snake.body), room, -distance)
+
+
+_agent = SurvivalAgent()
+
+
+def agent_move_survival(game: snake_game.SnakeGame) -> Direction | None:
+    """Shortest path to the food when it is safe to eat, lookahead otherwise."""
+    return _agent(game)
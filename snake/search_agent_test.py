@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from snake.const import DIRECTIONS
+from snake.search_agent import SurvivalAgent, VirtualSnake, _OutOfTime
+from snake.snake_game import MAP, SnakeGame, get_next_head
+
+
+def test_virtual_snake_follows_game_rules():
+    random.seed(5)
+    game = SnakeGame()
+    game.initialize_game()
+    for _ in range(500):
+        if game.game_over:
+            game.initialize_game()
+        snake = VirtualSnake(game)
+        moves = snake.legal_moves()
+        if not moves:
+            game.initialize_game()
+            continue
+        d = random.choice(moves)
+        before = (list(snake.body), list(snake.occupancy), snake.tick, snake.direction)
+        undo = snake.apply(d)
+        game.set_next_direction(DIRECTIONS[d])
+        game.update_game()
+        assert not game.game_over
+        assert list(snake.body) == [MAP.cell(point) for point in game.snake]
+        assert DIRECTIONS[snake.direction] == game.direction
+        snake.undo(undo)
+        assert (list(snake.body), list(snake.occupancy), snake.tick, snake.direction) == before
+
+
+class _FakeClock:
+    """Advances by `step` seconds every time it is read, a stand-in for search work."""
+
+    def __init__(self, step: float):
+        self.now = 0.0
+        self.step = step
+        self.reads = 0
+
+    def __call__(self) -> float:
+        self.now += self.step
+        self.reads += 1
+        return self.now
+
+
+def test_respects_time_budget():
+    random.seed(6)
+    game = SnakeGame()
+    game.initialize_game()
+    # Powers of two keep the fake time exact
+    clock = _FakeClock(1 / 1024)
+    agent = SurvivalAgent(budget=5 / 1024, clock=clock)
+    for _ in range(300):
+        if game.game_over:
+            game.initialize_game()
+        clock.reads = 0
+        direction = agent(game)
+        # Setting the deadline, 5 checks within the budget, the one that stops the
+        # food path search and one more when the lookahead gives up right away
+        assert clock.reads <= 8
+        if direction is not None:
+            assert game.is_safe(get_next_head(game.snake_head, direction))
+            game.set_next_direction(direction)
+        game.update_game()
+
+
+def test_path_and_flood_stop_at_the_deadline():
+    game = SnakeGame(seed=0)
+    game.initialize_game()
+    snake = VirtualSnake(game)
+    calls = []
+
+    def out_of_time():
+        calls.append(1)
+        raise _OutOfTime
+
+    with pytest.raises(_OutOfTime):
+        snake.path_to(snake.food, out_of_time)
+    with pytest.raises(_OutOfTime):
+        snake.flood(out_of_time)
+    assert len(calls) == 2
+    # Out of time as soon as it starts, the agent still answers with a legal move
+    agent = SurvivalAgent(budget=0, clock=_FakeClock(1))
+    direction = agent(game)
+    assert direction is not None and game.is_safe(get_next_head(game.snake_head, direction))
+
+
+def test_outlives_shortest_path():
+    random.seed(7)
+    game = SnakeGame()
+    game.initialize_game()
+    # Bounded by depth instead of time so the result doesn't depend on the machine
+    agent = SurvivalAgent(budget=10, max_depth=4)
+    while not game.game_over:
+        if (direction := agent(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+    # The BFS agent averages ~33
+    assert len(game.snake) > 60
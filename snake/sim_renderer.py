@@ -0,0 +1,105 @@
+"""
+pygame renderer for the simulator.
+
+The static layer (background, blocked cells and portals) is drawn once into an
+off-screen surface. A frame then only repaints the cells whose color changed
+since the previous frame, either with their new color or by copying the static
+layer back, and hands just those rectangles to `pygame.display.update`.
+
+With `SDL_VIDEODRIVER=dummy` everything renders into memory without a window,
+which is what `snake-bench render` and the visual regression tests use.
+"""
+
+import hashlib
+
+import pygame
+
+from snake.framebuffer import CellGroups
+from snake.map_spec import MapSpec
+from snake.types import Color, Point
+
+
+def draw_static(surface: pygame.Surface, spec: MapSpec, scale: int, background, blocked, portals):
+    surface.fill(background)
+    for y in range(spec.height):
+        for x in range(spec.width):
+            point = Point(x, y)
+            if spec.is_blocked(x, y):
+                pygame.draw.rect(surface, blocked, (x * scale, y * scale, scale, scale))
+            elif portals.get(point) is not None:
+                pygame.draw.circle(
+                    surface,
+                    portals[point],
+                    (x * scale + scale / 2, y * scale + scale / 2),
+                    scale / 2,
+                )
+
+
+def draw_full(surface: pygame.Surface, static: pygame.Surface, groups: CellGroups, scale: int):
+    """Redraws the whole frame, the reference for `SimRenderer`."""
+    surface.blit(static, (0, 0))
+    for color, cells in reversed(list(groups)):
+        for point in cells:
+            pygame.draw.rect(surface, color, (point.x * scale, point.y * scale, scale, scale))
+
+
+def frame_digest(surface: pygame.Surface) -> str:
+    """Hash of the pixels, for visual regression checks."""
+    return hashlib.sha256(pygame.image.tobytes(surface, "RGB")).hexdigest()
+
+
+class SimRenderer:
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        spec: MapSpec,
+        scale: int,
+        background: Color,
+        blocked: Color,
+        portals: dict[Point, Color],
+    ):
+        self.screen = screen
+        self.scale = scale
+        self.static = pygame.Surface(screen.get_size())
+        draw_static(self.static, spec, scale, background, blocked, portals)
+        # Cells drawn over the static layer, None when the screen was cleared
+        self._lit: dict[Point, tuple] | None = {}
+        self.reset()
+
+    def reset(self):
+        """Shows the static layer alone and forgets the previous frame."""
+        self.screen.blit(self.static, (0, 0))
+        self._lit = {}
+        pygame.display.flip()
+
+    def clear(self, color=(0, 0, 0)):
+        self.screen.fill(color)
+        pygame.display.flip()
+        # Every cell has to be repainted on the next frame
+        self._lit = None
+
+    def render(self, groups: CellGroups) -> bool:
+        """Draws (color, cells) groups over the static layer, earlier groups win."""
+        if self._lit is None:
+            self.reset()
+        frame: dict[Point, tuple] = {}
+        for color, cells in groups:
+            color = tuple(color)
+            for point in cells:
+                frame.setdefault(point, color)
+
+        scale = self.scale
+        dirty = []
+        for point, color in frame.items():
+            if self._lit.get(point) != color:
+                rect = pygame.Rect(point.x * scale, point.y * scale, scale, scale)
+                self.screen.fill(color, rect)
+                dirty.append(rect)
+        for point in self._lit.keys() - frame.keys():
+            rect = pygame.Rect(point.x * scale, point.y * scale, scale, scale)
+            self.screen.blit(self.static, rect, rect)
+            dirty.append(rect)
+        self._lit = frame
+        if dirty:
+            pygame.display.update(dirty)
+        return bool(dirty)
@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+
+from snake import snake_game  # noqa: E402
+from snake.agent import agent_move_bfs  # noqa: E402
+from snake.sim_renderer import SimRenderer, draw_full, frame_digest  # noqa: E402
+from snake.types import Point  # noqa: E402
+
+SCALE = 10
+DARK = (10, 10, 10)
+BLOCKED = (30, 30, 30)
+
+
+@pytest.fixture
+def screen(monkeypatch):
+    monkeypatch.setitem(os.environ, "SDL_VIDEODRIVER", "dummy")
+    pygame.display.init()
+    yield pygame.display.set_mode((snake_game.WIDTH * SCALE, snake_game.HEIGHT * SCALE))
+    pygame.display.quit()
+
+
+def _renderer(screen):
+    spec = snake_game.MAP
+    portals = {spec.point(a): (0, 0, 255) for a, _ in spec.portals}
+    return SimRenderer(screen, spec, SCALE, DARK, BLOCKED, portals)
+
+
+def test_dirty_cells_match_full_redraw(screen):
+    renderer = _renderer(screen)
+    reference = pygame.Surface(screen.get_size())
+    game = snake_game.SnakeGame(seed=3)
+    game.initialize_game()
+    for frame in range(400):
+        if game.game_over:
+            game.initialize_game()
+        if (direction := agent_move_bfs(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+        groups = [((0, 255, 0), (game.snake_head,)), ((0, 128, 0), game.snake)]
+        if game.food is not None:
+            groups.append(((255, 0, 0), (game.food,)))
+        renderer.render(groups)
+        draw_full(reference, renderer.static, groups, SCALE)
+        assert frame_digest(screen) == frame_digest(reference), frame
+
+
+def test_only_changed_cells_are_repainted(screen, monkeypatch):
+    renderer = _renderer(screen)
+    groups = [((255, 0, 0), (Point(1, 1),))]
+    assert renderer.render(groups)
+
+    updates = []
+    monkeypatch.setattr(pygame.display, "update", updates.append)
+    assert not renderer.render(groups)
+    assert updates == []
+
+
+def test_render_after_clear_repaints_everything(screen):
+    renderer = _renderer(screen)
+    groups = [((255, 0, 0), (Point(1, 1),))]
+    renderer.render(groups)
+    renderer.clear((0, 0, 0))
+    renderer.render(groups)
+
+    reference = pygame.Surface(screen.get_size())
+    draw_full(reference, renderer.static, groups, SCALE)
+    assert frame_digest(screen) == frame_digest(reference)
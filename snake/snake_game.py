@@ -1,61 +1,222 @@
 import random
+from collections import deque
+from typing import Iterable, NamedTuple
 
-from snake import led_map_v2 as led_map
-from snake.const import DIRECTIONS, RIGHT, UP
+from snake.const import DIRECTIONS, RIGHT
+from snake.map_spec import load_map
 from snake.types import Direction, Point
 
-WIDTH = len(led_map.MAP[0])  # 14
-HEIGHT = len(led_map.MAP)  # 8
+# The compiled map the game runs on, picked with $SNAKE_MAP
+MAP = load_map()
+WIDTH = MAP.width  # 14
+HEIGHT = MAP.height  # 10
 INITIAL_SNAKE_LENGTH = 3
 
 
+def _build_move_tables():
+    next_head: dict[Point, dict[Direction, Point]] = {}
+    open_move: dict[Point, dict[Direction, bool]] = {}
+    portal_moves: set[tuple[Point, Direction]] = set()
+    for cell in range(MAP.num_cells):
+        head = MAP.point(cell)
+        next_head[head], open_move[head] = {}, {}
+        for d, direction in enumerate(DIRECTIONS):
+            next_cell = MAP.next_cell[cell * 4 + d]
+            if next_cell >= 0:
+                next_head[head][direction] = MAP.point(next_cell)
+            else:
+                # Off the grid, only ever checked for safety
+                next_head[head][direction] = Point(head.x + direction.x, head.y + direction.y)
+            open_move[head][direction] = next_cell >= 0 and not MAP.blocked[next_cell]
+            if MAP.flips[cell * 4 + d]:
+                portal_moves.add((head, direction))
+    return next_head, open_move, portal_moves
+
+
+# head -> direction -> next head, whether that cell is open, and the moves through a portal
+_NEXT_HEAD, _OPEN_MOVE, _PORTAL_MOVES = _build_move_tables()
+# Turn candidates when the current direction runs into a blocked cell
+_OTHER_DIRECTIONS = {
+    direction: list(set[Direction](DIRECTIONS) - {direction}) for direction in DIRECTIONS
+}
+
+
+_MASK64 = (1 << 64) - 1
+
+
 def get_next_head(head: Point, direction: Direction) -> Point:
-    new_head = Point(head.x + direction.x, head.y + direction.y)
-    # Check rotations
-    if new_head.x < 0:
-        new_head = Point(WIDTH - 1, new_head.y)
-    if new_head.x >= WIDTH:
-        new_head = Point(0, new_head.y)
-    # Check for portals
-    if head in led_map.PORTALS and direction == UP:
-        new_head = Point(*led_map.PORTALS[head])
-    return new_head
+    """Cell reached from `head` (on the board) in `direction`, with wrap-around and portals."""
+    return _NEXT_HEAD[head][direction]
+
+
+def _mix(value: int) -> int:
+    # splitmix64 finalizer
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & _MASK64
+    return value ^ (value >> 31)
+
+
+class MoveUndo(NamedTuple):
+    """What `SnakeGame.undo_move` needs to take a move back."""
+
+    direction: Direction
+    food: Point | None
+    game_over: bool
+    free_pos: int  # Where the new head was in the free pool, -1 if the snake didn't move
+    tail: Point | None  # The tail that moved away, None if the snake grew or didn't move
+    rng_state: tuple | None  # Only when the move drew from `rng`
+
+
+class GameSnapshot(NamedTuple):
+    body: tuple[Point, ...]
+    occupancy: list[int]
+    free: list[int]
+    free_pos: list[int]
+    tick: int
+    direction: Direction
+    food: Point | None
+    game_over: bool
+    seed: int
+    rng_state: tuple
 
 
 class SnakeGame:
-    def __init__(self):
-        self.snake: list[Point] = []
+    """
+    Snake game state.
+
+    The body is kept as a deque (head first) next to a flat occupancy grid that
+    stores, for every cell, the tick at which a segment entered it (0 when the
+    cell is empty). That makes the time-aware `is_safe(point, step)` check O(1).
+    Free cells (not blocked and not occupied) are kept in a swap-remove pool so
+    food placement is O(1) as well.
+
+    All randomness (food placement, redirects away from blocked cells) comes from
+    `self.rng`, so a game started with `initialize_game(seed)` can be replayed
+    exactly from its moves. With `deterministic_food` the choices are a hash of
+    the seed and the tick instead, so there is no generator state to save or
+    restore, which is what search and rollouts want.
+
+    For lookahead, `apply_move()` plays a move and returns a small `MoveUndo`
+    record that `undo_move()` takes back, moves have to be undone in reverse
+    order. `snapshot()`/`restore()` and `clone()` copy the whole state.
+    """
+
+    def __init__(self, seed: int | None = None, deterministic_food: bool = False):
+        # Unseeded games draw their seed from the global generator, so random.seed()
+        # still makes a run reproducible.
+        self.seed: int = random.getrandbits(64) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.deterministic_food = deterministic_food
+        self._occupancy: list[int] = [0] * (WIDTH * HEIGHT)
+        self._free: list[int] = []
+        self._free_pos: list[int] = [-1] * (WIDTH * HEIGHT)
+        self._tick: int = 0
+        self._body: deque[Point] = deque()
         self.food: Point = None
         self.direction: Direction = RIGHT
         self.game_over: bool = False
 
-    def initialize_game(self):
-        self.snake = []
+    @property
+    def snake(self) -> deque[Point]:
+        """The snake body, head first. Treat as read-only, assign to replace it."""
+        return self._body
+
+    @snake.setter
+    def snake(self, body: Iterable[Point]):
+        self._reset_board()
+        body = [Point(*point) for point in body]
+        # Oldest segment (tail) gets the lowest tick
+        for point in reversed(body):
+            self._push_head(point)
+
+    def initialize_game(self, seed: int | None = None):
+        # Every game gets its own seed, recorded in `self.seed` so it can be replayed
+        self.seed = self.rng.getrandbits(64) if seed is None else seed
+        self.rng.seed(self.seed)
         # Place snake in the middle, starting with INITIAL_SNAKE_LENGTH
-        for i in range(INITIAL_SNAKE_LENGTH):
-            self.snake.append(Point(WIDTH // 2 - i, HEIGHT // 2))
+        self.snake = [Point(WIDTH // 2 - i, HEIGHT // 2) for i in range(INITIAL_SNAKE_LENGTH)]
         self.direction = RIGHT
         self.game_over = False
         self._place_food()
 
+    def _reset_board(self):
+        self._body = deque()
+        self._tick = 0
+        self._occupancy = [0] * (WIDTH * HEIGHT)
+        self._free = []
+        self._free_pos = [-1] * (WIDTH * HEIGHT)
+        for cell in MAP.open_cells:
+            self._add_free(cell)
+
+    def _add_free(self, cell: int):
+        self._free_pos[cell] = len(self._free)
+        self._free.append(cell)
+
+    def _remove_free(self, cell: int) -> int:
+        pos = self._free_pos[cell]
+        if pos < 0:
+            return pos
+        last = self._free.pop()
+        if last != cell:
+            self._free[pos] = last
+            self._free_pos[last] = pos
+        self._free_pos[cell] = -1
+        return pos
+
+    def _restore_free(self, cell: int, pos: int):
+        # Exact inverse of _remove_free(cell) when it returned `pos`
+        if pos < len(self._free):
+            moved = self._free[pos]
+            self._free_pos[moved] = len(self._free)
+            self._free.append(moved)
+            self._free[pos] = cell
+        else:
+            self._free.append(cell)
+        self._free_pos[cell] = pos
+
+    def _push_head(self, point: Point) -> int:
+        cell = point.y * WIDTH + point.x
+        self._tick += 1
+        self._occupancy[cell] = self._tick
+        self._body.appendleft(point)
+        return self._remove_free(cell)
+
+    def _pop_tail(self):
+        point = self._body.pop()
+        cell = point.y * WIDTH + point.x
+        self._occupancy[cell] = 0
+        self._add_free(cell)
+
     def _place_food(self):
-        # Places food at a random position, ensuring it's not on the snake.
-        while True:
-            x = random.randint(0, WIDTH - 1)
-            y = random.randint(0, HEIGHT - 1)
-            if (x, y) not in self.snake and not led_map.is_blocked(x, y):
-                self.food = Point(x, y)
-                break
+        # Places food at a random free cell, i.e. not blocked and not on the snake.
+        if not self._free:
+            # The snake fills the whole board
+            self.food = None
+            self.game_over = True
+            return
+        cell = self._choice(self._free)
+        self.food = Point(cell % WIDTH, cell // WIDTH)
+
+    def _choice(self, options: list):
+        if self.deterministic_food:
+            return options[_mix(self.seed + self._tick * 0x9E3779B97F4A7C15) % len(options)]
+        return self.rng.choice(options)
 
     def is_safe(self, point: Point, step: int = 0) -> bool:
-        """Checks if a given coordinate is safe (within bounds and not part of the snake body)."""
-        if (
-            step < len(self.snake)
-            and point in self.snake[: len(self.snake) - step]
-            or led_map.is_blocked(point.x, point.y)
-        ):
+        """
+        Checks if a given coordinate is safe (within bounds and not part of the snake body).
+
+        `step` is the number of moves after which the point is reached: the last
+        `step` segments of the tail will have moved away by then.
+        """
+        if not 0 <= point.y < HEIGHT or MAP.blocked[point.y * WIDTH + point.x]:
             return False
-        return True
+        # Segment i (head is 0) is still there after `step` moves iff len - i > step,
+        # which for a segment that entered at tick t means t > tick - len + step.
+        return self._occupancy[point.y * WIDTH + point.x] <= self._tick - len(self._body) + step
+
+    def is_snake(self, point: Point) -> bool:
+        return 0 <= point.y < HEIGHT and self._occupancy[point.y * WIDTH + point.x] > 0
 
     def set_next_direction(self, direction: Direction):
         if direction.x == -self.direction.x and direction.y == -self.direction.y:
@@ -64,42 +225,142 @@ class SnakeGame:
 
     @property
     def snake_head(self) -> Point:
-        return self.snake[0]
+        return self._body[0]
+
+    def update_game(self) -> list[Point]:
+        """
+        Updates the game state for the next frame. Returns the cells whose
+        content changed: the new and the old head, the vacated tail and the old
+        and new food. Renderers redraw just those instead of the whole board.
+        """
+        food = self.food
+        free_pos, tail, _ = self._step(False)
+        if free_pos < 0:
+            # The snake didn't move
+            return []
+        body = self._body
+        changed = [body[0]]
+        if len(body) > 1:
+            changed.append(body[1])
+        if tail is not None:
+            changed.append(tail)
+        if self.food != food:
+            changed += [point for point in (food, self.food) if point is not None]
+        return changed
+
+    def apply_move(self, direction: Direction | None = None) -> MoveUndo:
+        """
+        Turns to `direction` (None keeps going) and plays one tick like
+        `update_game()`. Returns the record `undo_move()` needs.
+        """
+        direction_before, food, game_over = self.direction, self.food, self.game_over
+        if direction is not None:
+            self.set_next_direction(direction)
+        free_pos, tail, rng_state = self._step(True)
+        return MoveUndo(direction_before, food, game_over, free_pos, tail, rng_state)
+
+    def undo_move(self, undo: MoveUndo):
+        """Takes back the last `apply_move()`."""
+        if undo.free_pos >= 0:
+            if undo.tail is not None:
+                # Inverse of _pop_tail, the tail went to the end of the free pool
+                tail = undo.tail
+                cell = tail.y * WIDTH + tail.x
+                self._free.pop()
+                self._free_pos[cell] = -1
+                self._body.append(tail)
+                self._occupancy[cell] = self._tick - len(self._body) + 1
+            head = self._body.popleft()
+            cell = head.y * WIDTH + head.x
+            self._occupancy[cell] = 0
+            self._tick -= 1
+            self._restore_free(cell, undo.free_pos)
+        if undo.rng_state is not None:
+            self.rng.setstate(undo.rng_state)
+        self.direction = undo.direction
+        self.food = undo.food
+        self.game_over = undo.game_over
 
-    def update_game(self):
+    def snapshot(self) -> GameSnapshot:
+        return GameSnapshot(
+            tuple(self._body),
+            self._occupancy[:],
+            self._free[:],
+            self._free_pos[:],
+            self._tick,
+            self.direction,
+            self.food,
+            self.game_over,
+            self.seed,
+            self.rng.getstate(),
+        )
 
+    def restore(self, snapshot: GameSnapshot):
+        """Goes back to a `snapshot()`, which can be restored again later."""
+        self._body = deque(snapshot.body)
+        self._occupancy = snapshot.occupancy[:]
+        self._free = snapshot.free[:]
+        self._free_pos = snapshot.free_pos[:]
+        self._tick = snapshot.tick
+        self.direction = snapshot.direction
+        self.food = snapshot.food
+        self.game_over = snapshot.game_over
+        self.seed = snapshot.seed
+        self.rng.setstate(snapshot.rng_state)
+
+    def clone(self, deterministic_food: bool | None = None) -> "SnakeGame":
+        """Independent copy of the game, optionally switching the food mode."""
+        game = SnakeGame(
+            self.seed, self.deterministic_food if deterministic_food is None else deterministic_food
+        )
+        game.restore(self.snapshot())
+        return game
+
+    def _step(self, record: bool) -> tuple[int, Point | None, tuple | None]:
+        # Returns (free_pos, tail, rng_state) for MoveUndo, the generator state only
+        # when `record` and the tick draws from it
         if self.game_over:
-            return
-        """Updates the game state for the next frame."""
-        head = self.snake[0]
+            return -1, None, None
+        save_rng = record and not self.deterministic_food
+        rng_state = None
+        head = self._body[0]
+        next_heads = _NEXT_HEAD[head]
+        open_move = _OPEN_MOVE[head]
         new_direction = self.direction
-        possible_directions = []
-        for directions in set[Direction](DIRECTIONS) - {self.direction}:  # type: ignore
-            if self.is_safe(get_next_head(head, directions)):
-                possible_directions.append(directions)
-        while (next_head := get_next_head(head, new_direction)) and led_map.is_blocked(
-            next_head.x, next_head.y
-        ):
-            if len(possible_directions) == 0:
-                self.game_over = True
-                return
-            new_direction = random.choice(possible_directions)
-            possible_directions.remove(new_direction)
+        if not open_move[new_direction]:
+            # Turn to a random safe direction instead of running into a blocked cell
+            possible_directions = [
+                direction
+                for direction in _OTHER_DIRECTIONS[self.direction]
+                if self.is_safe(next_heads[direction])
+            ]
+            if save_rng:
+                rng_state = self.rng.getstate()
+            while not open_move[new_direction]:
+                if len(possible_directions) == 0:
+                    self.game_over = True
+                    return -1, None, rng_state
+                new_direction = self._choice(possible_directions)
+                possible_directions.remove(new_direction)
 
         self.direction = new_direction
-        new_head = get_next_head(head, self.direction)
-        if new_head in led_map.PORTALS and head in led_map.PORTALS and self.direction == UP:
-            self.direction = Direction(self.direction.x, self.direction.y * -1)
+        new_head = next_heads[new_direction]
+        if (head, new_direction) in _PORTAL_MOVES:
+            self.direction = Direction(new_direction.x, new_direction.y * -1)
 
         # Check for self-collision
-        if new_head in self.snake:
+        if self.is_snake(new_head):
             self.game_over = True
-            return
+            return -1, None, rng_state
 
-        self.snake.insert(0, new_head)  # Add new head
+        free_pos = self._push_head(new_head)  # Add new head
 
         # Check if food was eaten
         if new_head == self.food:
+            if save_rng and rng_state is None:
+                rng_state = self.rng.getstate()
             self._place_food()  # Place new food
-        else:
-            self.snake.pop()  # Remove tail if no food eaten
+            return free_pos, None, rng_state
+        tail = self._body[-1]
+        self._pop_tail()  # Remove tail if no food eaten
+        return free_pos, tail, rng_state
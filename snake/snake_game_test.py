@@ -0,0 +1,126 @@
+import random
+
+import pytest
+
+from snake.agent import agent_move
+from snake.const import DIRECTIONS
+from snake.snake_game import HEIGHT, MAP, WIDTH, SnakeGame
+from snake.types import Point
+
+
+def _reference_is_safe(snake, point, step):
+    return not (
+        step < len(snake)
+        and point in snake[: len(snake) - step]
+        or MAP.is_blocked(point.x, point.y)
+    )
+
+
+def test_is_safe_matches_list_scan():
+    random.seed(1)
+    game = SnakeGame()
+    game.initialize_game()
+    for _ in range(300):
+        if game.game_over:
+            game.initialize_game()
+        snake = list(game.snake)
+        for step in range(len(snake) + 2):
+            for y in range(HEIGHT):
+                for x in range(WIDTH):
+                    point = Point(x, y)
+                    assert game.is_safe(point, step) == _reference_is_safe(snake, point, step)
+        if (direction := agent_move(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+
+
+def test_food_never_on_snake_or_blocked():
+    random.seed(2)
+    game = SnakeGame()
+    game.snake = [Point(x, 5) for x in range(13, -1, -1)]
+    for _ in range(200):
+        game._place_food()
+        assert game.food not in game.snake
+        assert not MAP.is_blocked(game.food.x, game.food.y)
+
+
+def test_snake_setter_rebuilds_board():
+    game = SnakeGame()
+    game.initialize_game()
+    game.snake = [Point(3, 4), Point(3, 5), Point(3, 6)]
+    assert game.snake_head == Point(3, 4)
+    assert game.is_snake(Point(3, 6))
+    assert not game.is_snake(Point(7, 5))
+    assert game.is_safe(Point(3, 6), 1)
+    assert not game.is_safe(Point(3, 5), 1)
+
+
+def _random_moves(rng, count):
+    return [rng.choice(DIRECTIONS + [None]) for _ in range(count)]
+
+
+@pytest.mark.parametrize("deterministic_food", [False, True])
+def test_apply_move_matches_update_game(deterministic_food):
+    rng = random.Random(4)
+    played = SnakeGame(seed=5, deterministic_food=deterministic_food)
+    applied = SnakeGame(seed=5, deterministic_food=deterministic_food)
+    played.initialize_game(6)
+    applied.initialize_game(6)
+    for direction in _random_moves(rng, 3000):
+        if played.game_over:
+            played.initialize_game()
+            applied.initialize_game()
+        if direction is not None:
+            played.set_next_direction(direction)
+        played.update_game()
+        applied.apply_move(direction)
+        assert applied.snapshot() == played.snapshot()
+
+
+@pytest.mark.parametrize("deterministic_food", [False, True])
+def test_undo_move_restores_every_state(deterministic_food):
+    rng = random.Random(8)
+    game = SnakeGame(seed=9, deterministic_food=deterministic_food)
+    game.initialize_game()
+    for _ in range(200):
+        if game.game_over:
+            game.initialize_game()
+        # Walk down a random line of play, checking every state on the way back
+        snapshots, undos = [], []
+        for direction in _random_moves(rng, rng.randrange(1, 40)):
+            snapshots.append(game.snapshot())
+            undos.append(game.apply_move(direction))
+        while undos:
+            game.undo_move(undos.pop())
+            assert game.snapshot() == snapshots.pop()
+        # Keep going from a new position
+        for direction in _random_moves(rng, 5):
+            game.apply_move(direction)
+
+
+def test_deterministic_food_depends_only_on_the_moves():
+    game = SnakeGame(seed=10)
+    game.initialize_game()
+    moves = _random_moves(random.Random(11), 300)
+    foods = []
+    for _ in range(2):
+        rollout = game.clone(deterministic_food=True)
+        # Drawing from the generator doesn't change deterministic food
+        rollout.rng.random()
+        foods.append([rollout.apply_move(direction) and rollout.food for direction in moves])
+    assert foods[0] == foods[1]
+
+
+def test_clone_and_restore_are_independent():
+    game = SnakeGame(seed=12)
+    game.initialize_game()
+    snapshot = game.snapshot()
+    clone = game.clone()
+    for _ in range(20):
+        clone.update_game()
+    assert game.snapshot() == snapshot
+    game.update_game()
+    game.restore(snapshot)
+    game.update_game()
+    game.restore(snapshot)
+    assert game.snapshot() == snapshot
@@ -0,0 +1,193 @@
+"""
+Hamiltonian tour agent.
+
+A Hamiltonian cycle through every open cell of the map is computed once and
+cached on disk next to the compiled map, keyed by the map hash. Following the
+cycle the snake can never run into itself, it fills the board every game. The
+map's moves are symmetric (portals work both ways, rows wrap around), so the
+cycle is searched on the undirected cell graph with Posa's rotation-extension
+heuristic, which finds one in milliseconds on the LED maps.
+
+While the snake is shorter than half the board it takes shortcuts towards the
+food: a move that skips ahead on the tour, but not past the food and not so far
+that too few free tour cells are left in front of the tail. The body then
+stays in tour order and the cells it skipped are behind the tail's path.
+
+A decision is a table lookup of the tour direction, at most four neighbor
+lookups for a shortcut and `is_safe` on the chosen cell.
+"""
+
+import json
+import logging
+import os
+import random
+
+from snake import snake_game
+from snake.const import DIRECTIONS
+from snake.map_spec import MapSpec, cache_dir
+from snake.types import Direction
+
+logger = logging.getLogger(__name__)
+
+# Bump when the tour search changes, invalidates the cached tours
+TOUR_VERSION = 1
+# Shortcuts are only taken while the snake covers less than this share of the board
+SHORTCUT_MAX_FILL = 0.5
+SEARCH_ATTEMPTS = 20
+
+
+def _neighbors(spec: MapSpec) -> dict[int, list[int]]:
+    return {
+        cell: sorted(
+            {
+                next_cell
+                for next_cell in spec.next_cell[cell * 4 : cell * 4 + 4]
+                if next_cell >= 0 and not spec.blocked[next_cell]
+            }
+        )
+        for cell in spec.open_cells
+    }
+
+
+def is_tour(spec: MapSpec, order: list[int]) -> bool:
+    """Visits every open cell once, every cell is one move from the one before (cyclically)."""
+    if sorted(order) != list(spec.open_cells):
+        return False
+    neighbors = _neighbors(spec)
+    return all(order[i] in neighbors[order[i - 1]] for i in range(len(order)))
+
+
+def find_tour(spec: MapSpec, seed: int = 0) -> list[int]:
+    """
+    Hamiltonian cycle over the open cells, as the cells in tour order. Raises
+    ValueError when none was found.
+
+    Posa's heuristic grows a path from a random cell. When the end has no
+    unvisited neighbor, the path is rotated instead: for a neighbor v of the
+    end, the part after v is reversed, which gives the path a new end. Once all
+    cells are on the path, rotations go on until the end is next to the start.
+    """
+    rng = random.Random(seed)
+    neighbors = _neighbors(spec)
+    num_cells = len(neighbors)
+    if num_cells < 3:
+        raise ValueError(f"Map {spec.name} is too small for a tour")
+    for _ in range(SEARCH_ATTEMPTS):
+        path = [rng.choice(spec.open_cells)]
+        position = {path[0]: 0}
+        for _ in range(100 * num_cells):
+            end = path[-1]
+            if len(path) == num_cells and path[0] in neighbors[end]:
+                return path
+            unvisited = [cell for cell in neighbors[end] if cell not in position]
+            if unvisited:
+                cell = rng.choice(unvisited)
+                position[cell] = len(path)
+                path.append(cell)
+                continue
+            pivots = [position[cell] for cell in neighbors[end] if cell != path[-2]]
+            if not pivots:
+                break
+            pivot = rng.choice(pivots)
+            path[pivot + 1 :] = path[:pivot:-1]
+            for i in range(pivot + 1, len(path)):
+                position[path[i]] = i
+    raise ValueError(f"No Hamiltonian tour found on map {spec.name}")
+
+
+def _tour_path(spec: MapSpec) -> str:
+    return os.path.join(cache_dir(), f"{spec.name}-{spec.hash[:16]}.tour{TOUR_VERSION}.json")
+
+
+def load_tour(spec: MapSpec) -> list[int]:
+    """Tour of a map, from the disk cache when it was computed before."""
+    path = _tour_path(spec)
+    try:
+        with open(path) as f:
+            order = json.load(f)
+        if isinstance(order, list) and is_tour(spec, order):
+            return order
+    except (OSError, ValueError):
+        pass
+
+    order = find_tour(spec)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(order, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Could not cache the tour in %s: %s", path, e)
+    return order
+
+
+class TourAgent:
+    """Follows a Hamiltonian tour of the map, see the module docstring."""
+
+    def __init__(self, spec: MapSpec, order: list[int] | None = None):
+        self.spec = spec
+        self.order = load_tour(spec) if order is None else order
+        self.size = len(self.order)
+        self.index = [-1] * spec.num_cells  # Position on the tour, -1 for blocked cells
+        for i, cell in enumerate(self.order):
+            self.index[cell] = i
+        # Index into DIRECTIONS of the move to the next cell on the tour
+        self.tour_direction = [-1] * spec.num_cells
+        for i, cell in enumerate(self.order):
+            next_cell = self.order[(i + 1) % self.size]
+            self.tour_direction[cell] = next(
+                d for d in range(4) if spec.next_cell[cell * 4 + d] == next_cell
+            )
+
+    def ahead(self, a: int, b: int) -> int:
+        """Moves along the tour from cell a to cell b."""
+        return (self.index[b] - self.index[a]) % self.size
+
+    def __call__(self, game: snake_game.SnakeGame) -> Direction | None:
+        spec = self.spec
+        head = spec.cell(game.snake_head)
+        length = len(game.snake)
+        direction = self.tour_direction[head]
+        if game.food is not None and length < self.size * SHORTCUT_MAX_FILL:
+            tail, food = spec.cell(game.snake[-1]), spec.cell(game.food)
+            direction = self._shortcut(head, tail, food, length)
+        if game.is_safe(spec.point(spec.next_cell[head * 4 + direction])):
+            return DIRECTIONS[direction]
+        # Only when the body isn't in tour order yet, at the start of a game
+        for d in sorted(range(4), key=lambda d: self._step(head, d)):
+            next_cell = spec.next_cell[head * 4 + d]
+            if next_cell >= 0 and game.is_safe(spec.point(next_cell)):
+                return DIRECTIONS[d]
+        return None
+
+    def _step(self, head: int, d: int) -> int:
+        # Moves along the tour a move skips, `size` for moves into a blocked cell
+        next_cell = self.spec.next_cell[head * 4 + d]
+        if next_cell < 0 or self.index[next_cell] < 0:
+            return self.size
+        return self.ahead(head, next_cell)
+
+    def _shortcut(self, head: int, tail: int, food: int, length: int) -> int:
+        # The furthest move along the tour that doesn't pass the food and leaves
+        # at least `length` free tour cells between the new head and the tail
+        to_food = self.ahead(head, food)
+        limit = self.ahead(head, tail) - length - 1
+        best = self.tour_direction[head]
+        best_step = 1
+        for d in range(4):
+            step = self._step(head, d)
+            if best_step < step <= to_food and step < limit:
+                best, best_step = d, step
+        return best
+
+
+_agent: TourAgent | None = None
+
+
+def agent_move_tour(game: snake_game.SnakeGame) -> Direction | None:
+    """Moves along the cached Hamiltonian tour of the map, see `TourAgent`."""
+    global _agent
+    if _agent is None or _agent.spec is not snake_game.MAP:
+        _agent = TourAgent(snake_game.MAP)
+    return _agent(game)
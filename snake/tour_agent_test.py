@@ -0,0 +1,65 @@
+import pytest
+
+from snake import snake_game, tour_agent
+from snake.const import DIRECTIONS
+from snake.map_spec import load_map
+from snake.multi_snake import serpentine_panel
+from snake.tour_agent import TourAgent, find_tour, is_tour, load_tour
+
+
+@pytest.mark.parametrize("name", ["led_map", "led_map_v2"])
+def test_find_tour_visits_every_open_cell(name):
+    spec = load_map(name)
+    order = find_tour(spec)
+    assert is_tour(spec, order)
+    assert not is_tour(spec, order[:-1])
+    assert not is_tour(spec, order[:1] + order[2:] + order[1:2])
+
+
+def test_tour_is_legal_for_the_game():
+    # Following the tour never needs the reverse move, including through portals
+    agent = TourAgent(snake_game.MAP)
+    start = agent.order[0]
+    game = snake_game.SnakeGame(seed=0)
+    game.snake = [snake_game.MAP.point(start)]
+    game.direction = DIRECTIONS[agent.tour_direction[start]]
+    for i in range(1, agent.size + 1):
+        direction = DIRECTIONS[agent.tour_direction[agent.order[i - 1]]]
+        game.set_next_direction(direction)
+        assert game.direction == direction
+        game.update_game()
+        assert game.snake_head == snake_game.MAP.point(agent.order[i % agent.size])
+    assert not game.game_over
+
+
+def test_load_tour_uses_disk_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    spec = serpentine_panel(8, 6)
+    order = load_tour(spec)
+    assert is_tour(spec, order)
+    monkeypatch.setattr(tour_agent, "find_tour", lambda spec: pytest.fail("not cached"))
+    assert load_tour(spec) == order
+
+
+def test_corrupt_cache_is_recomputed(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    spec = serpentine_panel(8, 6)
+    tmp_path.joinpath("snake", "maps").mkdir(parents=True)
+    with open(tour_agent._tour_path(spec), "w") as f:
+        f.write("[1, 2, 3]")
+    assert is_tour(spec, load_tour(spec))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fills_the_board(seed):
+    agent = TourAgent(snake_game.MAP)
+    game = snake_game.SnakeGame(seed=seed)
+    game.initialize_game()
+    for _ in range(10 * agent.size**2):
+        if game.game_over:
+            break
+        if (direction := agent(game)) is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+    assert game.food is None
+    assert len(game.snake) == len(snake_game.MAP.open_cells)
@@ -0,0 +1,165 @@
+import numpy as np
+
+from snake.const import DIRECTIONS, RIGHT
+from snake.snake_game import HEIGHT, INITIAL_SNAKE_LENGTH, MAP, WIDTH
+from snake.types import Direction, Point
+
+NUM_CELLS = WIDTH * HEIGHT
+# Extra cell id standing for "off the board", always blocked
+OFF_BOARD = NUM_CELLS
+
+RIGHT_INDEX = DIRECTIONS.index(RIGHT)
+REVERSE = np.array(
+    [DIRECTIONS.index(Direction(-d.x, -d.y)) for d in DIRECTIONS],
+    dtype=np.int64,
+)
+
+
+def _build_tables() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Next cell and direction after a move from every cell, plus the blocked mask."""
+    next_cell = np.full((NUM_CELLS + 1, len(DIRECTIONS)), OFF_BOARD, dtype=np.int64)
+    spec_next = np.array(MAP.next_cell, dtype=np.int64).reshape(NUM_CELLS, len(DIRECTIONS))
+    next_cell[:NUM_CELLS] = np.where(spec_next >= 0, spec_next, OFF_BOARD)
+    next_direction = np.tile(np.arange(len(DIRECTIONS), dtype=np.int64), (NUM_CELLS + 1, 1))
+    flips = np.array(MAP.flips, dtype=bool).reshape(NUM_CELLS, len(DIRECTIONS))
+    next_direction[:NUM_CELLS][flips] = REVERSE[next_direction[:NUM_CELLS][flips]]
+    blocked = np.ones(NUM_CELLS + 1, dtype=bool)
+    blocked[:NUM_CELLS] = MAP.blocked
+    return next_cell, next_direction, blocked
+
+
+NEXT_CELL, NEXT_DIRECTION, BLOCKED = _build_tables()
+
+
+class VecSnakeGame:
+    """
+    N independent snake games stepped together with NumPy.
+
+    Follows the rules of `snake_game.SnakeGame` exactly (wrap-around, portals,
+    random redirect away from blocked cells, growth and food placement), with
+    the state of every game held in arrays:
+
+    - `body`: ring buffer of cell ids (cell = y * WIDTH + x), `head_pos` points
+      at the head and the tail is `length - 1` entries behind it.
+    - `occupancy`: per cell the tick at which a segment entered it, 0 if empty.
+    - `food`, `direction` (index into DIRECTIONS), `game_over`, `steps`.
+
+    Games that end are reset automatically at the end of `step`; the length they
+    reached is left in `final_length`.
+    """
+
+    def __init__(self, num_games: int, seed: int | None = None):
+        self.num_games = num_games
+        self.rng = np.random.default_rng(seed)
+        self.body = np.zeros((num_games, NUM_CELLS), dtype=np.int64)
+        self.head_pos = np.zeros(num_games, dtype=np.int64)
+        self.length = np.zeros(num_games, dtype=np.int64)
+        self.tick = np.zeros(num_games, dtype=np.int64)
+        self.occupancy = np.zeros((num_games, NUM_CELLS + 1), dtype=np.int64)
+        self.food = np.zeros(num_games, dtype=np.int64)
+        self.direction = np.zeros(num_games, dtype=np.int64)
+        self.game_over = np.zeros(num_games, dtype=bool)
+        self.steps = np.zeros(num_games, dtype=np.int64)
+        self.final_length = np.zeros(num_games, dtype=np.int64)
+        self.reset()
+
+    @property
+    def head(self) -> np.ndarray:
+        return self.body[np.arange(self.num_games), self.head_pos]
+
+    def snake(self, i: int) -> list[Point]:
+        """Body of game `i`, head first, as points (for debugging and tests)."""
+        positions = (self.head_pos[i] - np.arange(self.length[i])) % NUM_CELLS
+        return [Point(int(c) % WIDTH, int(c) // WIDTH) for c in self.body[i, positions]]
+
+    def reset(self, mask: np.ndarray | None = None):
+        """Starts a new game in every game selected by `mask` (default: all)."""
+        games = np.arange(self.num_games) if mask is None else np.flatnonzero(mask)
+        if games.size == 0:
+            return
+        start = np.array(
+            [
+                (HEIGHT // 2) * WIDTH + WIDTH // 2 - i
+                for i in reversed(range(INITIAL_SNAKE_LENGTH))
+            ],
+            dtype=np.int64,
+        )
+        self.occupancy[games] = 0
+        self.body[games, :INITIAL_SNAKE_LENGTH] = start
+        self.occupancy[games[:, None], start] = np.arange(1, INITIAL_SNAKE_LENGTH + 1)
+        self.head_pos[games] = INITIAL_SNAKE_LENGTH - 1
+        self.length[games] = INITIAL_SNAKE_LENGTH
+        self.tick[games] = INITIAL_SNAKE_LENGTH
+        self.direction[games] = RIGHT_INDEX
+        self.game_over[games] = False
+        self.steps[games] = 0
+        self._place_food(games)
+
+    def _place_food(self, games: np.ndarray):
+        free = (self.occupancy[games, :NUM_CELLS] == 0) & ~BLOCKED[:NUM_CELLS]
+        keys = self.rng.random(free.shape)
+        keys[~free] = -1.0
+        self.food[games] = keys.argmax(axis=1)
+        # The snake fills the whole board
+        self.game_over[games[~free.any(axis=1)]] = True
+
+    def step(self, actions: np.ndarray | None = None, auto_reset: bool = True):
+        """
+        Advances every game by one tick.
+
+        `actions` holds a DIRECTIONS index per game (negative keeps the current
+        direction) and is applied like `SnakeGame.set_next_direction`.
+        Returns (rewards, dones): 1.0 where food was eaten, and which games ended.
+        """
+        games = np.arange(self.num_games)
+        alive = ~self.game_over
+        if actions is not None:
+            actions = np.asarray(actions, dtype=np.int64)
+            turn = (actions >= 0) & (actions != REVERSE[self.direction])
+            self.direction = np.where(turn, actions, self.direction)
+
+        head = self.body[games, self.head_pos]
+        direction = self.direction.copy()
+
+        # Heading into a blocked cell: pick a random safe direction instead
+        redirect = np.flatnonzero(alive & BLOCKED[NEXT_CELL[head, direction]])
+        if redirect.size:
+            candidates = NEXT_CELL[head[redirect]]
+            safe = ~BLOCKED[candidates] & (self.occupancy[redirect[:, None], candidates] == 0)
+            safe[np.arange(redirect.size), direction[redirect]] = False
+            keys = self.rng.random(safe.shape)
+            keys[~safe] = -1.0
+            direction[redirect] = keys.argmax(axis=1)
+            alive[redirect[~safe.any(axis=1)]] = False
+
+        new_head = NEXT_CELL[head, direction]
+        self.direction = np.where(alive, NEXT_DIRECTION[head, direction], self.direction)
+        # Check for self-collision
+        alive &= self.occupancy[games, new_head] == 0
+        dones = ~self.game_over & ~alive
+        self.game_over |= dones
+
+        movers = np.flatnonzero(alive)
+        new_head = new_head[movers]
+        self.tick[movers] += 1
+        self.steps[movers] += 1
+        self.head_pos[movers] = (self.head_pos[movers] + 1) % NUM_CELLS
+        self.body[movers, self.head_pos[movers]] = new_head
+        self.occupancy[movers, new_head] = self.tick[movers]
+
+        rewards = np.zeros(self.num_games, dtype=np.float32)
+        ate = new_head == self.food[movers]
+        eaters, others = movers[ate], movers[~ate]
+        tail = self.body[others, (self.head_pos[others] - self.length[others]) % NUM_CELLS]
+        self.occupancy[others, tail] = 0
+        self.length[eaters] += 1
+        rewards[eaters] = 1.0
+        if eaters.size:
+            self._place_food(eaters)
+            filled = eaters[self.game_over[eaters]]
+            dones[filled] = True
+
+        self.final_length = np.where(dones, self.length, 0)
+        if auto_reset:
+            self.reset(dones)
+        return rewards, dones
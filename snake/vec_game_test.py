@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+
+from snake.agent import agent_move
+from snake.const import DIRECTIONS
+from snake.snake_game import WIDTH, SnakeGame
+from snake.types import Point
+from snake.vec_game import VecSnakeGame
+
+
+def _sync_food(game: SnakeGame, vec: VecSnakeGame):
+    cell = int(vec.food[0])
+    game.food = Point(cell % WIDTH, cell // WIDTH)
+
+
+def test_matches_snake_game():
+    random.seed(3)
+    vec = VecSnakeGame(1, seed=3)
+    game = SnakeGame()
+    game.initialize_game()
+    _sync_food(game, vec)
+    for _ in range(2000):
+        direction = agent_move(game)
+        action = -1 if direction is None else DIRECTIONS.index(direction)
+        if direction is not None:
+            game.set_next_direction(direction)
+        game.update_game()
+        _, dones = vec.step(np.array([action]), auto_reset=False)
+        assert bool(dones[0]) == game.game_over
+        if game.game_over:
+            game.initialize_game()
+            vec.reset()
+        else:
+            assert vec.snake(0) == list(game.snake)
+            assert DIRECTIONS[vec.direction[0]] == game.direction
+        _sync_food(game, vec)
+
+
+def test_auto_reset_and_rewards():
+    vec = VecSnakeGame(64, seed=0)
+    rng = np.random.default_rng(0)
+    total_rewards = 0.0
+    total_dones = 0
+    for _ in range(500):
+        rewards, dones = vec.step(rng.integers(0, 4, vec.num_games))
+        total_rewards += rewards.sum()
+        total_dones += dones.sum()
+        assert not vec.game_over.any()
+        assert (vec.final_length[dones] >= 3).all()
+        # Food is never placed on a snake
+        assert (vec.occupancy[np.arange(vec.num_games), vec.food] == 0).all()
+    assert total_rewards > 0
+    assert total_dones > 0